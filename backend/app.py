@@ -1,13 +1,43 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, make_response, render_template_string, g, stream_with_context
 import sqlite3
+import atexit
+import base64
+import fcntl
+import functools
 import hashlib
+import itertools
+import json
 import os
+import re
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from flask_cors import CORS
 
+from cache import ResponseCache
+from db import ConnectionPool, SEARCH_DOCUMENT_SQL, is_lock_error, migrate
+from encoding import FastJSONProvider, GzipRequestMiddleware, compress_response, json_array, negotiate_encoding
+from events import EventBus, publish
+from export import EXPORT_FORMATS, ExportError, check_export, export_stream
+from filters import FilterError, compile_filter
+from history import CHILD_SECTIONS, content_hash, history_events, normalize_rows, record_change
+from metrics import Metrics
+from sizing import MAX_EVENT_STREAMS, POOL_SIZE
+from stats import apply_contributions, pc_contributions, read_stats, track_pc
+from write_queue import WriteQueue, WriteQueueFull
+
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-DB_PATH = '/data/pcs.db'
+app.json = FastJSONProvider(app)
+app.wsgi_app = GzipRequestMiddleware(app.wsgi_app)
+CORS(app, expose_headers=['X-Next-Cursor'])  # Enable CORS for all routes
+DB_PATH = os.environ.get('HWDB_DB_PATH', '/data/pcs.db')
+BUSY_TIMEOUT_MS = int(os.environ.get('HWDB_BUSY_TIMEOUT_MS', 5000))
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+METRICS_ENABLED = os.environ.get('HWDB_METRICS', '').lower() in ('1', 'true')
 #DB_PATH = './pcs.db'
+pool = None
+response_cache = ResponseCache()
+metrics = Metrics(enabled=METRICS_ENABLED)
+metrics.init_app(app)
 
 # HTML template for the dashboard
 DASHBOARD_TEMPLATE = '''
@@ -180,16 +210,22 @@ DASHBOARD_TEMPLATE = '''
             }
         }
 
-        // Function to fetch details for a specific PC
-        async function fetchPCDetails(pcId) {
+        // Function to fetch details for many PCs in a single request (null on failure)
+        async function fetchPCDetails(pcIds) {
             try {
-                const response = await fetch(`/pc/${pcId}`);
+                const response = await fetch('/pcs/details', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify({ ids: pcIds })
+                });
                 if (!response.ok) {
                     throw new Error('Failed to fetch PC details');
                 }
                 return await response.json();
             } catch (error) {
-                console.error(`Error fetching details for PC ${pcId}:`, error);
+                console.error('Error fetching PC details:', error);
                 return null;
             }
         }
@@ -212,6 +248,7 @@ DASHBOARD_TEMPLATE = '''
         function createPCTile(pc) {
             const tile = document.createElement('div');
             tile.className = 'pc-tile';
+            tile.id = `pc-tile-${pc.id}`;
             
             // Short info section (always visible)
             const shortInfo = `
@@ -385,13 +422,10 @@ DASHBOARD_TEMPLATE = '''
                 // Clear the loading message
                 pcGrid.innerHTML = '';
                 
-                // For each PC, fetch its details and create a tile
-                for (const pc of pcs) {
-                    const pcDetails = await fetchPCDetails(pc.id);
-                    if (pcDetails) {
-                        const pcTile = createPCTile(pcDetails);
-                        pcGrid.appendChild(pcTile);
-                    }
+                // Fetch details for all PCs at once and create the tiles
+                const pcDetails = await fetchPCDetails(pcs.map(pc => pc.id)) || [];
+                for (const pc of pcDetails) {
+                    pcGrid.appendChild(createPCTile(pc));
                 }
             } catch (error) {
                 console.error('Error loading dashboard:', error);
@@ -399,20 +433,207 @@ DASHBOARD_TEMPLATE = '''
             }
         }
 
+        // Live updates are collected for a moment and the changed tiles are
+        // then re-rendered from one /pcs/details request, so a burst of
+        // submissions (e.g. a fleet booting) does not mean a request per PC
+        const REFRESH_DELAY_MS = 1000;
+        const STREAM_RETRY_MS = 30000;
+        const pendingRefresh = new Set();
+        let refreshTimer = null;
+
+        function refreshPCTile(pcId) {
+            pendingRefresh.add(pcId);
+            if (!refreshTimer) {
+                refreshTimer = setTimeout(refreshPendingTiles, REFRESH_DELAY_MS);
+            }
+        }
+
+        async function refreshPendingTiles() {
+            const pcIds = [...pendingRefresh];
+            pendingRefresh.clear();
+            refreshTimer = null;
+            const details = await fetchPCDetails(pcIds);
+            if (!details) {
+                return;  // keep the tiles as they are; the next update retries
+            }
+            const pcs = new Map(details.map(pc => [pc.id, pc]));
+            for (const pcId of pcIds) {
+                const pc = pcs.get(pcId);
+                const existing = document.getElementById(`pc-tile-${pcId}`);
+                if (!pc) {
+                    if (existing) existing.remove();
+                    continue;
+                }
+                const tile = createPCTile(pc);
+                if (existing) {
+                    existing.replaceWith(tile);
+                } else {
+                    document.getElementById('pc-grid').prepend(tile);
+                }
+            }
+        }
+
+        // Patch the grid from the /events stream instead of reloading it
+        function subscribeToEvents() {
+            const events = new EventSource('/events');
+            events.addEventListener('pc_upserted', event => refreshPCTile(JSON.parse(event.data).id));
+            events.addEventListener('notes_updated', event => refreshPCTile(JSON.parse(event.data).pc_id));
+            events.addEventListener('pc_deleted', event => {
+                const tile = document.getElementById(`pc-tile-${JSON.parse(event.data).pc_id}`);
+                if (tile) tile.remove();
+            });
+            events.addEventListener('reset', loadPCDashboard);
+            // EventSource gives up for good on an error response (e.g. 503 when
+            // the server has no stream slots left); try again later and reload,
+            // as the events in between are not replayed
+            events.onerror = () => {
+                if (events.readyState === EventSource.CLOSED) {
+                    setTimeout(() => {
+                        loadPCDashboard();
+                        subscribeToEvents();
+                    }, STREAM_RETRY_MS);
+                }
+            };
+        }
+
         // Load the dashboard when the page loads
-        window.onload = loadPCDashboard;
+        window.onload = () => {
+            loadPCDashboard();
+            subscribeToEvents();
+        };
     </script>
 </body>
 </html>
 '''
 
 def init_db():
-    with open('schema.sql') as f:
-        schema = f.read()
-    conn = sqlite3.connect(DB_PATH)
-    conn.executescript(schema)
-    conn.commit()
-    conn.close()
+    # Every server worker runs this on startup; the lock file makes sure only
+    # one of them applies the schema and pending migrations at a time.
+    with open(f"{DB_PATH}.init-lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with open(SCHEMA_PATH) as f:
+            schema = f.read()
+        conn = sqlite3.connect(DB_PATH)
+        conn.executescript(schema)
+        conn.commit()
+        migrate(conn)
+        conn.close()
+
+
+def create_app():
+    """WSGI entry point, e.g. ``gunicorn -c gunicorn.conf.py 'app:create_app()'``.
+
+    Configuration comes from the HWDB_* environment variables read above.
+    """
+    init_db()
+    return app
+
+
+def get_pool():
+    global pool
+    if pool is None:
+        pool = ConnectionPool(DB_PATH, size=POOL_SIZE, busy_timeout=BUSY_TIMEOUT_MS,
+                              factory=metrics.connection_factory)
+    return pool
+
+
+event_bus = EventBus(get_pool)
+
+WRITE_QUEUE_SIZE = int(os.environ.get('HWDB_WRITE_QUEUE_SIZE', 1000))
+WRITE_QUEUE_RETRY_AFTER = 5  # seconds, sent with 429 responses
+SYNC_SUBMIT_TIMEOUT = 30
+
+write_queue = None
+write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    global write_queue
+    with write_queue_lock:
+        if write_queue is None:
+            write_queue = WriteQueue(get_pool, maxsize=WRITE_QUEUE_SIZE, on_commit=event_bus.wake)
+            write_queue.start()
+            atexit.register(write_queue.stop)
+    return write_queue
+
+
+def drain_write_queue():
+    """Apply every queued submission and stop the writer; gunicorn calls this when a worker exits."""
+    global write_queue
+    with write_queue_lock:
+        if write_queue is not None:
+            write_queue.stop()
+            write_queue = None
+
+
+def get_db():
+    """Return the pooled connection bound to the current app context."""
+    if 'db' not in g:
+        with metrics.phase("db"):
+            g.db = get_pool().acquire()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+
+def bump_data_version(cur):
+    """Mark the data as changed; call in every write transaction before commit."""
+    cur.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+
+
+def current_data_version() -> int:
+    return get_db().execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+
+def cached_read(view):
+    """Serve a GET route with a data-version ETag and an in-process response cache.
+
+    ``If-None-Match`` with the current version short-circuits to a 304, and
+    identical requests at the same version reuse the serialized body.
+    Streamed responses get the ETag but are never cached. Bodies are cached
+    compressed, per negotiated encoding.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = current_data_version()
+        etag = f"v{version}"
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        encoding = negotiate_encoding()
+        key = (request.path, tuple(sorted(request.args.items(multi=True))), request.headers.get('Accept'), encoding)
+        cached = response_cache.get(key, version)
+        if cached is not None:
+            body, status, headers = cached
+            response = Response(body, status=status, headers=headers)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if not response.is_streamed:
+                # Cache the compressed body so hits do not compress it again
+                with metrics.phase("compress"):
+                    compress_response(response, encoding)
+                headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+                response_cache.put(key, version, (response.get_data(), response.status_code, headers))
+
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+
+@app.after_request
+def compress(response):
+    with metrics.phase("compress"):
+        return compress_response(response)
 
 
 def hash_serial(serial: str) -> str:
@@ -428,37 +649,103 @@ def update_notes():
     if not pc_id:
         return jsonify({"error": "Missing pc_id"}), 400
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
 
     # Check if PC exists
     cur.execute("SELECT id FROM pc WHERE id = ?", (pc_id,))
     if not cur.fetchone():
-        conn.close()
         return jsonify({"error": "PC not found"}), 404
 
     # Update only the notes field
     cur.execute("UPDATE pc SET notes = ? WHERE id = ?", (notes, pc_id))
+    refresh_search_document(cur, pc_id)
+    publish(cur, "notes_updated", {"pc_id": pc_id, "notes": notes})
+    bump_data_version(cur)
     conn.commit()
-    conn.close()
+    event_bus.wake()
 
     return jsonify({"status": "success", "pc_id": pc_id})
 
-@app.route('/submit', methods=['POST'])
-def submit():
-    data = request.get_json()
-    serial = data.get("serial", "")
-    if not serial:
-        return jsonify({"error": "Missing serial"}), 400
+def refresh_search_document(cur, pc_id):
+    """Rebuild the full-text search row of one PC from its current data."""
+    cur.execute("INSERT OR IGNORE INTO pc_search_doc (pc_id) VALUES (?)", (pc_id,))
+    cur.execute("DELETE FROM pc_search WHERE rowid = (SELECT docid FROM pc_search_doc WHERE pc_id = ?)", (pc_id,))
+    cur.execute(f"""
+        INSERT INTO pc_search (rowid, host, cpu, mainboard, notes, gpus, ram, disks)
+        {SEARCH_DOCUMENT_SQL}
+        WHERE p.id = ?
+    """, (pc_id,))
+
+
+def parse_disk_size(size) -> int:
+    size_str = (size or "0G").upper().rstrip("G")
+    return int(float(size_str)) if size_str.replace('.', '', 1).isdigit() else 0
+
+
+def child_rows(data) -> dict:
+    """Extract child table rows per section from a submission.
+
+    Only sections present in the payload are returned, so missing ones keep
+    their stored rows.
+    """
+    rows = {}
+    if "gpus" in data:
+        rows["gpus"] = [(gpu,) for gpu in data.get("gpus") or []]
+
+    # Only update RAM sticks if explicitly provided
+    if "ram" in data and isinstance(data["ram"], dict) and "sticks" in data["ram"]:
+        rows["ram"] = [
+            (stick.get("size_gb"), stick.get("type"), stick.get("model"))
+            for stick in data["ram"]["sticks"] or []
+        ]
+
+    # Only update disks if explicitly provided
+    if "disks" in data:
+        rows["disks"] = [
+            (parse_disk_size(disk.get("size")), disk.get("model"), disk.get("serial"), disk.get("path"))
+            for disk in data.get("disks") or []
+        ]
+    return rows
+
 
+# A payload with nothing but these keys is a heartbeat from an unchanged agent
+HEARTBEAT_FIELDS = {"serial", "partial"}
+
+
+class UnknownPC(LookupError):
+    """A heartbeat or partial submission arrived for a PC that is not stored."""
+
+
+def merge_submission(cur, data) -> str:
+    """Apply one ``SystemInfo.to_dict()`` payload and return the PC id.
+
+    Fields missing from the payload keep their stored values. Child
+    collections whose content hash matches the stored one are left alone, so
+    an unchanged re-inventory only touches the ``pc`` row. Agents send only
+    the changed sections with ``"partial": true``, or just the serial when
+    nothing changed; both raise UnknownPC if the PC has no stored record.
+    """
+    serial = data["serial"]
     pc_id = hash_serial(serial)
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    if set(data) <= HEARTBEAT_FIELDS:
+        cur.execute("UPDATE pc SET submitted_at = CURRENT_TIMESTAMP WHERE id = ?", (pc_id,))
+        if cur.rowcount == 0:
+            raise UnknownPC(pc_id)
+        # Flagged so clients need not refetch listings the PC is not in
+        publish(cur, "pc_upserted", {**pc_summary(cur, pc_id), "heartbeat": True})
+        bump_data_version(cur)
+        return pc_id
+
+    contributions = pc_contributions(cur, pc_id)
 
     # Check if PC already exists and get existing data if any
     cur.execute("SELECT * FROM pc WHERE id = ?", (pc_id,))
     existing_pc = cur.fetchone()
+
+    if not existing_pc and data.get("partial"):
+        raise UnknownPC(pc_id)
     
     if existing_pc:
         # Convert existing_pc tuple to a dictionary using column names
@@ -494,10 +781,21 @@ def submit():
         ram_total_gb = ram_data.get("total_size_gb") if isinstance(ram_data, dict) else None
         ram_slots = ram_data.get("slots") if isinstance(ram_data, dict) else None
     
-    # Update or insert the PC record
+    # Update or insert the PC record. An upsert keeps the existing row in place;
+    # INSERT OR REPLACE would delete it and cascade away its pc_tag rows.
     cur.execute("""
-        INSERT OR REPLACE INTO pc (id, host, serial, cpu, mainboard, ram_total_gb, ram_slots, resolution, notes, submitted_at)
+        INSERT INTO pc (id, host, serial, cpu, mainboard, ram_total_gb, ram_slots, resolution, notes, submitted_at)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(id) DO UPDATE SET
+            host = excluded.host,
+            serial = excluded.serial,
+            cpu = excluded.cpu,
+            mainboard = excluded.mainboard,
+            ram_total_gb = excluded.ram_total_gb,
+            ram_slots = excluded.ram_slots,
+            resolution = excluded.resolution,
+            notes = excluded.notes,
+            submitted_at = excluded.submitted_at
     """, (
         pc_id,
         host,
@@ -510,152 +808,625 @@ def submit():
         notes
     ))
 
-    # Only update related tables if the data is provided in the request
-    if "gpus" in data:
-        cur.execute("DELETE FROM gpu WHERE pc_id = ?", (pc_id,))
-        for gpu in data.get("gpus", []):
-            cur.execute("INSERT INTO gpu (pc_id, name) VALUES (?, ?)", (pc_id, gpu))
+    cur.execute("SELECT section, hash FROM pc_section_hash WHERE pc_id = ?", (pc_id,))
+    stored_hashes = dict(cur.fetchall())
 
-    # Only update RAM sticks if explicitly provided
-    if "ram" in data and isinstance(data["ram"], dict) and "sticks" in data["ram"]:
-        cur.execute("DELETE FROM ram_stick WHERE pc_id = ?", (pc_id,))
-        for stick in data["ram"]["sticks"]:
-            cur.execute("""
-                INSERT INTO ram_stick (pc_id, size_gb, type, model)
-                VALUES (?, ?, ?, ?)
-            """, (
-                pc_id,
-                stick.get("size_gb"),
-                stick.get("type"),
-                stick.get("model")
-            ))
+    sections = child_rows(data)
+    sections["system"] = [(host, cpu, mainboard, resolution, ram_total_gb, ram_slots)]
+    for section, rows in sections.items():
+        # Hash what is stored, so a resubmitted 8.0 matches the stored 8
+        rows = normalize_rows(section, rows)
+        digest = content_hash(rows)
+        if stored_hashes.get(section) == digest:
+            continue
 
-    # Only update disks if explicitly provided
-    if "disks" in data:
-        cur.execute("DELETE FROM disk WHERE pc_id = ?", (pc_id,))
-        for disk in data.get("disks", []):
-            size_str = disk.get("size", "0G").upper().rstrip("G")
-            size_gb = int(float(size_str)) if size_str.replace('.', '', 1).isdigit() else 0
-            cur.execute("""
-                INSERT INTO disk (pc_id, size_gb, model, serial, path)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                pc_id,
-                size_gb,
-                disk.get("model"),
-                disk.get("serial"),
-                disk.get("path")
-            ))
+        if section in CHILD_SECTIONS:
+            table, columns = CHILD_SECTIONS[section]
+            cur.execute(f"DELETE FROM {table} WHERE pc_id = ?", (pc_id,))
+            cur.executemany(
+                f"INSERT INTO {table} (pc_id, {', '.join(columns)}) VALUES (?, {', '.join('?' * len(columns))})",
+                [(pc_id, *row) for row in rows]
+            )
+        cur.execute("""
+            INSERT INTO pc_section_hash (pc_id, section, hash) VALUES (?, ?, ?)
+            ON CONFLICT(pc_id, section) DO UPDATE SET hash = excluded.hash
+        """, (pc_id, section, digest))
+        record_change(cur, pc_id, section, stored_hashes.get(section), digest, rows)
 
-    conn.commit()
-    conn.close()
+    # Only move the /stats rollups if this PC's contribution changed
+    updated_contributions = pc_contributions(cur, pc_id)
+    if updated_contributions != contributions:
+        apply_contributions(cur, contributions, -1)
+        apply_contributions(cur, updated_contributions, 1)
+
+    refresh_search_document(cur, pc_id)
+    publish(cur, "pc_upserted", pc_summary(cur, pc_id))
+    bump_data_version(cur)
+    return pc_id
+
+
+def log_failed_write(pc_id, future):
+    """Log a queued submission that was answered 202 but never written."""
+    if future.exception() is not None:
+        app.logger.error("Queued submission for PC %s was dropped: %r", pc_id, future.exception())
+
+
+@app.route('/submit', methods=['POST'])
+def submit():
+    """Queue a submission for the writer thread and answer 202 right away.
+
+    With ``?sync=1`` the response waits until the submission is committed,
+    for callers that read their own write straight after.
+    """
+    data = request.get_json()
+    serial = data.get("serial", "")
+    if not serial:
+        return jsonify({"error": "Missing serial"}), 400
+    pc_id = hash_serial(serial)
+
+    # Heartbeats and partial submissions need a stored PC; tell the agent now
+    # rather than failing later in the writer thread.
+    if set(data) <= HEARTBEAT_FIELDS or data.get("partial"):
+        cur = get_db().cursor()
+        cur.execute("SELECT id FROM pc WHERE id = ?", (pc_id,))
+        if not cur.fetchone():
+            return jsonify({"error": "Unknown PC, send a full submission", "pc_id": pc_id}), 409
+
+    try:
+        future = get_write_queue().put(lambda cur: merge_submission(cur, data))
+    except WriteQueueFull:
+        response = jsonify({"error": "Too many pending submissions, retry later"})
+        response.headers['Retry-After'] = str(WRITE_QUEUE_RETRY_AFTER)
+        return response, 429
+
+    if request.args.get('sync') not in ('1', 'true'):
+        future.add_done_callback(functools.partial(log_failed_write, pc_id))
+        return jsonify({"status": "queued", "pc_id": pc_id}), 202
+
+    try:
+        future.result(timeout=SYNC_SUBMIT_TIMEOUT)
+    except FutureTimeoutError:
+        future.add_done_callback(functools.partial(log_failed_write, pc_id))
+        return jsonify({"status": "queued", "pc_id": pc_id}), 202
+    except UnknownPC:
+        return jsonify({"error": "Unknown PC, send a full submission", "pc_id": pc_id}), 409
+    except sqlite3.Error as e:
+        if is_lock_error(e):
+            raise
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
 
     return jsonify({"status": "success", "pc_id": pc_id})
 
+
+MAX_BATCH_ITEMS = 20000
+# Items committed per transaction by /submit/batch, so the write lock is
+# held for well under BUSY_TIMEOUT_MS and other writers get their turn
+BATCH_CHUNK_SIZE = 500
+
+
+def batch_items():
+    """Yield the payloads of a /submit/batch body: a JSON array or NDJSON lines.
+
+    NDJSON is parsed line by line as it is read; a line that is not valid
+    JSON yields None so it is reported against its index. Raises BadRequest
+    past MAX_BATCH_ITEMS (up front for a JSON array).
+    """
+    if request.mimetype == 'application/x-ndjson':
+        count = 0
+        for line in request.stream:
+            if not line.strip():
+                continue
+            count += 1
+            if count > MAX_BATCH_ITEMS:
+                raise BadRequest(f"At most {MAX_BATCH_ITEMS} items per batch")
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+        return
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise BadRequest("Expected a JSON array or application/x-ndjson body")
+    if len(data) > MAX_BATCH_ITEMS:
+        raise BadRequest(f"At most {MAX_BATCH_ITEMS} items per batch")
+    yield from data
+
+
+@app.route('/submit/batch', methods=['POST'])
+def submit_batch():
+    """Apply many ``/submit`` payloads (e.g. gathered by a site relay).
+
+    Items are committed in chunks of BATCH_CHUNK_SIZE, one transaction each,
+    and each item runs inside its own savepoint, so a bad item is rolled back
+    and reported without affecting the others. Returns one result per applied
+    item, in order. If the write lock cannot be had (another writer holds it
+    past the busy timeout) the answer is a retryable 503; the results then
+    cover the chunks already committed and the rest is to be resent.
+    """
+    conn = get_db()
+    cur = conn.cursor()
+    items = enumerate(batch_items())
+    results = []
+    try:
+        while chunk := list(itertools.islice(items, BATCH_CHUNK_SIZE)):
+            begin_write(cur)
+            chunk_results = apply_batch(cur, chunk)
+            conn.commit()
+            results += chunk_results
+            event_bus.wake()
+    except sqlite3.OperationalError as e:
+        if not is_lock_error(e):
+            raise
+        if conn.in_transaction:
+            conn.rollback()
+        response = batch_response(results, f"Database is busy, resend the items from index {len(results)}")
+        response.headers['Retry-After'] = str(WRITE_QUEUE_RETRY_AFTER)
+        return response, 503
+    except BadRequest as e:
+        if not results:
+            raise
+        return batch_response(results, f"{e}; items from index {len(results)} were not applied"), 400
+    return batch_response(results)
+
+
+def batch_response(results, error=None):
+    failed = sum(1 for result in results if "error" in result)
+    body = {"submitted": len(results) - failed, "failed": failed, "results": results}
+    if error is not None:
+        body["error"] = error
+    return jsonify(body)
+
+
+def begin_write(cur):
+    """Start a write transaction that holds the write lock from the first read.
+
+    Handlers that read state (e.g. a PC's /stats contributions) and write
+    based on it must call this first: in a deferred transaction another
+    writer can commit between the read and the first write, which then
+    fails with SQLITE_BUSY_SNAPSHOT or applies a stale delta. Lock errors
+    are answered with a retryable 503 (see handle_operational_error).
+    """
+    cur.execute("BEGIN IMMEDIATE")
+
+
+@app.errorhandler(sqlite3.OperationalError)
+def handle_operational_error(e):
+    if not is_lock_error(e):
+        raise e
+    response = jsonify({"error": "Database is busy, retry later"})
+    response.headers['Retry-After'] = str(WRITE_QUEUE_RETRY_AFTER)
+    return response, 503
+
+
+def apply_batch(cur, items) -> list:
+    """Merge (index, payload) pairs of a /submit/batch body inside an open transaction."""
+    results = []
+    for index, item in items:
+        if item is None:
+            results.append({"index": index, "error": "Invalid JSON"})
+            continue
+        if not isinstance(item, dict) or not item.get("serial"):
+            results.append({"index": index, "error": "Missing serial"})
+            continue
+
+        cur.execute("SAVEPOINT batch_item")
+        try:
+            pc_id = merge_submission(cur, item)
+        except UnknownPC as e:
+            cur.execute("ROLLBACK TO batch_item")
+            results.append({"index": index, "error": "Unknown PC, send a full submission", "pc_id": str(e)})
+        except (sqlite3.Error, ValueError, TypeError, AttributeError) as e:
+            if isinstance(e, sqlite3.OperationalError) and is_lock_error(e):
+                raise
+            cur.execute("ROLLBACK TO batch_item")
+            results.append({"index": index, "error": f"Invalid submission: {e}"})
+        else:
+            results.append({"index": index, "status": "success", "pc_id": pc_id})
+        cur.execute("RELEASE batch_item")
+    return results
+
+SORT_KEYS = ['submitted_at', 'host', 'cpu']
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+class BadRequest(ValueError):
+    """Invalid query parameters; reported to the client as a 400."""
+
+
+@app.errorhandler(BadRequest)
+def handle_bad_request(e):
+    return jsonify({"error": str(e)}), 400
+
+
+def encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except ValueError:
+        raise BadRequest("Invalid after cursor")
+
+
+def keyset_condition(column: str, descending: bool, value, pc_id: str):
+    """WHERE fragment for rows that come after (value, pc_id) in the listing order.
+
+    SQLite sorts NULLs first, so they lead an ascending listing and trail a
+    descending one; ``p.id`` breaks ties between equal sort values.
+    """
+    if descending:
+        if value is None:
+            return f"({column} IS NULL AND p.id < ?)", [pc_id]
+        return f"({column} < ? OR ({column} = ? AND p.id < ?) OR {column} IS NULL)", [value, value, pc_id]
+    if value is None:
+        return f"(({column} IS NULL AND p.id > ?) OR {column} IS NOT NULL)", [pc_id]
+    return f"({column} > ? OR ({column} = ? AND p.id > ?))", [value, value, pc_id]
+
+
+# A /pcs entry (also sent with pc_upserted events) as a JSON document. SQLite
+# builds it, tags included, so listings are joined into the response as
+# they are instead of going through a dict per row.
+PC_LISTING_JSON = """
+    json_object(
+        'id', p.id, 'host', p.host, 'cpu', p.cpu, 'ram_total_gb', p.ram_total_gb, 'submitted_at', p.submitted_at,
+        'tags', json((SELECT json_group_array(json_object('name', t.name, 'color', t.color))
+                      FROM pc_tag pt JOIN tag t ON pt.tag_id = t.id
+                      WHERE pt.pc_id = p.id))
+    )
+"""
+
+
+def pc_summary(cur, pc_id) -> dict:
+    """The /pcs entry of one PC."""
+    cur.execute(f"SELECT {PC_LISTING_JSON} FROM pc p WHERE p.id = ?", (pc_id,))
+    return json.loads(cur.fetchone()[0])
+
+
 @app.route('/pcs', methods=['GET'])
+@cached_read
 def get_all_pcs():
-    conn = sqlite3.connect(DB_PATH)
+    """List PCs, optionally one keyset page at a time and/or as NDJSON.
+
+    ``tag`` filters by tag name and ``filter`` takes a filter expression
+    (see filters.py); both are applied in SQL.
+
+    ``limit`` caps the page size; when more rows follow, the response carries
+    an opaque ``X-Next-Cursor`` to pass back as ``after``. With
+    ``format=ndjson`` (or ``Accept: application/x-ndjson``) rows are streamed
+    one JSON object per line, followed by a ``{"next_cursor": ...}`` line when
+    the page was cut short.
+    """
+    conn = get_db()
     cur = conn.cursor()
     
     # Get sorting and filtering parameters
     sort_by = request.args.get('sort_by', 'submitted_at')  # Default sort by date
     sort_order = request.args.get('sort_order', 'desc')  # Default newest first
     tag_filter = request.args.get('tag')  # Optional tag filter
-    
-    # Build query with optional tag filtering
-    base_query = """
-        SELECT DISTINCT p.id, p.host, p.cpu, p.ram_total_gb, p.submitted_at,
-               GROUP_CONCAT(t.name) as tags,
-               GROUP_CONCAT(t.color) as tag_colors
-        FROM pc p
-        LEFT JOIN pc_tag pt ON p.id = pt.pc_id
-        LEFT JOIN tag t ON pt.tag_id = t.id
-    """
-    
+    filter_expression = request.args.get('filter')  # Optional filter expression, see filters.py
+    limit = request.args.get('limit', type=int)
+    after = request.args.get('after')
+    stream = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+
+    if sort_by not in SORT_KEYS:
+        sort_by = 'submitted_at'
+    descending = sort_order.lower() == 'desc'
+    direction = "DESC" if descending else "ASC"
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    conditions = []
     params = []
     if tag_filter:
-        base_query += " WHERE t.name = ?"
+        conditions.append("""EXISTS (
+            SELECT 1 FROM pc_tag pt JOIN tag t ON pt.tag_id = t.id
+            WHERE pt.pc_id = p.id AND t.name = ?
+        )""")
         params.append(tag_filter)
-    
-    base_query += " GROUP BY p.id"
-    
-    # Add sorting
-    if sort_by in ['submitted_at', 'host', 'cpu']:
-        order_clause = f" ORDER BY p.{sort_by}"
-        if sort_order.lower() == 'desc':
-            order_clause += " DESC"
-        else:
-            order_clause += " ASC"
-        base_query += order_clause
-    
-    cur.execute(base_query, params)
+
+    if filter_expression:
+        try:
+            condition, condition_params = compile_filter(filter_expression)
+        except FilterError as e:
+            raise BadRequest(f"Invalid filter: {e}")
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    if after:
+        cursor = decode_cursor(after)
+        if not (isinstance(cursor, list) and len(cursor) == 3
+                and isinstance(cursor[0], list) and len(cursor[0]) == 2
+                and isinstance(cursor[1], (str, int, float, type(None))) and isinstance(cursor[2], str)):
+            raise BadRequest("Invalid after cursor")
+        cursor_sort, cursor_value, cursor_id = cursor
+        if cursor_sort != [sort_by, direction]:
+            raise BadRequest("after cursor does not match the requested sort")
+        condition, condition_params = keyset_condition(f"p.{sort_by}", descending, cursor_value, cursor_id)
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order_clause = f"ORDER BY p.{sort_by} {direction}, p.id {direction}"
+    # Fetch one extra row to learn whether another page follows
+    params.append(limit + 1 if limit else -1)
+
+    # Tags come from correlated subqueries so the listing itself can walk the
+    # covering index for the sort key without grouping or a temp sort.
+    cur.execute(f"""
+        SELECT {PC_LISTING_JSON}, p.{sort_by}, p.id
+        FROM pc p
+        {where_clause}
+        {order_clause}
+        LIMIT ?
+    """, params)
+
+    def next_cursor(row):
+        return encode_cursor([[sort_by, direction], row[1], row[2]])
+
+    if stream:
+        def generate():
+            sent = 0
+            while True:
+                rows = cur.fetchmany(STREAM_CHUNK_SIZE)
+                if not rows:
+                    return
+                lines = []
+                for row in rows:
+                    if limit and sent == limit:
+                        lines.append(json.dumps({"next_cursor": next_cursor(last_row)}) + "\n")
+                        yield "".join(lines)
+                        return
+                    lines.append(row[0] + "\n")
+                    last_row = row
+                    sent += 1
+                yield "".join(lines)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
     rows = cur.fetchall()
-    
-    pcs = []
-    for row in rows:
-        pc_dict = dict(zip([column[0] for column in cur.description], row))
-        # Parse tags
-        if pc_dict['tags']:
-            tag_names = pc_dict['tags'].split(',')
-            tag_colors = pc_dict['tag_colors'].split(',')
-            pc_dict['tags'] = [{'name': name, 'color': color} for name, color in zip(tag_names, tag_colors)]
-        else:
-            pc_dict['tags'] = []
-        del pc_dict['tag_colors']
-        pcs.append(pc_dict)
-    
-    conn.close()
-    return jsonify(pcs)
+    page = rows[:limit] if limit else rows
+    with metrics.phase("json"):
+        response = Response(json_array(row[0] for row in page), mimetype='application/json')
+    if limit and len(rows) > limit:
+        response.headers['X-Next-Cursor'] = next_cursor(rows[limit - 1])
+    return response
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: all words must match, the last one as a prefix."""
+    tokens = [f'"{token}"' for token in re.findall(r"\w+", text)]
+    if tokens:
+        tokens[-1] += "*"
+    return " ".join(tokens)
+
+
+@app.route('/search', methods=['GET'])
+@cached_read
+def search_pcs():
+    """Full-text search over host, CPU, mainboard, notes, GPUs, RAM and disks, best match first."""
+    query = fts_query(request.args.get('q', ''))
+    limit = request.args.get('limit', 50, type=int)
+    if not query:
+        raise BadRequest("q is required")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    conn = get_db()
+    cur = conn.cursor()
+    # Rank and cut the matches first so the PC columns and tags are only
+    # looked up for the rows that are returned.
+    cur.execute(f"""
+        SELECT json_set({PC_LISTING_JSON}, '$.rank', m.rank)
+        FROM (
+            SELECT rowid, rank FROM pc_search
+            WHERE pc_search MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ) m
+        JOIN pc_search_doc d ON d.docid = m.rowid
+        JOIN pc p ON p.id = d.pc_id
+        ORDER BY m.rank
+    """, (query, limit))
+    with metrics.phase("json"):
+        return Response(json_array(row[0] for row in cur.fetchall()), mimetype='application/json')
+
+
+@app.route('/stats', methods=['GET'])
+@cached_read
+def fleet_stats():
+    """Fleet totals and breakdowns by RAM, disk size, CPU family, GPU model and tag."""
+    cur = get_db().cursor()
+    return jsonify(read_stats(cur))
+
+
+# Maximum number of ids bound into a single ``IN (...)`` clause. Older SQLite
+# builds cap host parameters at 999 per statement.
+DETAILS_CHUNK_SIZE = 500
+
+
+def load_pc_details(cur, pc_ids):
+    """Load full PC records (with GPUs, RAM sticks, disks and tags) for ``pc_ids``.
+
+    Runs one set-based query per table for every chunk of ids instead of one
+    round of queries per PC. Returns a dict keyed by PC id; unknown ids are
+    left out.
+    """
+    pcs = {}
+    pc_ids = list(dict.fromkeys(pc_ids))
+    for start in range(0, len(pc_ids), DETAILS_CHUNK_SIZE):
+        chunk = pc_ids[start:start + DETAILS_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+
+        cur.execute(f"SELECT id, host, serial, cpu, mainboard, ram_total_gb, ram_slots, resolution, notes, datetime(submitted_at, 'localtime') as submitted_at FROM pc WHERE id IN ({placeholders})", chunk)
+        columns = [column[0] for column in cur.description]
+        for row in cur.fetchall():
+            pc = dict(zip(columns, row))
+            pc["gpus"] = []
+            pc["ram_sticks"] = []
+            pc["disks"] = []
+            pc["tags"] = []
+            pcs[pc["id"]] = pc
+
+        cur.execute(f"SELECT pc_id, name FROM gpu WHERE pc_id IN ({placeholders}) ORDER BY id", chunk)
+        for pc_id, name in cur.fetchall():
+            if pc_id in pcs:
+                pcs[pc_id]["gpus"].append(name)
+
+        cur.execute(f"SELECT pc_id, size_gb, type, model FROM ram_stick WHERE pc_id IN ({placeholders}) ORDER BY id", chunk)
+        for pc_id, *r in cur.fetchall():
+            if pc_id in pcs:
+                pcs[pc_id]["ram_sticks"].append(dict(zip(["size_gb", "type", "model"], r)))
+
+        cur.execute(f"SELECT pc_id, size_gb, model, serial, path FROM disk WHERE pc_id IN ({placeholders}) ORDER BY id", chunk)
+        for pc_id, *r in cur.fetchall():
+            if pc_id in pcs:
+                pcs[pc_id]["disks"].append(dict(zip(["size_gb", "model", "serial", "path"], r)))
+
+        cur.execute(f"""
+            SELECT pt.pc_id, t.id, t.name, t.color
+            FROM tag t
+            JOIN pc_tag pt ON t.id = pt.tag_id
+            WHERE pt.pc_id IN ({placeholders})
+            ORDER BY t.name
+        """, chunk)
+        for pc_id, *r in cur.fetchall():
+            if pc_id in pcs:
+                pcs[pc_id]["tags"].append(dict(zip(["id", "name", "color"], r)))
+
+    return pcs
 
 
 @app.route('/pc/<pc_id>', methods=['GET'])
+@cached_read
 def get_pc_details(pc_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
 
-    # Main PC data
-    cur.execute("SELECT id, host, serial, cpu, mainboard, ram_total_gb, ram_slots, resolution, notes, datetime(submitted_at, 'localtime') as submitted_at FROM pc WHERE id = ?", (pc_id,))
-    row = cur.fetchone()
-    if not row:
+    pc = load_pc_details(cur, [pc_id]).get(pc_id)
+    if not pc:
         return jsonify({"error": "PC not found"}), 404
-    pc = dict(zip([column[0] for column in cur.description], row))
 
-    # Related data
-    cur.execute("SELECT name FROM gpu WHERE pc_id = ?", (pc_id,))
-    pc["gpus"] = [r[0] for r in cur.fetchall()]
-
-    cur.execute("SELECT size_gb, type, model FROM ram_stick WHERE pc_id = ?", (pc_id,))
-    pc["ram_sticks"] = [dict(zip(["size_gb", "type", "model"], r)) for r in cur.fetchall()]
+    return jsonify(pc)
 
-    cur.execute("SELECT size_gb, model, serial, path FROM disk WHERE pc_id = ?", (pc_id,))
-    pc["disks"] = [dict(zip(["size_gb", "model", "serial", "path"], r)) for r in cur.fetchall()]
 
-    # Tags data
+@app.route('/pc/<pc_id>/history', methods=['GET'])
+@cached_read
+def get_pc_history(pc_id):
+    """Hardware changes of one PC, newest first. The oldest entries record the hardware it was first seen with."""
+    conn = get_db()
+    cur = conn.cursor()
     cur.execute("""
-        SELECT t.id, t.name, t.color
-        FROM tag t
-        JOIN pc_tag pt ON t.id = pt.tag_id
-        WHERE pt.pc_id = ?
-        ORDER BY t.name
+        SELECT h.id, h.pc_id, p.host, h.section, h.old_hash, h.new_hash, h.changed_at
+        FROM pc_history h
+        LEFT JOIN pc p ON p.id = h.pc_id
+        WHERE h.pc_id = ?
+        ORDER BY h.id DESC
     """, (pc_id,))
-    pc["tags"] = [dict(zip(["id", "name", "color"], r)) for r in cur.fetchall()]
+    rows = cur.fetchall()
+    if not rows:
+        return jsonify({"error": "PC not found"}), 404
 
-    conn.close()
-    return jsonify(pc)
+    return jsonify(history_events(cur, rows))
+
+
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?')
+
+
+@app.route('/changes', methods=['GET'])
+@cached_read
+def get_changes():
+    """Fleet-wide feed of hardware changes at or after ``since`` (UTC), oldest first.
+
+    Pages like /pcs: pass the X-Next-Cursor header of one page as ``after``
+    to get the next one.
+    """
+    since = request.args.get('since', '')
+    limit = request.args.get('limit', 500, type=int)
+    after = request.args.get('after')
+    if not TIMESTAMP_PATTERN.fullmatch(since):
+        raise BadRequest("since must be a timestamp like 2024-05-01 or 2024-05-01 08:00:00")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    conditions = ["h.changed_at >= ?"]
+    params = [since.replace('T', ' ')]
+    if after:
+        cursor = decode_cursor(after)
+        if not isinstance(cursor, list) or len(cursor) != 2:
+            raise BadRequest("Invalid after cursor")
+        conditions.append("(h.changed_at > ? OR (h.changed_at = ? AND h.id > ?))")
+        params += [cursor[0], cursor[0], cursor[1]]
+
+    conn = get_db()
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT h.id, h.pc_id, p.host, h.section, h.old_hash, h.new_hash, h.changed_at
+        FROM pc_history h
+        LEFT JOIN pc p ON p.id = h.pc_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY h.changed_at, h.id
+        LIMIT ?
+    """, params + [limit + 1])
+    rows = cur.fetchall()
+
+    response = jsonify(history_events(cur, rows[:limit]))
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor([last[6], last[0]])
+    return response
+
+
+@app.route('/export', methods=['GET'])
+def export_inventory():
+    """Stream the whole inventory, or one child table, for bulk consumers; see export.py."""
+    table = request.args.get('table', 'pcs')
+    fmt = request.args.get('format', 'csv')
+    try:
+        check_export(table, fmt)
+    except ExportError as e:
+        raise BadRequest(str(e))
+
+    cur = get_db().cursor()
+    mimetype, extension, _ = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(export_stream(cur, table, fmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="hwdb-{table}.{extension}"'
+    return response
+
+
+@app.route('/pcs/details', methods=['POST'])
+def get_pcs_details():
+    """Return full details for a list of PC ids in one call, in request order."""
+    data = request.get_json(silent=True) or {}
+    pc_ids = data.get("ids")
+
+    if not isinstance(pc_ids, list) or not all(isinstance(pc_id, str) for pc_id in pc_ids):
+        return jsonify({"error": "ids must be a list of PC ids"}), 400
+
+    conn = get_db()
+    cur = conn.cursor()
+    pcs = load_pc_details(cur, pc_ids)
+
+    return jsonify([pcs[pc_id] for pc_id in dict.fromkeys(pc_ids) if pc_id in pcs])
 
 
 @app.route('/pc/<pc_id>/delete', methods=['DELETE'])
 def delete_pc(pc_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
+    begin_write(cur)
 
     try:
         # Check if PC exists
         cur.execute("SELECT id FROM pc WHERE id = ?", (pc_id,))
         if not cur.fetchone():
-            conn.close()
             return jsonify({"error": "PC not found"}), 404
 
+        apply_contributions(cur, pc_contributions(cur, pc_id), -1)
+
         # Delete related records first due to foreign key constraints
         cur.execute("DELETE FROM gpu WHERE pc_id = ?", (pc_id,))
         cur.execute("DELETE FROM ram_stick WHERE pc_id = ?", (pc_id,))
@@ -664,23 +1435,24 @@ def delete_pc(pc_id):
         # Delete the PC record
         cur.execute("DELETE FROM pc WHERE id = ?", (pc_id,))
         
+        publish(cur, "pc_deleted", {"pc_id": pc_id})
+        bump_data_version(cur)
         conn.commit()
+        event_bus.wake()
         return jsonify({"status": "success", "message": "PC and all related data deleted successfully"})
     
     except sqlite3.Error as e:
         conn.rollback()
         return jsonify({"error": f"Database error: {str(e)}"}), 500
-    finally:
-        conn.close()
 
 # Tag management endpoints
 @app.route('/tags', methods=['GET'])
+@cached_read
 def get_all_tags():
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     cur.execute("SELECT id, name, color FROM tag ORDER BY name")
     tags = [dict(zip([column[0] for column in cur.description], row)) for row in cur.fetchall()]
-    conn.close()
     return jsonify(tags)
 
 @app.route('/tags', methods=['POST'])
@@ -692,34 +1464,46 @@ def create_tag():
     if not name:
         return jsonify({"error": "Tag name is required"}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     try:
         cur.execute("INSERT INTO tag (name, color) VALUES (?, ?)", (name, color))
         tag_id = cur.lastrowid
+        publish(cur, "tag_created", {"id": tag_id, "name": name, "color": color})
+        bump_data_version(cur)
         conn.commit()
-        conn.close()
+        event_bus.wake()
         return jsonify({"id": tag_id, "name": name, "color": color}), 201
     except sqlite3.IntegrityError:
-        conn.close()
         return jsonify({"error": "Tag name already exists"}), 409
 
 @app.route('/tags/<int:tag_id>', methods=['DELETE'])
 def delete_tag(tag_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
+    begin_write(cur)
     
     # Check if tag exists
-    cur.execute("SELECT id FROM tag WHERE id = ?", (tag_id,))
-    if not cur.fetchone():
-        conn.close()
+    cur.execute("SELECT id, name, color FROM tag WHERE id = ?", (tag_id,))
+    tag = cur.fetchone()
+    if not tag:
         return jsonify({"error": "Tag not found"}), 404
     
+    # Move the tagged PCs' /stats contributions off the deleted tag
+    cur.execute("SELECT pc_id FROM pc_tag WHERE tag_id = ?", (tag_id,))
+    pc_ids = [pc_id for (pc_id,) in cur.fetchall()]
+    for pc_id in pc_ids:
+        apply_contributions(cur, pc_contributions(cur, pc_id), -1)
+
     # Delete tag (cascade will handle pc_tag relationships)
     cur.execute("DELETE FROM tag WHERE id = ?", (tag_id,))
+    for pc_id in pc_ids:
+        apply_contributions(cur, pc_contributions(cur, pc_id), 1)
+    publish(cur, "tag_deleted", dict(zip(("id", "name", "color"), tag)))
+    bump_data_version(cur)
     conn.commit()
-    conn.close()
+    event_bus.wake()
     
     return jsonify({"status": "success", "message": "Tag deleted successfully"})
 
@@ -731,50 +1515,60 @@ def add_tag_to_pc(pc_id):
     if not tag_id:
         return jsonify({"error": "tag_id is required"}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
+    begin_write(cur)
     
     # Check if PC exists
     cur.execute("SELECT id FROM pc WHERE id = ?", (pc_id,))
     if not cur.fetchone():
-        conn.close()
         return jsonify({"error": "PC not found"}), 404
     
     # Check if tag exists
-    cur.execute("SELECT id FROM tag WHERE id = ?", (tag_id,))
-    if not cur.fetchone():
-        conn.close()
+    cur.execute("SELECT id, name, color FROM tag WHERE id = ?", (tag_id,))
+    tag = cur.fetchone()
+    if not tag:
         return jsonify({"error": "Tag not found"}), 404
     
     try:
-        cur.execute("INSERT INTO pc_tag (pc_id, tag_id) VALUES (?, ?)", (pc_id, tag_id))
+        with track_pc(cur, pc_id):
+            cur.execute("INSERT INTO pc_tag (pc_id, tag_id) VALUES (?, ?)", (pc_id, tag_id))
+        publish(cur, "tag_attached", {"pc_id": pc_id, "tag": dict(zip(("id", "name", "color"), tag))})
+        bump_data_version(cur)
         conn.commit()
-        conn.close()
+        event_bus.wake()
         return jsonify({"status": "success", "message": "Tag added to PC"})
     except sqlite3.IntegrityError:
-        conn.close()
         return jsonify({"error": "Tag already assigned to this PC"}), 409
 
 @app.route('/pc/<pc_id>/tags/<int:tag_id>', methods=['DELETE'])
 def remove_tag_from_pc(pc_id, tag_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
+    begin_write(cur)
     
+    cur.execute("SELECT id, name, color FROM tag WHERE id = ?", (tag_id,))
+    tag = cur.fetchone()
+
     # Remove tag from PC
-    cur.execute("DELETE FROM pc_tag WHERE pc_id = ? AND tag_id = ?", (pc_id, tag_id))
-    
-    if cur.rowcount == 0:
-        conn.close()
+    with track_pc(cur, pc_id):
+        cur.execute("DELETE FROM pc_tag WHERE pc_id = ? AND tag_id = ?", (pc_id, tag_id))
+        removed = cur.rowcount
+
+    if removed == 0:
         return jsonify({"error": "Tag not found on this PC"}), 404
     
+    publish(cur, "tag_detached", {"pc_id": pc_id, "tag": dict(zip(("id", "name", "color"), tag))})
+    bump_data_version(cur)
     conn.commit()
-    conn.close()
+    event_bus.wake()
     
     return jsonify({"status": "success", "message": "Tag removed from PC"})
 
 @app.route('/pc/<pc_id>/tags', methods=['GET'])
+@cached_read
 def get_pc_tags(pc_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     cur.execute("""
@@ -786,15 +1580,61 @@ def get_pc_tags(pc_id):
     """, (pc_id,))
     
     tags = [dict(zip([column[0] for column in cur.description], row)) for row in cur.fetchall()]
-    conn.close()
     return jsonify(tags)
 
+SSE_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+SSE_RETRY_AFTER = 30  # seconds, sent with 503 responses when all stream slots are taken
+# Only MAX_EVENT_STREAMS of each worker's threads may serve streams (see sizing.py)
+event_stream_slots = threading.BoundedSemaphore(MAX_EVENT_STREAMS)
+
+
+@app.route('/events', methods=['GET'])
+def stream_events():
+    """Server-Sent Events stream of changes: pc_upserted, pc_deleted, notes_updated,
+    tag_attached, tag_detached, tag_created and tag_deleted.
+
+    Reconnecting clients send Last-Event-ID and get the events they missed,
+    or a ``reset`` event if those are too old to replay. Beyond
+    MAX_EVENT_STREAMS open streams per worker the answer is 503.
+    """
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    if last_event_id is not None:
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            raise BadRequest("Invalid Last-Event-ID")
+    if not event_stream_slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many open event streams, retry later"})
+        response.headers['Retry-After'] = str(SSE_RETRY_AFTER)
+        return response, 503
+    events = event_bus.subscribe(last_event_id, heartbeat=SSE_HEARTBEAT)
+
+    def generate():
+        yield "retry: 3000\n\n"
+        for event in events:
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                event_id, event_type, data = event
+                yield f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Runs when the server closes the response, whether or not the stream started
+    response.call_on_close(event_stream_slots.release)
+    return response
+
+
 @app.route('/')
 def dashboard():
     return render_template_string(DASHBOARD_TEMPLATE)
 
 
 if __name__ == "__main__":
-    if not os.path.exists(DB_PATH):
-        init_db()
+    # Development server only; production runs create_app() under gunicorn.
+    # The schema only uses IF NOT EXISTS, so this also adds tables introduced
+    # after the database was first created.
+    init_db()
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for hwinfo-db.
+
+Builds a synthetic fleet database of ``SystemInfo.to_dict()`` shaped PCs
+(with GPU, RAM, disk and tag fan-out), then times the API routes and reports
+p50/p95/p99 latency and throughput per scenario. Results are saved as JSON
+so runs can be compared across changes.
+
+Usage:
+    python bench.py --fleet 10000                             # each scenario in turn, Flask test client
+    python bench.py --fleet 10000 --clients 8 --duration 30   # mixed load from 8 client threads
+    python bench.py --fleet 10000 --compare bench-old.json    # print the change against an earlier run
+    python bench.py --fleet 10000 --url http://localhost:5000 --clients 16
+
+The fleet is generated once into bench-fleet-<size>.db and reused; every
+test client run works on a fresh copy of it, so writes made by one run never
+skew the next. ``--url`` drives a running server instead, which must be
+serving that fleet database (e.g. ``HWDB_DB_PATH=bench-fleet-10000.db``).
+
+Read routes are answered from the response cache when nothing changed in
+between; test client runs clear it before every request unless ``--warm``
+is given, so the numbers measure the queries themselves.
+"""
+
+import argparse
+import collections
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+import app as hwdb
+from stats import rebuild_rollups
+
+HOSTS = [
+    ("LENOVO", "10MQS0KE00", "3102"), ("LENOVO", "11DT0046GE", "3130"), ("LENOVO", "20L7S0KN00", "20L7S0KN00"),
+    ("Dell Inc.", "OptiPlex 7070", "0YNVJG"), ("Dell Inc.", "OptiPlex 3080", "0M5NJ4"),
+    ("Dell Inc.", "Latitude 5420", "0K6XRV"), ("HP", "EliteDesk 800 G4 DM 65W", "83E0"),
+    ("HP", "ProDesk 400 G6 SFF", "8715"), ("ASUS", "System Product Name", "PRIME B450M-A"),
+    ("Micro-Star International Co., Ltd.", "MS-7C56", "B550-A PRO (MS-7C56)"), ("QEMU", "Standard PC (Q35 + ICH9, 2009)", None),
+]
+
+CPUS = [
+    ("Intel(R) Core(TM) i5-8500T CPU @ 2.10GHz", ["UHD Graphics 630"]),
+    ("Intel(R) Core(TM) i7-9700 CPU @ 3.00GHz", ["UHD Graphics 630"]),
+    ("Intel(R) Core(TM) i3-10100 CPU @ 3.60GHz", ["CometLake-S GT2 [UHD Graphics 630]"]),
+    ("11th Gen Intel(R) Core(TM) i5-1145G7 @ 2.60GHz", ["TigerLake-LP GT2 [Iris Xe Graphics]"]),
+    ("12th Gen Intel(R) Core(TM) i7-12700", ["AlderLake-S GT1 [UHD Graphics 770]"]),
+    ("AMD Ryzen 5 3600 6-Core Processor", []),
+    ("AMD Ryzen 5 5600G with Radeon Graphics", ["Cezanne [Radeon Vega Series / Radeon Vega Mobile Series]"]),
+    ("AMD Ryzen 7 5800X 8-Core Processor", []),
+    ("Intel(R) Xeon(R) E-2236 CPU @ 3.40GHz", []),
+]
+
+DISCRETE_GPUS = [
+    "GA106 [GeForce RTX 3060 Lite Hash Rate]", "TU117 [GeForce GTX 1650]", "GP107 [GeForce GTX 1050 Ti]",
+    "Navi 23 [Radeon RX 6600/6600 XT/6600M]", "AD104 [GeForce RTX 4070]", "GK208B [GeForce GT 710]",
+]
+
+RAM_MODULES = [
+    ("SODIMM DDR4 Synchronous 2667 MHz", "M471A1K43CB1-CTD", 8),
+    ("SODIMM DDR4 Synchronous 3200 MHz", "M471A2K43DB1-CWE", 16),
+    ("DIMM DDR4 Synchronous 2666 MHz", "HMA81GU6CJR8N-VK", 8),
+    ("DIMM DDR4 Synchronous 3200 MHz", "KHX3200C16D4/16GX", 16),
+    ("DIMM DDR4 Synchronous 2400 MHz", "CT4G4DFS824A.C8FBD1", 4),
+    ("DIMM DDR5 Synchronous 4800 MHz", "M323R4GA3BB0-CQKOL", 32),
+]
+
+DISKS = [
+    ("SAMSUNG MZVLB256HAHQ", "238G", "S4DXNX0M"), ("SAMSUNG MZVL2512HCJQ", "476G", "S675NX0R"),
+    ("WDC WD10EZEX-08WN4A0", "931G", "WD-WCC6Y"), ("ST2000DM008-2FR102", "1863G", "ZFL"),
+    ("KINGSTON SA400S37240G", "223G", "50026B77"), ("Samsung SSD 870 EVO 1TB", "931G", "S6PUNX0T"),
+    ("CT500MX500SSD1", "465G", "2031E4A"),
+]
+
+MONITORS = [
+    "DELL P2419H: 1920x1080 @ 60 Hz in 24\"", "HP E24 G4: 1920x1080 @ 60 Hz in 24\"",
+    "LG ULTRAGEAR: 2560x1440 @ 144 Hz in 27\"", "DELL U2720Q: 3840x2160 @ 60 Hz in 27\"",
+    "Lenovo L24e-30: 1920x1080 @ 75 Hz in 24\"",
+]
+
+TAGS = [
+    ("Office", "#228BE6"), ("Lab", "#40C057"), ("Server", "#FA5252"), ("Reception", "#FD7E14"),
+    ("Warehouse", "#7950F2"), ("Classroom", "#15AABF"), ("Spare", "#868E96"), ("Repair", "#E64980"),
+]
+
+BENCH_TAG = ("Benchmark", "#000000")
+
+FILTERS = {
+    "ram": "ram_total_gb >= 16",
+    "gpu": 'gpu ~ "RTX"',
+    "disk": "disk.size_gb > 1000",
+    "tags": "tag in (Lab, Server)",
+    "recent": "submitted_at newer than 7d",
+    "combined": 'ram_total_gb >= 16 and gpu ~ "GeForce" and not tag = Spare',
+}
+
+PAGE_SIZE = 100
+BUILD_CHUNK = 1000
+SUBMITTED_SPREAD_DAYS = 90
+DETACH_LAG = 16  # benchmark tags left attached, see Fleet.detach
+
+
+def serial_of(seed, index) -> str:
+    return f"BENCH-{seed}-{index:07d}"
+
+
+def make_pc(seed, index) -> dict:
+    """The submission of fleet PC ``index``; the same seed always gives the same PC."""
+    rng = random.Random(f"{seed}-{index}")
+    vendor, product, board = rng.choice(HOSTS)
+    cpu, integrated = rng.choice(CPUS)
+    gpus = list(integrated)
+    if not gpus or rng.random() < 0.25:
+        gpus.append(rng.choice(DISCRETE_GPUS))
+
+    slots = rng.choice([2, 2, 4])
+    ram_type, ram_model, size_gb = rng.choice(RAM_MODULES)
+    sticks = [{"size_gb": size_gb, "type": ram_type, "model": ram_model}
+              for _ in range(rng.choice([1, 2, 2, slots]))]
+
+    disks = []
+    for number in range(rng.choice([1, 1, 2, 3])):
+        model, size, serial_prefix = rng.choice(DISKS)
+        path = f"/dev/nvme{number}n1" if model.startswith("SAMSUNG MZ") else f"/dev/sd{'abc'[number]}"
+        disks.append({"path": path, "size": size, "model": model, "serial": f"{serial_prefix}{rng.randrange(10**6):06d}"})
+
+    monitors = rng.sample(MONITORS, rng.choice([1, 1, 2]))
+    return {
+        "host": f"{vendor} {product}",
+        "serial": serial_of(seed, index),
+        "mainboard": board,
+        "cpu": cpu,
+        "gpus": gpus,
+        "resolution": ", ".join(f"[External] {monitor}" for monitor in monitors),
+        "ram": {"total_size_gb": size_gb * len(sticks), "slots": f"{len(sticks)} / {slots}", "sticks": sticks},
+        "disks": disks,
+    }
+
+
+def build_fleet(path, size, seed):
+    """Create the fleet database at ``path`` through /submit/batch, then tag it."""
+    hwdb.DB_PATH = path
+    hwdb.init_db()
+    client = hwdb.app.test_client()
+    for start in range(0, size, BUILD_CHUNK):
+        batch = [make_pc(seed, index) for index in range(start, min(start + BUILD_CHUNK, size))]
+        result = client.post('/submit/batch', json=batch).get_json()
+        if result["failed"]:
+            raise SystemExit(f"Fleet build failed: {result['results'][:3]}")
+        print(f"  {start + len(batch)}/{size} PCs", file=sys.stderr)
+    for name, color in TAGS + [BENCH_TAG]:
+        client.post('/tags', json={"name": name, "color": color})
+    hwdb.get_write_queue().stop()
+    hwdb.write_queue = None
+    hwdb.pool.close()
+    hwdb.pool = None
+
+    # Tags and submission dates are set in bulk; going through the API for
+    # every PC would make a 100k fleet take minutes to build.
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    tag_ids = [row[0] for row in cur.execute("SELECT id FROM tag WHERE name != ?", (BENCH_TAG[0],))]
+    now = datetime.now(timezone.utc)
+    pc_tags, dates = [], []
+    for index in range(size):
+        pc_id = hwdb.hash_serial(serial_of(seed, index))
+        pc_tags.extend((pc_id, tag_id) for tag_id in rng.sample(tag_ids, rng.choice([0, 1, 1, 1, 2])))
+        submitted_at = now - timedelta(seconds=rng.randrange(SUBMITTED_SPREAD_DAYS * 86400))
+        dates.append((submitted_at.strftime('%Y-%m-%d %H:%M:%S'), pc_id))
+    cur.execute("BEGIN")
+    cur.executemany("INSERT INTO pc_tag (pc_id, tag_id) VALUES (?, ?)", pc_tags)
+    cur.executemany("UPDATE pc SET submitted_at = ? WHERE id = ?", dates)
+    rebuild_rollups(cur)
+    hwdb.bump_data_version(cur)
+    conn.commit()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def copy_database(source, target):
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+
+class HttpClient:
+    """Minimal stand-in for the Flask test client against a running server."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+
+    def open(self, path, method='GET', json=None):
+        response = self.session.request(method, self.base_url + path, json=json)
+        response.data = response.content
+        return response
+
+
+class Fleet:
+    """Shared state the scenarios draw their requests from."""
+
+    def __init__(self, size, seed, tag_ids, tag_names, bench_tag_id):
+        self.size = size
+        self.seed = seed
+        self.tag_ids = tag_ids
+        self.tag_names = tag_names
+        self.bench_tag_id = bench_tag_id
+        self.pc_ids = [hwdb.hash_serial(serial_of(seed, index)) for index in range(size)]
+        self.tagged = set()
+        self.tag_order = collections.deque()
+        self.next_new = size
+        self.lock = threading.Lock()
+
+    def new_index(self):
+        with self.lock:
+            self.next_new += 1
+            return self.next_new - 1
+
+    def attach(self, rng):
+        """A PC that does not carry the benchmark tag yet, now marked as carrying it."""
+        with self.lock:
+            while True:
+                pc_id = rng.choice(self.pc_ids)
+                if pc_id not in self.tagged:
+                    self.tagged.add(pc_id)
+                    self.tag_order.append(pc_id)
+                    return pc_id
+
+    def detach(self):
+        """The PC tagged longest ago, so its attach request has finished even under load."""
+        with self.lock:
+            if len(self.tag_order) <= DETACH_LAG:
+                return None
+            pc_id = self.tag_order.popleft()
+            self.tagged.discard(pc_id)
+            return pc_id
+
+
+def changed_submission(fleet, rng):
+    index = rng.randrange(fleet.size)
+    pc = make_pc(fleet.seed, index)
+    pc["resolution"] = f"[External] {rng.choice(MONITORS)}"
+    return 'POST', '/submit?sync=1', pc
+
+
+def partial_submission(fleet, rng):
+    index = rng.randrange(fleet.size)
+    disks = make_pc(fleet.seed, index)["disks"]
+    disks[0]["serial"] = f"SWAP{rng.randrange(10**8):08d}"
+    return 'POST', '/submit?sync=1', {"serial": serial_of(fleet.seed, index), "partial": True, "disks": disks}
+
+
+def detach_request(fleet):
+    pc_id = fleet.detach()
+    return pc_id and ('DELETE', f'/pc/{pc_id}/tags/{fleet.bench_tag_id}', None)
+
+
+def scenarios(fleet):
+    """name -> (load mix weight, request factory taking an RNG)."""
+    table = {
+        "submit_changed": (3, lambda rng: changed_submission(fleet, rng)),
+        "submit_partial": (3, lambda rng: partial_submission(fleet, rng)),
+        "submit_heartbeat": (5, lambda rng: ('POST', '/submit?sync=1',
+                                             {"serial": serial_of(fleet.seed, rng.randrange(fleet.size))})),
+        "submit_new": (1, lambda rng: ('POST', '/submit?sync=1', make_pc(fleet.seed, fleet.new_index()))),
+    }
+    for sort_by in hwdb.SORT_KEYS:
+        for sort_order in ('asc', 'desc'):
+            path = f'/pcs?sort_by={sort_by}&sort_order={sort_order}&limit={PAGE_SIZE}'
+            table[f"pcs_{sort_by}_{sort_order}"] = (5, lambda rng, path=path: ('GET', path, None))
+    table["pcs_tag"] = (3, lambda rng: ('GET', f'/pcs?tag={rng.choice(fleet.tag_names)}&limit={PAGE_SIZE}', None))
+    for name, expression in FILTERS.items():
+        table[f"pcs_filter_{name}"] = (2, lambda rng, expression=expression: (
+            'GET', f'/pcs?limit={PAGE_SIZE}&filter={expression}', None))
+    table.update({
+        "pc_details": (15, lambda rng: ('GET', f'/pc/{rng.choice(fleet.pc_ids)}', None)),
+        "pcs_details_batch": (10, lambda rng: ('POST', '/pcs/details', {"ids": rng.sample(fleet.pc_ids, PAGE_SIZE)})),
+        "tags": (10, lambda rng: ('GET', '/tags', None)),
+        "pc_tags": (10, lambda rng: ('GET', f'/pc/{rng.choice(fleet.pc_ids)}/tags', None)),
+        "tag_attach": (2, lambda rng: ('POST', f'/pc/{fleet.attach(rng)}/tags', {"tag_id": fleet.bench_tag_id})),
+        "tag_detach": (2, lambda rng: detach_request(fleet)),
+    })
+    return table
+
+
+def timed_call(client, request, clear_cache):
+    method, path, body = request
+    if clear_cache:
+        hwdb.response_cache.clear()
+    start = time.perf_counter()
+    response = client.open(path, method=method, json=body)
+    elapsed = time.perf_counter() - start
+    return elapsed, response.status_code < 400, len(response.data)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(samples, wall_time):
+    """Latency percentiles (ms) and throughput (requests/s) of (seconds, ok, bytes) samples."""
+    latencies = sorted(sample[0] for sample in samples)
+    if not latencies:
+        return {"requests": 0}
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not sample[1]),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "response_bytes": round(sum(sample[2] for sample in samples) / len(samples)),
+        "throughput_rps": round(len(samples) / wall_time, 1) if wall_time else None,
+    }
+
+
+def run_sequential(client, table, requests, warmup, seed, clear_cache):
+    """Every scenario on its own, one request at a time."""
+    rng = random.Random(seed)
+    results = {}
+    for name, (_, factory) in table.items():
+        for _ in range(warmup):
+            request = factory(rng)
+            if request:
+                timed_call(client, request, clear_cache)
+        samples = []
+        for _ in range(requests):
+            request = factory(rng)
+            if request:
+                samples.append(timed_call(client, request, clear_cache))
+        results[name] = summarize(samples, sum(sample[0] for sample in samples))
+        print(f"  {name:28} p50 {results[name].get('p50_ms', 0):9.2f} ms  p99 {results[name].get('p99_ms', 0):9.2f} ms",
+              file=sys.stderr)
+    return results
+
+
+def run_load(make_client, table, clients, duration, seed, clear_cache):
+    """A weighted mix of all scenarios from ``clients`` threads for ``duration`` seconds."""
+    names = list(table)
+    weights = [table[name][0] for name in names]
+    samples = {name: [] for name in names}
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        client = make_client()
+        rng = random.Random(f"{seed}-client-{number}")
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            request = table[name][1](rng)
+            if request:
+                sample = timed_call(client, request, clear_cache)
+                samples[name].append(sample)  # list.append is atomic
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+
+    results = {name: summarize(entries, wall_time) for name, entries in samples.items() if entries}
+    results["total"] = summarize([sample for entries in samples.values() for sample in entries], wall_time)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_summary(results):
+    print(f"{'scenario':28} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'req/s':>10} {'errors':>8}")
+    for name, current in results.items():
+        if not current.get("requests"):
+            continue
+        cells = [f"{current.get(key)!s:>10}" for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")]
+        print(f"{name:28} {' '.join(cells)} {current['errors']:>8}")
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    print(f"{'scenario':28} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'req/s':>18}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or not current.get("requests"):
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            old, new = previous.get(key), current.get(key)
+            change = f"{(new - old) / old * 100:+.0f}%" if old and new is not None else "n/a"
+            cells.append(f"{new:>10} {change:>7}")
+        print(f"{name:28} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fleet', type=int, default=1000, help="Number of PCs in the synthetic fleet (default 1000)")
+    parser.add_argument('--seed', type=int, default=1, help="Fleet and request seed (default 1)")
+    parser.add_argument('--db', help="Fleet database file (default bench-fleet-<size>.db)")
+    parser.add_argument('--rebuild', action='store_true', help="Regenerate the fleet database even if it exists")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per scenario in sequential mode")
+    parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per scenario before measuring")
+    parser.add_argument('--clients', type=int, default=0, help="Run the mixed load with this many client threads")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run the mixed load for")
+    parser.add_argument('--scenario', action='append', help="Only run scenarios starting with this prefix (repeatable)")
+    parser.add_argument('--url', help="Benchmark a running server instead of the Flask test client")
+    parser.add_argument('--warm', action='store_true', help="Keep the response cache between requests")
+    parser.add_argument('--output', help="Results file (default bench-<fleet>-<mode>-<timestamp>.json)")
+    parser.add_argument('--compare', help="Earlier results file to compare this run against")
+    parser.add_argument('--print-json', action='store_true', help="Also print the results as JSON on stdout")
+    args = parser.parse_args()
+
+    fleet_path = args.db or f"bench-fleet-{args.fleet}.db"
+    if args.rebuild or not os.path.exists(fleet_path):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(fleet_path + suffix):
+                os.remove(fleet_path + suffix)
+        print(f"Generating {args.fleet} PCs into {fleet_path}", file=sys.stderr)
+        started = time.perf_counter()
+        build_fleet(fleet_path, args.fleet, args.seed)
+        print(f"  done in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    with sqlite3.connect(fleet_path) as conn:
+        tags = dict(conn.execute("SELECT name, id FROM tag"))
+    fleet = Fleet(args.fleet, args.seed, [tags[name] for name, _ in TAGS], [name for name, _ in TAGS], tags[BENCH_TAG[0]])
+    table = scenarios(fleet)
+    if args.scenario:
+        table = {name: entry for name, entry in table.items() if name.startswith(tuple(args.scenario))}
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        if args.url:
+            make_client = lambda: HttpClient(args.url)
+            clear_cache = False
+        else:
+            # Work on a copy so this run's writes never leak into the next one
+            hwdb.DB_PATH = os.path.join(scratch_dir, 'pcs.db')
+            copy_database(fleet_path, hwdb.DB_PATH)
+            hwdb.init_db()
+            make_client = hwdb.app.test_client
+            clear_cache = not args.warm
+
+        mode = "load" if args.clients else "sequential"
+        print(f"Running {mode} benchmark against {args.url or 'the Flask test client'}", file=sys.stderr)
+        if args.clients:
+            results = run_load(make_client, table, args.clients, args.duration, args.seed, clear_cache)
+        else:
+            results = run_sequential(make_client(), table, args.requests, args.warmup, args.seed, clear_cache)
+
+        if not args.url:
+            hwdb.get_write_queue().stop()
+            hwdb.pool.close()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "revision": git_revision(),
+            "fleet": args.fleet,
+            "seed": args.seed,
+            "mode": mode,
+            "target": args.url or "test-client",
+            "clients": args.clients or 1,
+            "duration_s": args.duration if args.clients else None,
+            "requests_per_scenario": None if args.clients else args.requests,
+            "response_cache": "server" if args.url else ("warm" if args.warm else "cleared"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "scenarios": results,
+    }
+    output = args.output or f"bench-{args.fleet}-{mode}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        print_comparison(results, args.compare)
+    else:
+        print_summary(results)
+    if args.print_json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
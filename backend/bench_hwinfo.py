@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Parser benchmarks for the hwinfo.py agent.
+
+Generates synthetic machine fixtures in the layout ``hwinfo.py --record``
+writes (captured lshw/fdisk/smartctl/fastfetch output plus a sysfs/ tree),
+then replays them through both collectors and reports time and memory
+allocation per stage: construction, each get_* method and to_dict(). It
+also checks that both collectors produce the same payload.
+
+Profiles:
+    desktop       2 SATA disks, 1 NVMe, 1 GPU, 2 displays, 4 RAM slots
+    workstation   26 SATA disks, 16 NVMe, 4 GPUs, 4 displays, 16 RAM slots
+    many-disks    26 SATA disks and 600 NVMe namespaces, as on storage servers
+    deep-lshw     a 40 bridge deep lshw tree with 10,000 extra nodes
+    huge          many-disks and deep-lshw together
+
+Usage:
+    python bench_hwinfo.py                               # every profile
+    python bench_hwinfo.py --profile many-disks --repeat 50
+    python bench_hwinfo.py --fixture /tmp/pc42           # a fixture recorded with hwinfo.py --record
+    python bench_hwinfo.py --compare bench-hwinfo-old.json
+
+Fixtures are generated once into hwinfo-fixtures/<profile> and reused.
+Timings are taken without tracing; allocations come from one separate
+tracemalloc pass per collector, since tracing slows everything down.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import hwinfo
+
+PROFILES = {
+    "desktop": dict(sata=2, nvme=1, gpus=1, displays=2, banks=4, depth=4, extra_nodes=60),
+    "workstation": dict(sata=26, nvme=16, gpus=4, displays=4, banks=16, depth=8, extra_nodes=400),
+    "many-disks": dict(sata=26, nvme=600, gpus=1, displays=1, banks=8, depth=6, extra_nodes=200),
+    "deep-lshw": dict(sata=4, nvme=2, gpus=2, displays=2, banks=8, depth=40, extra_nodes=10000),
+    "huge": dict(sata=26, nvme=600, gpus=4, displays=4, banks=32, depth=40, extra_nodes=10000),
+}
+
+FIXTURE_ROOT = "hwinfo-fixtures"
+
+# (vendor, product name, SKU, board)
+SYSTEMS = [("Dell Inc.", "OptiPlex 7060", "085A", "0C96W1"),
+           ("LENOVO", "30BFS07N00", "LENOVO_MT_30BF_BU_Think_FM_ThinkStation P520", "1036"),
+           ("HP", "Z4 G4 Workstation", "2HW44AV", "81C5"), ("Supermicro", "SYS-2029U-TR4", "", "X11DPU")]
+CPUS = ["Intel(R) Core(TM) i7-8700 CPU @ 3.20GHz", "Intel(R) Xeon(R) W-2145 CPU @ 3.70GHz",
+        "AMD Ryzen 9 5950X 16-Core Processor"]
+# (vendor id, vendor, device id, device)
+GPUS = [("8086", "Intel Corporation", "3e92", "CoffeeLake-S GT2 [UHD Graphics 630]"),
+        ("10de", "NVIDIA Corporation", "1f08", "TU106 [GeForce RTX 2060 Rev. A]"),
+        ("10de", "NVIDIA Corporation", "2204", "GA102 [GeForce RTX 3090]"),
+        ("1002", "Advanced Micro Devices, Inc. [AMD/ATI]", "73bf", "Navi 21 [Radeon RX 6800/6800 XT / 6900 XT]")]
+# (SMBIOS size MB, form factor, memory type, type detail, speed, lshw description, part number)
+STICKS = [(8192, 0x09, 0x1A, 1 << 7, 2667, "DIMM DDR4 Synchronous 2667 MHz (0.4 ns)", "M378A1K43CB2-CTD"),
+          (16384, 0x09, 0x1A, 1 << 7, 3200, "DIMM DDR4 Synchronous 3200 MHz (0.3 ns)", "M378A2K43DB1-CWE"),
+          (32768, 0x09, 0x1A, 1 << 7 | 1 << 13, 2933, "DIMM DDR4 Synchronous Registered (Buffered) 2933 MHz (0.3 ns)",
+           "M393A4K40DB2-CVF"),
+          (16384, 0x0D, 0x22, 1 << 7, 4800, "SODIMM DDR5 Synchronous 4800 MHz (0.2 ns)", "CT16G48C40S5.M8A1")]
+SATA_MODELS = ["Samsung SSD 860 ", "ST2000DM008-2FR1", "WDC WD10EZEX-08W", "CT500MX500SSD1  "]
+NVME_MODELS = ["Samsung SSD 970 EVO Plus 1TB", "WDC PC SN730 SDBQNTY-512G-1001", "KINGSTON SA2000M8500G"]
+# (connector, monitor name or None, width, height, h blank, v blank, pixel clock / 10 kHz, width mm, height mm)
+DISPLAYS = [("DP-1", "DELL U2415", 1920, 1200, 160, 35, 15400, 518, 324),
+            ("HDMI-A-1", "LG ULTRAGEAR", 2560, 1440, 160, 41, 24150, 597, 336),
+            ("eDP-1", None, 1920, 1080, 280, 45, 14850, 344, 194),
+            ("DP-2", "PHL 241V8", 1920, 1080, 280, 45, 14850, 527, 296)]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def write(directory, path, data):
+    full = os.path.join(directory, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+
+
+def memory_device(stick):
+    """SMBIOS type 17 structure for a stick of STICKS, or an empty slot for None."""
+    size, form_factor, kind, detail, speed, _, part = stick or (0, 0x09, 0x02, 0, 0, None, "NO DIMM")
+    raw = bytearray(0x28)
+    raw[0], raw[1] = 17, 0x28
+    if size >= 0x7FFF:
+        struct.pack_into('<H', raw, 0x0C, 0x7FFF)
+        struct.pack_into('<I', raw, 0x1C, size)
+    else:
+        struct.pack_into('<H', raw, 0x0C, size)
+    raw[0x0E], raw[0x12] = form_factor, kind
+    struct.pack_into('<HH', raw, 0x13, detail, speed)
+    raw[0x17], raw[0x1A] = 1, 2
+    return bytes(raw) + b"Samsung\0" + part.encode() + b"\0\0"
+
+
+def edid(name, width, height, h_blank, v_blank, clock, width_mm, height_mm):
+    raw = bytearray(128)
+    raw[:8] = b'\x00\xff\xff\xff\xff\xff\xff\x00'
+    raw[21], raw[22] = width_mm // 10, height_mm // 10
+    timing = bytearray(18)
+    struct.pack_into('<H', timing, 0, clock)
+    timing[2:5] = bytes([width & 0xFF, h_blank & 0xFF, (width >> 8) << 4 | h_blank >> 8])
+    timing[5:8] = bytes([height & 0xFF, v_blank & 0xFF, (height >> 8) << 4 | v_blank >> 8])
+    timing[12:15] = bytes([width_mm & 0xFF, height_mm & 0xFF, (width_mm >> 8) << 4 | height_mm >> 8])
+    raw[54:72] = timing
+    if name:
+        raw[72:90] = b'\x00\x00\x00\xfc\x00' + (name + '\n').encode().ljust(13, b' ')
+    return bytes(raw)
+
+
+def lshw_node(cls, node_id, **fields):
+    return {"id": node_id, "class": cls, "claimed": True, **fields}
+
+
+def make_fixture(directory, profile, seed=1):
+    """Write a synthetic machine for ``profile`` into ``directory``."""
+    spec = PROFILES[profile]
+    rng = random.Random(f"{seed}-{profile}")
+    vendor, product, sku, board = rng.choice(SYSTEMS)
+    serial = f"SN{rng.randrange(10**8):08d}"
+    cpu = rng.choice(CPUS)
+    sticks = [rng.choice(STICKS) if index % 2 == 0 or rng.random() < 0.5 else None for index in range(spec["banks"])]
+    gpus = [GPUS[index % len(GPUS)] for index in range(spec["gpus"])]
+    displays = sorted(DISPLAYS[:spec["displays"]])
+    disks = []
+    for index in range(spec["nvme"]):
+        name = f"nvme{index // 8}n{index % 8 + 1}"
+        disks.append((name, rng.randrange(100, 950) * 2**30 // 512, rng.choice(NVME_MODELS), f"S4EWNX0R{index:06d}"))
+    for index in range(spec["sata"]):
+        name = f"sd{chr(ord('a') + index)}"
+        disks.append((name, rng.randrange(100, 950) * 2**30 // 512, rng.choice(SATA_MODELS), f"WD-WCC{index:08d}"))
+    disks.sort()
+
+    # lshw: the core board first, then a chain of bridges `depth` deep that
+    # carries the GPUs, disks and filler devices spread along the way
+    banks = [lshw_node("memory", f"bank:{index}", description=stick[5] if stick else "DIMM Synchronous [empty]",
+                       product=stick[6] if stick else "NO DIMM", vendor="Samsung" if stick else "NO DIMM",
+                       **({"size": stick[0] * 2**20, "units": "bytes"} if stick else {}))
+             for index, stick in enumerate(sticks)]
+    bridges = [lshw_node("bridge", f"pci:{level}", description="PCI bridge", product="Sky Lake PCIe Controller",
+                         vendor="Intel Corporation", children=[]) for level in range(spec["depth"])]
+    for parent, child in zip(bridges, bridges[1:]):
+        parent["children"].append(child)
+    for index in range(spec["extra_nodes"]):
+        cls = rng.choice(["network", "generic", "communication", "input", "multimedia", "bus"])
+        bridges[rng.randrange(len(bridges))]["children"].append(lshw_node(
+            cls, f"{cls}:{index}", description=f"{cls} device", product=f"Device {index:04x}", vendor="Vendor",
+            configuration={"driver": "generic", "latency": "0"}, capabilities={"pm": "Power Management"}))
+    for index, (_, gpu_vendor, _, gpu) in enumerate(gpus):
+        # Ahead of the next bridge, so lshw lists the GPUs in PCI address order
+        bridges[min(index, len(bridges) - 1)]["children"].insert(0,
+            lshw_node("display", f"display:{index}", description="VGA compatible controller", product=gpu,
+                      vendor=gpu_vendor))
+    storage = lshw_node("storage", "storage", description="SATA controller", children=[
+        lshw_node("disk", f"disk:{index}", logicalname=f"/dev/{name}", product=model.strip(), serial=disk_serial,
+                  size=sectors * 512) for index, (name, sectors, model, disk_serial) in enumerate(disks)])
+    bridges[-1]["children"].append(storage)
+    core = lshw_node("bus", "core", description="Motherboard", product=board, vendor=vendor, children=[
+        lshw_node("memory", "memory", description="System Memory", children=banks),
+        lshw_node("processor", "cpu", description="CPU", product=cpu, vendor=cpu.split()[0]),
+        bridges[0],
+    ])
+    write(directory, "lshw.json", json.dumps(lshw_node("system", "pc", description="Desktop Computer",
+                                                       product=f"{product} ({sku})" if sku else product,
+                                                       vendor=vendor, serial=serial,
+                                                       children=[core]), indent=2))
+
+    fdisk = []
+    for name, sectors, model, _ in disks:
+        size = sectors * 512
+        fdisk.append(f"Disk /dev/{name}: {size / 2**30:.2f} GiB, {size} bytes, {sectors} sectors\n"
+                     f"Disk model: {model}\nUnits: sectors of 1 * 512 = 512 bytes\n"
+                     "Sector size (logical/physical): 512 bytes / 512 bytes\n"
+                     "I/O size (minimum/optimal): 512 bytes / 512 bytes\nDisklabel type: gpt\n"
+                     f"Disk identifier: {rng.randrange(16**8):08X}-0000-4000-8000-000000000000\n\n"
+                     "Device           Start        End    Sectors   Size Type\n"
+                     f"/dev/{name}p1     2048    1050623    1048576   512M EFI System\n"
+                     f"/dev/{name}p2  1050624 {sectors - 34:>10} {sectors - 1050658:>10} {size // 2**30 - 1:>5}G Linux filesystem\n\n")
+    for index in range(8):
+        fdisk.append(f"Disk /dev/loop{index}: 63.45 MiB, 66531328 bytes, 129944 sectors\n"
+                     "Units: sectors of 1 * 512 = 512 bytes\n\n")
+    write(directory, "fdisk.txt", "\n".join(fdisk))
+
+    for name, _, model, disk_serial in disks:
+        write(directory, f"smartctl/{name}.txt",
+              "smartctl 7.2 2020-12-30 r5155 [x86_64-linux-5.15.0] (local build)\n\n"
+              "=== START OF INFORMATION SECTION ===\n"
+              f"Device Model:     {model.strip()}\nSerial Number:    {disk_serial}\n"
+              "Firmware Version: 1B2QEXM7\nUser Capacity:    500,107,862,016 bytes [500 GB]\n"
+              "Sector Size:      512 bytes logical/physical\nSMART support is: Enabled\n")
+
+    lines = ["root@pc", "-------", "OS: Ubuntu 22.04.4 LTS x86_64", f"Host: {product}",
+             "Kernel: Linux 5.15.0-105-generic", "Uptime: 3 days, 4 hours", "Packages: 2143 (dpkg)",
+             "Shell: bash 5.1.16"]
+    for connector, name, width, height, h_blank, v_blank, clock, width_mm, height_mm in displays:
+        refresh = round(clock * 10000 / ((width + h_blank) * (height + v_blank)))
+        inches = int(math.hypot(width_mm, height_mm) / 25.4 + 0.5)
+        location = "Built-in" if connector.startswith(hwinfo.BUILTIN_CONNECTORS) else "External"
+        lines.append(f'Display ({name or connector}): {width}x{height} @ {refresh} Hz in {inches}" [{location}]')
+    lines += [f"CPU: {cpu}", *(f"GPU: {gpu}" for *_, gpu in gpus), "Memory: 5.12 GiB / 31.24 GiB (16%)",
+              "Locale: en_US.UTF-8"]
+    write(directory, "fastfetch.txt", "\n".join(lines) + "\n")
+
+    # The same machine as sysfs sees it
+    sysfs = os.path.join(directory, "sysfs")
+    for field, value in (("sys_vendor", vendor), ("product_name", product), ("product_sku", sku),
+                         ("product_serial", serial), ("board_name", board)):
+        write(sysfs, f"sys/class/dmi/id/{field}", value + "\n")
+    for index, stick in enumerate(sticks):
+        write(sysfs, f"sys/firmware/dmi/entries/17-{index}/raw", memory_device(stick))
+    write(sysfs, "proc/cpuinfo", "".join(f"processor\t: {core_id}\nvendor_id\t: GenuineIntel\n"
+                                         f"model name\t: {cpu}\nflags\t\t: fpu vme de pse tsc msr pae mce\n\n"
+                                         for core_id in range(16)))
+    for name, sectors, model, disk_serial in disks:
+        write(sysfs, f"sys/block/{name}/size", f"{sectors}\n")
+        write(sysfs, f"sys/block/{name}/device/model", model + "\n")
+        if name.startswith("nvme"):
+            write(sysfs, f"sys/block/{name}/device/serial", f"{disk_serial:<20}\n")
+        else:
+            write(sysfs, f"sys/block/{name}/device/vpd_pg80", bytes([0, 0x80, 0, len(disk_serial)]) + disk_serial.encode())
+    for index in range(8):
+        write(sysfs, f"sys/block/loop{index}/size", "129944\n")
+    for index, (vendor_id, _, device_id, _) in enumerate(gpus):
+        address = f"0000:{index + 1:02x}:00.0"
+        write(sysfs, f"sys/bus/pci/devices/{address}/class", "0x030000\n")
+        write(sysfs, f"sys/bus/pci/devices/{address}/vendor", f"0x{vendor_id}\n")
+        write(sysfs, f"sys/bus/pci/devices/{address}/device", f"0x{device_id}\n")
+    for index in range(min(spec["extra_nodes"], 200)):
+        address = f"0000:{0x80 + index // 32:02x}:{index % 32:02x}.0"
+        write(sysfs, f"sys/bus/pci/devices/{address}/class", "0x020000\n")
+        write(sysfs, f"sys/bus/pci/devices/{address}/vendor", "0x8086\n")
+        write(sysfs, f"sys/bus/pci/devices/{address}/device", f"0x{index:04x}\n")
+    for connector, name, *mode in displays:
+        write(sysfs, f"sys/class/drm/card0-{connector}/status", "connected\n")
+        write(sysfs, f"sys/class/drm/card0-{connector}/edid", edid(name, *mode))
+    write(sysfs, "sys/class/drm/card0-HDMI-A-2/status", "disconnected\n")
+    write(sysfs, "sys/class/drm/card0-HDMI-A-2/edid", b"")
+
+    # pci.ids about the size of the real one (~2,500 vendors, ~35,000 lines)
+    ids = ["# List of PCI ID's (synthetic)\n"]
+    known = {}
+    for vendor_id, gpu_vendor, device_id, gpu in GPUS:
+        known.setdefault(vendor_id, [gpu_vendor, {}])[1][device_id] = gpu
+    for vendor_id in sorted({f"{number:04x}" for number in range(0x1000, 0x1000 + 2500)} | set(known)):
+        vendor_name, devices = known.get(vendor_id, (f"Vendor {vendor_id}", {}))
+        ids.append(f"{vendor_id}  {vendor_name}\n")
+        for device_number in range(12):
+            ids.append(f"\t{device_number:04x}  Device {vendor_id}:{device_number:04x}\n")
+            ids.append(f"\t\t{vendor_id} {device_number:04x}  Subsystem\n")
+        ids.extend(f"\t{device_id}  {device}\n" for device_id, device in devices.items())
+    ids.append("C 03  Display controller\n\t00  VGA compatible controller\n")
+    write(sysfs, "usr/share/misc/pci.ids", "".join(ids))
+
+
+def stages(info):
+    """(stage name, callable) pairs measured after construction."""
+    names = ["get_host", "get_serial", "get_mainboard", "get_cpu", "get_gpus", "get_resolution", "get_ram",
+             "get_disks"]
+    pairs = [(name, getattr(info, name)) for name in names]
+    if isinstance(info, hwinfo.SystemInfo):
+        pairs.insert(0, ("_index_by_class", lambda: info._index_by_class(info.hw_info)))
+    pairs.append(("to_dict", info.to_dict))
+    return pairs
+
+
+def time_collector(make, repeat):
+    """Median/p95 milliseconds per stage over ``repeat`` runs."""
+    samples = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        info = make()
+        samples.setdefault("init", []).append(time.perf_counter() - start)
+        for name, call in stages(info):
+            start = time.perf_counter()
+            call()
+            samples.setdefault(name, []).append(time.perf_counter() - start)
+    return {
+        name: {"p50_ms": round(percentile(sorted(values), 0.50) * 1000, 3),
+               "p95_ms": round(percentile(sorted(values), 0.95) * 1000, 3)}
+        for name, values in samples.items()
+    }
+
+
+def trace_collector(make):
+    """Peak traced memory (KiB) per stage, measured in one separate pass."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def traced(name, call):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = call()
+            peaks[name] = round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1)
+            return result
+
+        info = traced("init", make)
+        for name, call in stages(info):
+            traced(name, call)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def bench_fixture(directory, repeat):
+    collectors = {"lshw": lambda: hwinfo.SystemInfo(replay_dir=directory)}
+    if os.path.isdir(os.path.join(directory, "sysfs")):
+        collectors["sysfs"] = lambda: hwinfo.SysfsInfo(os.path.join(directory, "sysfs"))
+
+    results = {}
+    payloads = {}
+    for name, make in collectors.items():
+        timings = time_collector(make, repeat)
+        for stage, peak in trace_collector(make).items():
+            timings[stage]["peak_kib"] = peak
+        results[name] = timings
+        payloads[name] = make().to_dict()
+    if len(payloads) == 2:
+        results["payloads_match"] = payloads["lshw"] == payloads["sysfs"]
+    return results
+
+
+def print_results(results):
+    print(f"{'fixture / collector / stage':44} {'p50 ms':>10} {'p95 ms':>10} {'peak KiB':>10}")
+    for fixture, collectors in results.items():
+        for collector, stats in collectors.items():
+            if collector == "payloads_match":
+                print(f"{fixture + ' payloads match':44} {str(stats):>10}")
+                continue
+            for stage, values in stats.items():
+                print(f"{f'{fixture} / {collector} / {stage}':44} {values['p50_ms']:>10} {values['p95_ms']:>10} "
+                      f"{values.get('peak_kib', ''):>10}")
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["fixtures"]
+    print(f"{'fixture / collector / stage':44} {'p50 ms':>18} {'peak KiB':>18}")
+    for fixture, collectors in results.items():
+        for collector, stats in collectors.items():
+            if collector == "payloads_match":
+                continue
+            for stage, current in stats.items():
+                previous = baseline.get(fixture, {}).get(collector, {}).get(stage)
+                if not previous:
+                    continue
+                cells = []
+                for key in ("p50_ms", "peak_kib"):
+                    old, new = previous.get(key), current.get(key)
+                    change = f"{(new - old) / old * 100:+.0f}%" if old and new is not None else "n/a"
+                    cells.append(f"{new:>10} {change:>7}")
+                print(f"{f'{fixture} / {collector} / {stage}':44} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profile', action='append', choices=PROFILES,
+                        help="Only run this synthetic profile (repeatable; default all)")
+    parser.add_argument('--fixture', action='append', help="Also run a recorded fixture directory (repeatable)")
+    parser.add_argument('--fixtures-dir', default=FIXTURE_ROOT, help=f"Where profiles are generated (default {FIXTURE_ROOT})")
+    parser.add_argument('--rebuild', action='store_true', help="Regenerate the profile fixtures even if they exist")
+    parser.add_argument('--seed', type=int, default=1, help="Fixture seed (default 1)")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per collector (default 20)")
+    parser.add_argument('--output', help="Results file (default bench-hwinfo-<timestamp>.json)")
+    parser.add_argument('--compare', help="Earlier results file to compare this run against")
+    args = parser.parse_args()
+
+    fixtures = {}
+    for profile in args.profile or ([] if args.fixture else list(PROFILES)):
+        directory = os.path.join(args.fixtures_dir, profile)
+        if args.rebuild or not os.path.isdir(directory):
+            shutil.rmtree(directory, ignore_errors=True)
+            print(f"Generating {profile} fixture into {directory}", file=sys.stderr)
+            make_fixture(directory, profile, args.seed)
+        fixtures[profile] = directory
+    for directory in args.fixture or []:
+        fixtures[os.path.basename(os.path.normpath(directory))] = directory
+
+    results = {}
+    for name, directory in fixtures.items():
+        print(f"Running {name}", file=sys.stderr)
+        results[name] = bench_fixture(directory, args.repeat)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "revision": git_revision(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "fixtures": results,
+    }
+    output = args.output or f"bench-hwinfo-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        print_comparison(results, args.compare)
+    else:
+        print_results(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""In-process LRU cache for serialized read responses."""
+
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU cache of response bodies tagged with the data version they were built from.
+
+    An entry is only returned for the version it was stored under, so every
+    write (which bumps the version) implicitly invalidates the whole cache
+    without having to track which routes it touched.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
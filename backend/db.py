@@ -0,0 +1,202 @@
+"""SQLite connection handling shared by the hwdb backend and its scripts."""
+
+import queue
+import sqlite3
+
+from history import backfill_history, rehash_sections
+from stats import rebuild_rollups
+
+
+# Builds the pc_search row for PCs; append a WHERE clause to restrict it.
+SEARCH_DOCUMENT_SQL = """
+    SELECT d.docid, p.host, p.cpu, p.mainboard, p.notes,
+           (SELECT GROUP_CONCAT(name, ' ') FROM gpu WHERE pc_id = p.id),
+           (SELECT GROUP_CONCAT(model, ' ') FROM ram_stick WHERE pc_id = p.id),
+           (SELECT GROUP_CONCAT(COALESCE(model, '') || ' ' || COALESCE(serial, ''), ' ') FROM disk WHERE pc_id = p.id)
+    FROM pc p
+    JOIN pc_search_doc d ON d.pc_id = p.id
+"""
+
+def create_stat_rollup(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS stat_rollup (
+            dimension TEXT,
+            grp TEXT,
+            machines INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            PRIMARY KEY(dimension, grp)
+        ) WITHOUT ROWID
+    """)
+    rebuild_rollups(cur)
+
+
+def create_history(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_blob (
+            hash TEXT PRIMARY KEY,
+            body TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pc_history (
+            id INTEGER PRIMARY KEY,
+            pc_id TEXT NOT NULL,
+            section TEXT NOT NULL,
+            old_hash TEXT,
+            new_hash TEXT NOT NULL,
+            changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pc_history_pc_id ON pc_history(pc_id, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pc_history_changed_at ON pc_history(changed_at, id)")
+    backfill_history(cur)
+
+
+# Versioned schema changes applied on top of schema.sql. The position in the
+# list is the version stored in PRAGMA user_version, so only ever append.
+MIGRATIONS = [
+    # 1: Indexes for child row lookups by PC and covering indexes for the
+    # /pcs sort keys (id is included as the tie-breaker).
+    """
+    CREATE INDEX IF NOT EXISTS idx_gpu_pc_id ON gpu(pc_id);
+    CREATE INDEX IF NOT EXISTS idx_ram_stick_pc_id ON ram_stick(pc_id);
+    CREATE INDEX IF NOT EXISTS idx_disk_pc_id ON disk(pc_id);
+    CREATE INDEX IF NOT EXISTS idx_pc_tag_tag_id ON pc_tag(tag_id);
+    CREATE INDEX IF NOT EXISTS idx_pc_submitted_at ON pc(submitted_at, id, host, cpu, ram_total_gb);
+    CREATE INDEX IF NOT EXISTS idx_pc_host ON pc(host, id, cpu, ram_total_gb, submitted_at);
+    CREATE INDEX IF NOT EXISTS idx_pc_cpu ON pc(cpu, id, host, ram_total_gb, submitted_at);
+    """,
+    # 2: Counter bumped by every write, used for ETags and response caching.
+    """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+    """,
+    # 3: Full-text hardware search. pc_search_doc gives every PC a stable
+    # integer docid (pc rowids may change on VACUUM) and removes the FTS row
+    # when the PC is deleted.
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS pc_search USING fts5(
+        host, cpu, mainboard, notes, gpus, ram, disks,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    );
+    CREATE TABLE IF NOT EXISTS pc_search_doc (
+        docid INTEGER PRIMARY KEY,
+        pc_id TEXT UNIQUE,
+        FOREIGN KEY(pc_id) REFERENCES pc(id) ON DELETE CASCADE
+    );
+    CREATE TRIGGER IF NOT EXISTS pc_search_doc_delete AFTER DELETE ON pc_search_doc BEGIN
+        DELETE FROM pc_search WHERE rowid = old.docid;
+    END;
+    INSERT OR IGNORE INTO pc_search_doc (pc_id) SELECT id FROM pc;
+    INSERT INTO pc_search (rowid, host, cpu, mainboard, notes, gpus, ram, disks)
+    {SEARCH_DOCUMENT_SQL};
+    """,
+    # 4: Fleet rollups for /stats, backfilled from the existing data.
+    create_stat_rollup,
+    # 5: Append-only hardware history. pc_history has no foreign key so the
+    # history of a deleted PC is kept.
+    create_history,
+    # 6: Change events streamed by /events, see events.py.
+    """
+    CREATE TABLE IF NOT EXISTS event_log (
+        id INTEGER PRIMARY KEY,
+        type TEXT NOT NULL,
+        data TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    # 7: Section hashes of the stored rows rather than of the raw payloads.
+    rehash_sections,
+]
+
+
+def migrate(conn):
+    """Apply all pending MIGRATIONS to ``conn``, each in its own transaction.
+
+    A migration is either an SQL script or a callable taking a cursor, for
+    steps that need to backfill data in Python.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+        if callable(step):
+            conn.execute("BEGIN")
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        else:
+            conn.executescript(f"BEGIN; {step}; PRAGMA user_version = {number}; COMMIT;")
+    conn.execute("PRAGMA optimize")
+
+
+def is_lock_error(e: sqlite3.Error) -> bool:
+    """SQLITE_BUSY or SQLITE_LOCKED (any extended code): worth retrying, not the caller's fault."""
+    return getattr(e, 'sqlite_errorcode', 0) & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+class ConnectionPool:
+    """A small pool of long-lived, pre-configured SQLite connections.
+
+    Every connection is set up once when it is opened (WAL journal, relaxed
+    fsync, foreign keys, busy timeout, statement cache) and is then reused for
+    many requests. WAL mode lets readers run while ``/submit`` holds the write
+    lock instead of failing with "database is locked".
+    """
+
+    def __init__(self, path, size=8, busy_timeout=5000, cached_statements=256, on_connect=None,
+                 factory=sqlite3.Connection):
+        self.path = path
+        self.size = size
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.on_connect = on_connect
+        self.factory = factory
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout / 1000,
+            cached_statements=self.cached_statements,
+            factory=self.factory,
+            check_same_thread=False,  # Connections move between request threads
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        return conn
+
+    def acquire(self):
+        """Return an idle connection, opening a new one if none is available."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        """Hand a connection back to the pool.
+
+        Any transaction left open by the caller is rolled back so a forgotten
+        early ``return`` can never keep the write lock. Connections beyond the
+        pool size are closed.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
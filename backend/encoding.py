@@ -0,0 +1,127 @@
+"""
+Request and response encoding: JSON serialization and compression.
+
+orjson is used for jsonify() when it is installed, with the standard
+library as the fallback. Buffered responses of at least COMPRESS_MIN_SIZE
+bytes are compressed with brotli (if installed) or gzip, depending on the
+client's Accept-Encoding. Streamed responses (NDJSON pages, /events) are
+passed through untouched so they still reach the client as they are
+produced.
+
+Request bodies sent with ``Content-Encoding: gzip`` (the hwinfo agent does
+this for /submit) are inflated before Flask sees them.
+"""
+
+import gzip
+import io
+import json
+import zlib
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Largest inflated request body accepted, so a small gzip bomb cannot
+# exhaust memory
+MAX_INFLATED_REQUEST_SIZE = 64 * 1024 * 1024
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def dumps(value, default=None) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value, default=default, ensure_ascii=False, separators=(',', ':'))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through dumps() above. Keys keep their insertion order."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, default=kwargs.get('default', self.default))
+
+
+def json_array(documents) -> str:
+    """Join JSON documents that are already serialized (e.g. by SQLite) into one array."""
+    return "[" + ",".join(documents) + "]"
+
+
+def negotiate_encoding():
+    """The compression the current request accepts, or None."""
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def compress_response(response, encoding=None):
+    """Compress a buffered response in place if it is worth it and the client accepts it."""
+    if (response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.status_code < 200
+            or response.status_code in (204, 304)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = encoding or negotiate_encoding()
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+class GzipRequestMiddleware:
+    """WSGI middleware inflating request bodies sent with ``Content-Encoding: gzip``.
+
+    Other requests pass through untouched. A body that is not valid gzip is
+    answered with 400, one that inflates beyond ``max_size`` with 413.
+    """
+
+    def __init__(self, app, max_size=MAX_INFLATED_REQUEST_SIZE):
+        self.app = app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        if environ.get('HTTP_CONTENT_ENCODING', '').strip().lower() != 'gzip':
+            return self.app(environ, start_response)
+
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        stream = environ['wsgi.input']
+        body = stream.read(length) if length else stream.read()
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = inflater.decompress(body, self.max_size + 1)
+        except zlib.error:
+            return self._error(start_response, '400 Bad Request', 'Invalid gzip request body')
+        if len(data) > self.max_size:
+            return self._error(start_response, '413 Request Entity Too Large', 'Request body too large')
+        if not inflater.eof:
+            return self._error(start_response, '400 Bad Request', 'Truncated gzip request body')
+
+        environ['wsgi.input'] = io.BytesIO(data)
+        environ['CONTENT_LENGTH'] = str(len(data))
+        del environ['HTTP_CONTENT_ENCODING']
+        return self.app(environ, start_response)
+
+    @staticmethod
+    def _error(start_response, status, message):
+        body = dumps({"error": message}).encode('utf-8')
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
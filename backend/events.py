@@ -0,0 +1,116 @@
+"""
+Live change events for the /events Server-Sent Events stream.
+
+Write routes record compact events in the event_log table, inside the same
+transaction as the change itself, so an event exists exactly when its write
+committed, whichever server worker handled it. In every worker that has
+/events subscribers, one EventBus thread tails the table and fans new
+events out to them, so the database is polled once per process, not once
+per open dashboard.
+"""
+
+import collections
+import json
+import sqlite3
+import threading
+
+# Events kept in event_log for clients resuming with Last-Event-ID
+EVENT_LOG_SIZE = 10000
+
+
+def publish(cur, event_type, data):
+    """Record an event; it is delivered once the surrounding transaction commits."""
+    cur.execute(
+        "INSERT INTO event_log (type, data) VALUES (?, ?)",
+        (event_type, json.dumps(data, separators=(',', ':')))
+    )
+    cur.execute("DELETE FROM event_log WHERE id <= ?", (cur.lastrowid - EVENT_LOG_SIZE,))
+
+
+class EventBus:
+    """Tails event_log and hands new events to subscribers in this process."""
+
+    def __init__(self, get_pool, poll_interval=1.0, buffer_size=1000):
+        self.get_pool = get_pool
+        self.poll_interval = poll_interval
+        self._events = collections.deque(maxlen=buffer_size)
+        self._last_id = None
+        self._condition = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def wake(self):
+        """Poll right away instead of at the next interval, e.g. after a local commit."""
+        self._wake.set()
+
+    def _query(self, sql, params=()):
+        pool = self.get_pool()
+        conn = pool.acquire()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            pool.release(conn)
+
+    def _fetch_after(self, event_id):
+        return self._query("SELECT id, type, data FROM event_log WHERE id > ? ORDER BY id", (event_id,))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._last_id = self._query("SELECT COALESCE(MAX(id), 0) FROM event_log")[0][0]
+                self._thread = threading.Thread(target=self._run, name="event-bus", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                rows = self._fetch_after(self._last_id)
+            except sqlite3.Error:
+                continue
+            if rows:
+                with self._condition:
+                    self._events.extend(rows)
+                    self._last_id = rows[-1][0]
+                    self._condition.notify_all()
+
+    def subscribe(self, last_event_id=None, heartbeat=15):
+        """Yield (id, type, data) for every event after ``last_event_id``.
+
+        Without ``last_event_id`` only new events are sent. If the requested
+        events are no longer in event_log, a single (id, "reset", "{}") tells
+        the client to refetch everything. None is yielded after
+        ``heartbeat`` seconds without events, so the caller can keep the
+        connection alive.
+        """
+        self._start()
+        position = self._last_id if last_event_id is None else last_event_id
+
+        if last_event_id is not None:
+            oldest = self._query("SELECT MIN(id) FROM event_log")[0][0]
+            if oldest is not None and last_event_id < oldest - 1:
+                position = self._last_id
+                yield position, "reset", "{}"
+            else:
+                for event in self._fetch_after(position):
+                    yield event
+                    position = event[0]
+
+        while True:
+            with self._condition:
+                pending = [event for event in self._events if event[0] > position]
+                if not pending:
+                    self._condition.wait(heartbeat)
+                    pending = [event for event in self._events if event[0] > position]
+
+            if not pending:
+                yield None
+                continue
+            if pending[0][0] > position + 1:
+                # This subscriber fell behind the buffer; catch up from the log
+                pending = [event for event in self._fetch_after(position) if event[0] <= pending[-1][0]]
+            for event in pending:
+                yield event
+                position = event[0]
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Index advisor for hwinfo-db.
+
+Drives every API route against a scratch database, records each SQL
+statement the app issues and prints its EXPLAIN QUERY PLAN. Plan steps that
+scan a whole table (or sort through a temporary B-tree) are flagged.
+
+Usage:
+    python explain_queries.py                 # plan against the scratch database
+    python explain_queries.py --db ./pcs.db   # plan against a real database (read-only)
+
+Exits with status 1 if any full table scan was found.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import tempfile
+
+import app as hwdb
+from db import ConnectionPool
+
+SAMPLE_PC = {
+    "host": "LENOVO 10MQS0KE00",
+    "serial": "EXPLAIN-0001",
+    "mainboard": "3102",
+    "cpu": "Intel(R) Core(TM) i5-8500T CPU @ 2.10GHz",
+    "gpus": ["UHD Graphics 630"],
+    "resolution": "[Built-in] DELL P2419H: 1920x1080 @ 60 Hz in 24\"",
+    "ram": {
+        "total_size_gb": 16,
+        "slots": "2 / 2",
+        "sticks": [
+            {"size_gb": 8, "type": "SODIMM DDR4 Synchronous 2667 MHz", "model": "M471A1K43CB1-CTD"},
+            {"size_gb": 8, "type": "SODIMM DDR4 Synchronous 2667 MHz", "model": "M471A1K43CB1-CTD"},
+        ],
+    },
+    "disks": [
+        {"path": "/dev/nvme0n1", "size": "238G", "model": "SAMSUNG MZVLB256HAHQ", "serial": "S4DXNX0M123456"},
+    ],
+}
+
+SKIPPED_PREFIXES = ("--", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "CREATE", "SAVEPOINT", "RELEASE", "ANALYZE")
+
+
+def exercise_routes(client):
+    """Call every route once (plus every /pcs variant) so the app issues all of its queries."""
+    pc_id = client.post('/submit?sync=1', json=SAMPLE_PC).get_json()["pc_id"]
+    client.post('/submit?sync=1', json=SAMPLE_PC)
+    client.post('/submit?sync=1', json={"serial": SAMPLE_PC["serial"], "partial": True, "gpus": ["UHD Graphics 630"]})
+    client.post('/submit?sync=1', json={"serial": SAMPLE_PC["serial"], "partial": True})
+    client.post('/submit/batch', json=[SAMPLE_PC, {**SAMPLE_PC, "serial": "EXPLAIN-0003", "cpu": "AMD Ryzen 5 5600G"}])
+    client.post('/submit?sync=1', json={**SAMPLE_PC, "serial": "EXPLAIN-0002", "host": None})
+    tag_id = client.post('/tags', json={"name": "Office", "color": "#40C057"}).get_json()["id"]
+    client.post(f'/pc/{pc_id}/tags', json={"tag_id": tag_id})
+    client.get('/tags')
+    client.get(f'/pc/{pc_id}/tags')
+
+    for sort_by in ('submitted_at', 'host', 'cpu'):
+        for sort_order in ('asc', 'desc'):
+            client.get(f'/pcs?sort_by={sort_by}&sort_order={sort_order}')
+            client.get(f'/pcs?sort_by={sort_by}&sort_order={sort_order}&tag=Office')
+            page = client.get(f'/pcs?sort_by={sort_by}&sort_order={sort_order}&limit=1')
+            client.get(f'/pcs?sort_by={sort_by}&sort_order={sort_order}&limit=1&after={page.headers["X-Next-Cursor"]}')
+
+    client.get('/search?q=UHD 630')
+    client.get('/stats')
+    client.get('/pcs', query_string={"filter": 'ram_total_gb >= 16 and gpu ~ "UHD" and disk.size_gb > 100 '
+                                               'and tag in (Office, Lab) and submitted_at newer than 30d'})
+    client.get(f'/pc/{pc_id}')
+    client.get(f'/pc/{pc_id}/history')
+    page = client.get('/changes?since=2000-01-01&limit=1')
+    client.get(f'/changes?since=2000-01-01&limit=1&after={page.headers["X-Next-Cursor"]}')
+    client.post('/pcs/details', json={"ids": [pc_id]})
+    for table in ('pcs', 'gpus', 'ram', 'disks', 'tags'):
+        client.get(f'/export?table={table}').get_data()
+    client.post('/update_notes', json={"pc_id": pc_id, "notes": "Reception desk"})
+    events = client.get('/events', headers={'Last-Event-ID': '0'}, buffered=False)
+    next(events.iter_encoded()), next(events.iter_encoded())
+    events.close()
+    client.delete(f'/pc/{pc_id}/tags/{tag_id}')
+    client.delete(f'/tags/{tag_id}')
+    client.delete(f'/pc/{pc_id}/delete')
+
+
+def capture_statements(scratch_path):
+    statements = []
+    hwdb.DB_PATH = scratch_path
+    hwdb.init_db()
+    hwdb.pool = ConnectionPool(scratch_path, on_connect=lambda conn: conn.set_trace_callback(statements.append))
+
+    exercise_routes(hwdb.app.test_client())
+
+    unique = {}
+    for statement in statements:
+        normalized = re.sub(r'\s+', ' ', statement).strip()
+        # FTS5 reads its shadow tables through 'main'.'<table>' statements of its own
+        if normalized and not normalized.upper().startswith(SKIPPED_PREFIXES) and "'main'." not in normalized:
+            unique.setdefault(normalized, None)
+    return list(unique)
+
+
+def explain(conn, statement):
+    """Return (plan lines, flagged lines) for one statement."""
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}")]
+    # Scanning a materialized subquery only reads its (already limited) result
+    subqueries = {detail.split()[-1] for detail in plan if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+    flagged = [
+        detail for detail in plan
+        if (detail.startswith("SCAN ") and " INDEX " not in detail and detail.split()[1] not in subqueries)
+        or "TEMP B-TREE" in detail
+    ]
+    return plan, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help="Database to explain the captured queries against (opened read-only)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        scratch_path = os.path.join(scratch_dir, 'pcs.db')
+        statements = capture_statements(scratch_path)
+
+        if args.db:
+            conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(scratch_path)
+
+        full_scans = temp_sorts = 0
+        for statement in statements:
+            plan, flagged = explain(conn, statement)
+            marker = "!!" if flagged else "ok"
+            print(f"[{marker}] {statement}")
+            for detail in plan:
+                print(f"       {'*' if detail in flagged else ' '} {detail}")
+            full_scans += sum(1 for detail in flagged if detail.startswith("SCAN "))
+            temp_sorts += sum(1 for detail in flagged if "TEMP B-TREE" in detail)
+        conn.close()
+
+    print(f"\n{len(statements)} queries checked, {full_scans} full table scan(s), {temp_sorts} temp B-tree sort(s).")
+    return 1 if full_scans else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
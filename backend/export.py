@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Whole-inventory export for /export and the nightly asset/finance pulls.
+
+Tables:
+    pcs     one row per PC, GPUs and tags joined into strings, RAM and disk totals
+    gpus    one row per GPU
+    ram     one row per RAM stick
+    disks   one row per disk
+    tags    one row per PC/tag assignment
+
+Formats are CSV and NDJSON, plus Arrow IPC stream and Parquet when pyarrow
+is installed. Rows are read from a single statement EXPORT_CHUNK_SIZE at a
+time and written out chunk by chunk, so memory stays flat however large the
+fleet is. The one statement also gives a consistent snapshot.
+
+Usage:
+    python export.py --db /data/pcs.db --table pcs --format parquet -o pcs.parquet
+    python export.py --url http://hwdb.local --table disks --format csv -o disks.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import sqlite3
+import sys
+
+import requests
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+EXPORT_CHUNK_SIZE = 5000
+
+# table -> (query, [(column, type)]); types are "string", "int" or "float"
+EXPORT_TABLES = {
+    "pcs": ("""
+        SELECT p.id, p.host, p.serial, p.cpu, p.mainboard, p.ram_total_gb, p.ram_slots, p.resolution, p.notes,
+               p.submitted_at,
+               (SELECT GROUP_CONCAT(name, '; ') FROM gpu WHERE pc_id = p.id),
+               (SELECT COUNT(*) FROM ram_stick WHERE pc_id = p.id),
+               (SELECT COUNT(*) FROM disk WHERE pc_id = p.id),
+               (SELECT SUM(size_gb) FROM disk WHERE pc_id = p.id),
+               (SELECT GROUP_CONCAT(t.name, '; ') FROM pc_tag pt JOIN tag t ON t.id = pt.tag_id WHERE pt.pc_id = p.id)
+        FROM pc p
+        ORDER BY p.id
+    """, [("id", "string"), ("host", "string"), ("serial", "string"), ("cpu", "string"), ("mainboard", "string"),
+          ("ram_total_gb", "int"), ("ram_slots", "string"), ("resolution", "string"), ("notes", "string"),
+          ("submitted_at", "string"), ("gpus", "string"), ("ram_sticks", "int"), ("disks", "int"),
+          ("disk_total_gb", "int"), ("tags", "string")]),
+    "gpus": ("""
+        SELECT g.pc_id, p.serial, g.name
+        FROM gpu g JOIN pc p ON p.id = g.pc_id
+        ORDER BY g.pc_id, g.id
+    """, [("pc_id", "string"), ("pc_serial", "string"), ("name", "string")]),
+    "ram": ("""
+        SELECT r.pc_id, p.serial, r.size_gb, r.type, r.model
+        FROM ram_stick r JOIN pc p ON p.id = r.pc_id
+        ORDER BY r.pc_id, r.id
+    """, [("pc_id", "string"), ("pc_serial", "string"), ("size_gb", "int"), ("type", "string"),
+          ("model", "string")]),
+    "disks": ("""
+        SELECT d.pc_id, p.serial, d.size_gb, d.model, d.serial, d.path
+        FROM disk d JOIN pc p ON p.id = d.pc_id
+        ORDER BY d.pc_id, d.id
+    """, [("pc_id", "string"), ("pc_serial", "string"), ("size_gb", "int"), ("model", "string"),
+          ("serial", "string"), ("path", "string")]),
+    "tags": ("""
+        SELECT pt.pc_id, p.serial, t.name, t.color
+        FROM pc_tag pt JOIN pc p ON p.id = pt.pc_id JOIN tag t ON t.id = pt.tag_id
+        ORDER BY pt.pc_id, pt.tag_id
+    """, [("pc_id", "string"), ("pc_serial", "string"), ("tag", "string"), ("color", "string")]),
+}
+
+# format -> (mimetype, file extension, needs pyarrow)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv", False),
+    "ndjson": ("application/x-ndjson", "ndjson", False),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows", True),
+    "parquet": ("application/vnd.apache.parquet", "parquet", True),
+}
+
+
+class ExportError(ValueError):
+    """Unknown table or format, or a format this installation cannot write."""
+
+
+def check_export(table, fmt):
+    if table not in EXPORT_TABLES:
+        raise ExportError(f"table must be one of {', '.join(EXPORT_TABLES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if EXPORT_FORMATS[fmt][2] and pyarrow is None:
+        raise ExportError(f"{fmt} export needs pyarrow, which is not installed; use csv or ndjson")
+
+
+def row_chunks(cur, table, chunk_size=EXPORT_CHUNK_SIZE):
+    cur.execute(EXPORT_TABLES[table][0])
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def csv_stream(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def ndjson_stream(columns, chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows).encode('utf-8')
+
+
+class ChunkSink:
+    """Write-only file object that collects what pyarrow writes until drained."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def int_or_none(value):
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return int(value)
+    return None
+
+
+def float_or_none(value):
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def str_or_none(value):
+    return None if value is None else str(value)
+
+
+# SQLite keeps a value its column cannot convert (e.g. text in an INTEGER
+# column) as is; such values are exported as null rather than failing the
+# export after its headers are sent
+ARROW_VALUES = {"string": str_or_none, "int": int_or_none, "float": float_or_none}
+
+
+def arrow_column(values, arrow_type, convert):
+    try:
+        return pyarrow.array(values, type=arrow_type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        return pyarrow.array(map(convert, values), type=arrow_type)
+
+
+def arrow_stream(column_types, chunks, parquet=False):
+    arrow_types = {"string": pyarrow.string(), "int": pyarrow.int64(), "float": pyarrow.float64()}
+    schema = pyarrow.schema([(name, arrow_types[kind]) for name, kind in column_types])
+    converters = [ARROW_VALUES[kind] for _, kind in column_types]
+    sink = ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema) if parquet else pyarrow.ipc.new_stream(sink, schema)
+    for rows in chunks:
+        columns = zip(*rows)
+        writer.write_batch(pyarrow.record_batch(
+            [arrow_column(values, field.type, convert)
+             for values, field, convert in zip(columns, schema, converters)], schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export_stream(cur, table, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the export of ``table`` in ``fmt`` as byte chunks; call check_export() first."""
+    column_types = EXPORT_TABLES[table][1]
+    chunks = row_chunks(cur, table, chunk_size)
+    if fmt == "csv":
+        return csv_stream([name for name, _ in column_types], chunks)
+    if fmt == "ndjson":
+        return ndjson_stream([name for name, _ in column_types], chunks)
+    return arrow_stream(column_types, chunks, parquet=fmt == "parquet")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--db', help="Read this database directly (opened read-only)")
+    source.add_argument('--url', help="Download from the /export endpoint of this server")
+    parser.add_argument('--table', default='pcs', choices=EXPORT_TABLES)
+    parser.add_argument('--format', default='csv', choices=EXPORT_FORMATS)
+    parser.add_argument('-o', '--output', help="Output file (default hwdb-<table>.<ext>, '-' for stdout)")
+    args = parser.parse_args()
+
+    output = args.output or f"hwdb-{args.table}.{EXPORT_FORMATS[args.format][1]}"
+    out = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        if args.url:
+            with requests.get(f"{args.url.rstrip('/')}/export", params={"table": args.table, "format": args.format},
+                              stream=True) as response:
+                if response.status_code != 200:
+                    raise SystemExit(f"Export failed: {response.status_code} {response.text}")
+                for chunk in response.iter_content(chunk_size=65536):
+                    out.write(chunk)
+        else:
+            try:
+                check_export(args.table, args.format)
+            except ExportError as e:
+                raise SystemExit(str(e))
+            conn = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+            try:
+                for chunk in export_stream(conn.cursor(), args.table, args.format):
+                    out.write(chunk)
+            finally:
+                conn.close()
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Filter expressions for the /pcs listing.
+
+A filter is a boolean expression over PC attributes that compiles to one
+parameterized SQL condition on the ``pc p`` row, e.g.::
+
+    ram_total_gb >= 16 and gpu ~ "RTX"
+    disk.size_gb > 1000 or tag in (Office, Lab)
+    not tag = Server and submitted_at older than 30d
+
+Operators are ``= != > >= < <=``, ``~`` (contains, case-insensitive),
+``in (a, b, ...)`` and, for timestamps, ``older than`` / ``newer than``
+followed by a duration such as ``45m``, ``12h``, ``30d`` or ``2w``. Terms
+combine with ``and``, ``or``, ``not`` and parentheses. Attributes of GPUs,
+RAM sticks, disks and tags match when any of the PC's rows matches, via an
+EXISTS subquery. Field names are whitelisted; values are always bound as
+parameters.
+"""
+
+import re
+
+# Columns of the pc row itself
+PC_FIELDS = {
+    'id': 'p.id',
+    'host': 'p.host',
+    'serial': 'p.serial',
+    'cpu': 'p.cpu',
+    'mainboard': 'p.mainboard',
+    'ram_total_gb': 'p.ram_total_gb',
+    'ram_slots': 'p.ram_slots',
+    'resolution': 'p.resolution',
+    'notes': 'p.notes',
+    'submitted_at': 'p.submitted_at',
+}
+
+# Child table fields: name -> (FROM/JOIN clause with the pc_id correlation, column)
+CHILD_FIELDS = {
+    'gpu': ("gpu c", "c.name"),
+    'gpu.name': ("gpu c", "c.name"),
+    'ram.size_gb': ("ram_stick c", "c.size_gb"),
+    'ram.type': ("ram_stick c", "c.type"),
+    'ram.model': ("ram_stick c", "c.model"),
+    'disk.size_gb': ("disk c", "c.size_gb"),
+    'disk.model': ("disk c", "c.model"),
+    'disk.serial': ("disk c", "c.serial"),
+    'disk.path': ("disk c", "c.path"),
+    'tag': ("pc_tag c JOIN tag t ON c.tag_id = t.id", "t.name"),
+    'tag.name': ("pc_tag c JOIN tag t ON c.tag_id = t.id", "t.name"),
+}
+
+TIMESTAMP_FIELDS = {'submitted_at'}
+
+COMPARISONS = {'=', '!=', '>', '>=', '<', '<='}
+
+DURATION_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'days'}
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>>=|<=|!=|=|>|<|~|\(|\)|,)
+      | (?P<word>[^\s"'()<>=!~,]+)
+    )""", re.VERBOSE)
+
+
+class FilterError(ValueError):
+    """The filter expression could not be parsed."""
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise FilterError(f"Unexpected character at position {position}: {text[position]!r}")
+        position = match.end()
+        if match.group('string') is not None:
+            raw = match.group('string')[1:-1]
+            tokens.append(('value', re.sub(r'\\(.)', r'\1', raw)))
+        elif match.group('op') is not None:
+            tokens.append(('op', match.group('op')))
+        else:
+            tokens.append(('word', match.group('word')))
+    return tokens
+
+
+def parse_value(kind, text):
+    """Unquoted numbers are bound as numbers, everything else as text."""
+    if kind == 'word':
+        try:
+            return int(text)
+        except ValueError:
+            try:
+                return float(text)
+            except ValueError:
+                pass
+    return text
+
+
+def escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class Parser:
+    """Recursive-descent parser producing (sql, params).
+
+    Precedence from loosest to tightest: ``or``, ``and``, ``not``.
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.params = []
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise FilterError("Unexpected end of filter")
+        self.position += 1
+        return token
+
+    def accept_keyword(self, keyword):
+        kind, text = self.peek()
+        if kind == 'word' and text.lower() == keyword:
+            self.position += 1
+            return True
+        return False
+
+    def expect_op(self, op):
+        kind, text = self.next()
+        if kind != 'op' or text != op:
+            raise FilterError(f"Expected {op!r}, got {text!r}")
+
+    def parse(self):
+        if not self.tokens:
+            raise FilterError("Empty filter")
+        sql = self.parse_or()
+        if self.position != len(self.tokens):
+            raise FilterError(f"Unexpected {self.peek()[1]!r}")
+        return sql, self.params
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.accept_keyword('or'):
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else "(" + " OR ".join(terms) + ")"
+
+    def parse_and(self):
+        terms = [self.parse_not()]
+        while self.accept_keyword('and'):
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else "(" + " AND ".join(terms) + ")"
+
+    def parse_not(self):
+        if self.accept_keyword('not'):
+            return f"NOT {self.parse_not()}"
+        if self.peek() == ('op', '('):
+            self.next()
+            sql = self.parse_or()
+            self.expect_op(')')
+            return sql
+        return self.parse_predicate()
+
+    def parse_predicate(self):
+        kind, field = self.next()
+        field = field.lower()
+        if kind != 'word' or (field not in PC_FIELDS and field not in CHILD_FIELDS):
+            raise FilterError(f"Unknown field {field!r}")
+
+        condition = self.parse_condition(field)
+        if field in PC_FIELDS:
+            return condition.format(column=PC_FIELDS[field])
+
+        source, column = CHILD_FIELDS[field]
+        return f"EXISTS (SELECT 1 FROM {source} WHERE c.pc_id = p.id AND {condition.format(column=column)})"
+
+    def parse_condition(self, field):
+        """Parse the operator and value(s) after a field; returns SQL with a ``{column}`` placeholder."""
+        if self.accept_keyword('in'):
+            self.expect_op('(')
+            values = [parse_value(*self.next())]
+            while self.peek() == ('op', ','):
+                self.next()
+                values.append(parse_value(*self.next()))
+            self.expect_op(')')
+            self.params.extend(values)
+            return "{column} IN (" + ", ".join("?" * len(values)) + ")"
+
+        for keyword, op in (('older', '<'), ('newer', '>=')):
+            if self.accept_keyword(keyword):
+                if field not in TIMESTAMP_FIELDS:
+                    raise FilterError(f"'{keyword} than' only applies to {', '.join(sorted(TIMESTAMP_FIELDS))}")
+                if not self.accept_keyword('than'):
+                    raise FilterError(f"Expected 'than' after '{keyword}'")
+                self.params.append(self.parse_duration())
+                return "{column} " + op + " datetime('now', ?)"
+
+        kind, op = self.next()
+        if kind != 'op' or (op not in COMPARISONS and op != '~'):
+            raise FilterError(f"Expected an operator after {field!r}, got {op!r}")
+        value = parse_value(*self.next())
+        if op == '~':
+            self.params.append(f"%{escape_like(str(value))}%")
+            return "{column} LIKE ? ESCAPE '\\'"
+        self.params.append(value)
+        return "{column} " + op + " ?"
+
+    def parse_duration(self):
+        _, text = self.next()
+        match = re.fullmatch(r'(\d+)([mhdw])', text.lower())
+        if not match:
+            raise FilterError(f"Invalid duration {text!r}, expected e.g. 30d, 12h, 2w")
+        amount, unit = int(match.group(1)), match.group(2)
+        if unit == 'w':
+            amount *= 7
+        return f"-{amount} {DURATION_UNITS[unit]}"
+
+
+def compile_filter(text):
+    """Compile a filter expression into a SQL condition on ``pc p`` and its parameters."""
+    return Parser(text).parse()
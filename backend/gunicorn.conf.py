@@ -0,0 +1,45 @@
+"""
+Gunicorn settings for the hwdb backend.
+
+    gunicorn -c gunicorn.conf.py 'app:create_app()'
+
+Every value can be overridden from the environment. Send SIGHUP to the
+master process for a graceful reload: new workers are started with the
+current code and the old ones finish their in-flight requests first.
+"""
+
+import os
+
+import sizing
+
+bind = os.environ.get('HWDB_BIND', '0.0.0.0:5000')
+
+# One threaded worker: requests mostly wait on SQLite, which releases the
+# GIL, and a single process means a single write queue, so submissions are
+# written by exactly one thread. More workers each get their own queue; that
+# stays correct (writes take the lock with BEGIN IMMEDIATE) but the writers
+# then contend for it. The thread count also sizes the connection pool and
+# the /events stream cap, see sizing.py.
+worker_class = 'gthread'
+workers = int(os.environ.get('HWDB_WORKERS', 1))
+threads = sizing.THREADS
+
+keepalive = int(os.environ.get('HWDB_KEEPALIVE', 5))
+timeout = int(os.environ.get('HWDB_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('HWDB_GRACEFUL_TIMEOUT', 30))
+
+# Recycling workers guards against slow leaks, but is off by default: with a
+# single worker nothing serves new connections while it waits (up to
+# graceful_timeout) for open /events streams. Turn it on with several workers.
+max_requests = int(os.environ.get('HWDB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('HWDB_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Write out accepted submissions before a recycled or stopped worker goes away."""
+    import app
+    app.drain_write_queue()
@@ -0,0 +1,174 @@
+"""
+Hardware change history for /pc/<id>/history and /changes.
+
+A PC's hardware is split into sections: the ``system`` row (host, CPU,
+mainboard, ...) plus its GPUs, RAM sticks and disks. Each section's content
+is stored once in snapshot_blob, keyed by its hash, so identical sections
+(across resubmits and across machines) share a single row. pc_history is
+append-only and gets one (old hash, new hash) row per section that actually
+changed, so an unchanged daily resubmit records nothing.
+"""
+
+import hashlib
+import json
+import math
+import re
+
+# Child collections of a submission: section name -> (table, columns)
+CHILD_SECTIONS = {
+    "gpus": ("gpu", ("name",)),
+    "ram": ("ram_stick", ("size_gb", "type", "model")),
+    "disks": ("disk", ("size_gb", "model", "serial", "path")),
+}
+
+# Hardware columns of the pc row, kept as the single row of the "system" section
+SYSTEM_FIELDS = ("host", "cpu", "mainboard", "resolution", "ram_total_gb", "ram_slots")
+
+SECTION_COLUMNS = {"system": SYSTEM_FIELDS, **{section: columns for section, (_, columns) in CHILD_SECTIONS.items()}}
+
+# Section columns declared INTEGER in schema.sql; all others are TEXT
+INTEGER_COLUMNS = {"size_gb", "ram_total_gb"}
+
+# Text that SQLite's INTEGER affinity turns into a number
+NUMERIC_TEXT = re.compile(r"\s*[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?\s*")
+
+
+def content_hash(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def stored_value(value, integer: bool):
+    """``value`` as SQLite stores it in an INTEGER (``integer``) or TEXT column.
+
+    E.g. 8.0 is stored as 8 in an INTEGER column and as '8.0' in a TEXT one.
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, bool):
+        value = int(value)
+    if integer:
+        if isinstance(value, str) and NUMERIC_TEXT.fullmatch(value):
+            value = float(value) if re.search(r"[.eE]", value) else int(value)
+        if isinstance(value, float) and value.is_integer() and -2**63 <= value < 2**63:
+            value = int(value)
+    elif isinstance(value, int):
+        value = str(value)
+    elif isinstance(value, float):
+        # SQLite renders a REAL as text with printf("%!.15g")
+        mantissa, exponent = ("%.15g" % value).partition("e")[::2]
+        if "." not in mantissa and mantissa.lstrip("-").isdigit():
+            mantissa += ".0"
+        value = f"{mantissa}e{exponent}" if exponent else mantissa
+    return value
+
+
+def normalize_rows(section, rows) -> list:
+    """Rows of ``section`` as they read back once stored, so hashes of new and stored rows agree."""
+    integer = [column in INTEGER_COLUMNS for column in SECTION_COLUMNS[section]]
+    return [tuple(stored_value(value, is_integer) for value, is_integer in zip(row, integer)) for row in rows]
+
+
+def record_change(cur, pc_id, section, old_hash, new_hash, rows, changed_at=None):
+    """Store the new content of a section (if not stored yet) and log the change."""
+    cur.execute(
+        "INSERT OR IGNORE INTO snapshot_blob (hash, body) VALUES (?, ?)",
+        (new_hash, json.dumps(rows, separators=(',', ':')))
+    )
+    cur.execute(
+        "INSERT INTO pc_history (pc_id, section, old_hash, new_hash, changed_at) "
+        "VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+        (pc_id, section, old_hash, new_hash, changed_at)
+    )
+
+
+def stored_sections(cur, pc_id) -> dict:
+    """Current rows of every section of a PC, as merge_submission would hash them."""
+    columns = ", ".join(SYSTEM_FIELDS)
+    cur.execute(f"SELECT {columns} FROM pc WHERE id = ?", (pc_id,))
+    sections = {"system": [tuple(cur.fetchone())]}
+    for section, (table, columns) in CHILD_SECTIONS.items():
+        cur.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE pc_id = ? ORDER BY id", (pc_id,))
+        sections[section] = cur.fetchall()
+    return sections
+
+
+def backfill_history(cur):
+    """Record every existing PC's current hardware as its first history entry."""
+    cur.execute("SELECT id, submitted_at FROM pc")
+    for pc_id, submitted_at in cur.fetchall():
+        for section, rows in stored_sections(cur, pc_id).items():
+            digest = content_hash(rows)
+            record_change(cur, pc_id, section, None, digest, rows, submitted_at)
+            cur.execute("""
+                INSERT INTO pc_section_hash (pc_id, section, hash) VALUES (?, ?, ?)
+                ON CONFLICT(pc_id, section) DO UPDATE SET hash = excluded.hash
+            """, (pc_id, section, digest))
+
+
+def rehash_sections(cur):
+    """Recompute pc_section_hash from the stored rows.
+
+    Hashes used to be taken from the raw payload, so e.g. a RAM stick sent as
+    8.0 GB hashed differently from the 8 that was stored.
+    """
+    cur.execute("SELECT id FROM pc")
+    for (pc_id,) in cur.fetchall():
+        for section, rows in stored_sections(cur, pc_id).items():
+            digest = content_hash(rows)
+            cur.execute(
+                "INSERT OR IGNORE INTO snapshot_blob (hash, body) VALUES (?, ?)",
+                (digest, json.dumps(rows, separators=(',', ':')))
+            )
+            cur.execute("""
+                INSERT INTO pc_section_hash (pc_id, section, hash) VALUES (?, ?, ?)
+                ON CONFLICT(pc_id, section) DO UPDATE SET hash = excluded.hash
+            """, (pc_id, section, digest))
+
+
+def load_blobs(cur, hashes) -> dict:
+    hashes = list({digest for digest in hashes if digest})
+    blobs = {}
+    for start in range(0, len(hashes), 500):
+        chunk = hashes[start:start + 500]
+        cur.execute(f"SELECT hash, body FROM snapshot_blob WHERE hash IN ({', '.join('?' * len(chunk))})", chunk)
+        blobs.update((digest, json.loads(body)) for digest, body in cur.fetchall())
+    return blobs
+
+
+def diff_section(section, old_rows, new_rows) -> dict:
+    """Describe a change: changed fields for ``system``, added/removed rows otherwise."""
+    columns = SECTION_COLUMNS[section]
+    if section == "system":
+        old = dict(zip(columns, old_rows[0])) if old_rows else {}
+        new = dict(zip(columns, new_rows[0]))
+        return {"changed": {
+            field: {"old": old.get(field), "new": new[field]}
+            for field in columns if old.get(field) != new[field]
+        }}
+
+    # Multiset difference, so losing one of two identical sticks still shows up
+    removed = list(old_rows or [])
+    added = []
+    for row in new_rows:
+        if row in removed:
+            removed.remove(row)
+        else:
+            added.append(row)
+    return {
+        "added": [dict(zip(columns, row)) for row in added],
+        "removed": [dict(zip(columns, row)) for row in removed],
+    }
+
+
+def history_events(cur, rows) -> list:
+    """Turn (id, pc_id, host, section, old_hash, new_hash, changed_at) rows into change events."""
+    blobs = load_blobs(cur, [row[4] for row in rows] + [row[5] for row in rows])
+    events = []
+    for event_id, pc_id, host, section, old_hash, new_hash, changed_at in rows:
+        event = {
+            "id": event_id, "pc_id": pc_id, "host": host, "section": section, "changed_at": changed_at,
+            "initial": old_hash is None,
+        }
+        event.update(diff_section(section, blobs.get(old_hash), blobs[new_hash]))
+        events.append(event)
+    return events
@@ -1,41 +1,257 @@
 import subprocess
 import re
+import hashlib
+import os
+import sys
+import threading
+import fcntl
+import glob
+import gzip
+import random
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
+import argparse
 import json
+import math
 import time
 
-def wait_for_internet(timeout: int = 300) -> bool:
-    """Wait for internet connection by pinging 8.8.8.8"""
-    start_time = time.time()
-    while time.time() - start_time < timeout:
+# Seconds any single external probe (lshw, fdisk, smartctl, fastfetch) may take
+PROBE_TIMEOUT = 120
+PROBE_WORKERS = 8
+
+SUBMIT_URL = 'https://hwdb.vgscq.cc/submit'
+
+# Section hashes of the last submission the server accepted
+FINGERPRINT_PATH = os.environ.get('HWINFO_FINGERPRINT', '/var/lib/hwinfo/fingerprint.json')
+
+# Raw lshw and smartctl output, reused while the hardware identity is unchanged
+PROBE_CACHE_PATH = os.environ.get('HWINFO_PROBE_CACHE', '/var/lib/hwinfo/probe-cache.json')
+PROBE_CACHE_MAX_AGE = 7 * 24 * 3600
+# Probes whose output is cached; fdisk and fastfetch are cheap and always run,
+# which also keeps monitor changes current
+CACHED_PROBES = ('lshw', 'smartctl')
+
+# Collected payloads wait here until the server has accepted them
+SPOOL_DIR = os.environ.get('HWINFO_SPOOL', '/var/lib/hwinfo/spool')
+# Oldest payloads are dropped beyond this many
+SPOOL_MAX_FILES = 50
+
+# Flush retries back off exponentially (with full jitter) up to RETRY_MAX_DELAY
+# seconds; a flusher gives up after FLUSH_DEADLINE seconds and the next run
+# picks up whatever is still spooled
+RETRY_BASE_DELAY = 2
+RETRY_MAX_DELAY = 300
+FLUSH_DEADLINE = 6 * 3600
+REQUEST_TIMEOUT = 10
+
+FDISK_DISK_PATTERN = r'Disk\s+(/dev/(?:sd[a-z]|nvme\d+n\d+)):\s+([\d,.]+)\s+(?:GiB|bytes).*\nDisk model:\s+([^\n]+)'
+
+# The disks the fdisk pattern above reports, by /sys/block name
+SYSFS_DISK_PATTERN = re.compile(r'(?:sd[a-z]|nvme\d+n\d+)')
+
+PCI_IDS_PATHS = ('usr/share/hwdata/pci.ids', 'usr/share/misc/pci.ids')
+PCI_IDS_SECTION_END = re.compile(r'\n[0-9a-fC]')
+
+# Files SysfsInfo reads, copied into a fixture's sysfs/ directory by --record
+SYSFS_FIXTURE_GLOBS = (
+    'sys/class/dmi/id/*', 'sys/firmware/dmi/entries/17-*/raw', 'proc/cpuinfo',
+    'sys/block/*/size', 'sys/block/*/device/model', 'sys/block/*/device/serial', 'sys/block/*/device/vpd_pg80',
+    'sys/bus/pci/devices/*/class', 'sys/bus/pci/devices/*/vendor', 'sys/bus/pci/devices/*/device',
+    'sys/class/drm/*/status', 'sys/class/drm/*/edid', *PCI_IDS_PATHS,
+)
+
+# DRM connector types of built-in panels; everything else is external
+BUILTIN_CONNECTORS = ('eDP', 'LVDS', 'DSI')
+
+# SMBIOS memory device (type 17) fields, named the way lshw describes them
+DMI_MEMORY_FORM_FACTORS = {
+    0x03: 'SIMM', 0x04: 'SIP', 0x05: 'Chip', 0x06: 'DIP', 0x07: 'ZIP', 0x08: 'Proprietary Card',
+    0x09: 'DIMM', 0x0A: 'TSOP', 0x0B: 'Row of chips', 0x0C: 'RIMM', 0x0D: 'SODIMM', 0x0E: 'SRIMM',
+    0x0F: 'FB-DIMM', 0x10: 'Die',
+}
+DMI_MEMORY_TYPES = {
+    0x03: 'DRAM', 0x04: 'EDRAM', 0x05: 'VRAM', 0x06: 'SRAM', 0x07: 'RAM', 0x08: 'ROM', 0x09: 'FLASH',
+    0x0A: 'EEPROM', 0x0B: 'FEPROM', 0x0C: 'EPROM', 0x0D: 'CDRAM', 0x0E: '3DRAM', 0x0F: 'SDRAM',
+    0x10: 'SGRAM', 0x11: 'RDRAM', 0x12: 'DDR', 0x13: 'DDR2', 0x14: 'DDR2 FB-DIMM', 0x18: 'DDR3',
+    0x19: 'FBD2', 0x1A: 'DDR4', 0x1B: 'LPDDR', 0x1C: 'LPDDR2', 0x1D: 'LPDDR3', 0x1E: 'LPDDR4',
+    0x20: 'HBM', 0x21: 'HBM2', 0x22: 'DDR5', 0x23: 'LPDDR5',
+}
+# Type detail bit -> name
+DMI_MEMORY_TYPE_DETAILS = {
+    3: 'Fast-paged', 4: 'Static column', 5: 'Pseudo-static', 6: 'RAMBUS', 7: 'Synchronous', 8: 'CMOS',
+    9: 'EDO', 10: 'Window DRAM', 11: 'Cache DRAM', 12: 'Non-volatile', 13: 'Registered (Buffered)',
+    14: 'Unbuffered (Unregistered)', 15: 'LRDIMM',
+}
+
+def section_hashes(payload: Dict) -> Dict[str, str]:
+    """Hash every section of a to_dict() payload except the serial."""
+    return {
+        key: hashlib.sha256(json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+        for key, value in payload.items() if key != 'serial'
+    }
+
+def load_fingerprint() -> Dict:
+    try:
+        with open(FINGERPRINT_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_fingerprint(serial: str, hashes: Dict[str, str]) -> None:
+    try:
+        os.makedirs(os.path.dirname(FINGERPRINT_PATH), exist_ok=True)
+        tmp_path = f"{FINGERPRINT_PATH}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"serial": serial, "sections": hashes}, f)
+        os.replace(tmp_path, FINGERPRINT_PATH)
+    except OSError as e:
+        print(f"Error saving fingerprint: {e}")
+
+def delta_payload(payload: Dict, hashes: Dict[str, str], fingerprint: Dict) -> Dict:
+    """Reduce a payload to the sections that changed since the last accepted submission.
+
+    With no usable fingerprint the full payload is returned. With no changes
+    only the serial is sent, which the server treats as a heartbeat.
+    """
+    if fingerprint.get('serial') != payload['serial'] or not fingerprint.get('sections'):
+        return payload
+    changed = {key: payload[key] for key, digest in hashes.items() if fingerprint['sections'].get(key) != digest}
+    return {"serial": payload['serial'], "partial": True, **changed}
+
+def spool_payload(payload: Dict) -> str:
+    """Write a payload to the spool (atomically, fsynced) and return its path."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, f"{time.time_ns()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    for stale in spooled_paths()[:-SPOOL_MAX_FILES]:
+        discard_spooled(stale)
+    return path
+
+def discard_spooled(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass  # already pruned by a newer run
+
+def spooled_paths() -> List[str]:
+    """Spooled payloads, oldest first."""
+    try:
+        names = os.listdir(SPOOL_DIR)
+    except FileNotFoundError:
+        return []
+    return [os.path.join(SPOOL_DIR, name) for name in sorted(names, key=lambda n: (len(n), n)) if name.endswith('.json')]
+
+def retry_delay(attempt: int) -> float:
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+def post_submission(session, body: Dict):
+    """POST a gzip-compressed body to /submit, waiting for the server to commit it"""
+    data = gzip.compress(json.dumps(body, separators=(',', ':')).encode('utf-8'))
+    return session.post(SUBMIT_URL, params={'sync': '1'}, data=data, timeout=REQUEST_TIMEOUT,
+                        headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+
+def committed(response) -> bool:
+    """Whether the server confirmed the submission is stored (a 202 means only queued)."""
+    if response.status_code != 200:
+        return False
+    try:
+        return response.json().get('status') == 'success'
+    except ValueError:
+        return False
+
+def submit_payload(session, payload: Dict):
+    """Send a payload, only the sections that changed since the last accepted one.
+
+    Returns the final response; 409 (the server does not know this PC, e.g.
+    it was deleted) is answered by resending everything. The fingerprint is
+    only updated once the server has committed the submission, so a write
+    that is lost after being queued is sent in full again next time.
+    """
+    hashes = section_hashes(payload)
+    body = delta_payload(payload, hashes, load_fingerprint())
+    response = post_submission(session, body)
+    if response.status_code == 409 and body is not payload:
+        response = post_submission(session, payload)
+    if committed(response):
+        save_fingerprint(payload['serial'], hashes)
+    return response
+
+def flush_spool(deadline: float = FLUSH_DEADLINE) -> bool:
+    """Send spooled payloads oldest first, retrying until they are accepted or the deadline passes.
+
+    Connection errors, 429, 5xx and submissions the server only queued
+    (202) are retried with backoff, honouring Retry-After; any other
+    rejection drops the payload, as resending it would not help. Only one flusher runs at a time. Returns True once the
+    spool is empty.
+    """
+    import requests
+
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    with open(os.path.join(SPOOL_DIR, '.lock'), 'w') as lock:
         try:
-            subprocess.run(['ping', '-c', '1', '8.8.8.8'], 
-                            stdout=subprocess.DEVNULL,
-                            stderr=subprocess.DEVNULL,
-                            check=True)
-            return True
-        except subprocess.CalledProcessError:
-            time.sleep(1)
-    return False
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False  # another flusher is on it
+
+        give_up = time.monotonic() + deadline
+        attempt = 0
+        with requests.Session() as session:
+            while True:
+                paths = spooled_paths()
+                if not paths:
+                    return True
+                path = paths[0]
+                try:
+                    with open(path) as f:
+                        payload = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Dropping unreadable spooled payload {path}: {e}")
+                    discard_spooled(path)
+                    continue
+
+                delay = None
+                try:
+                    response = submit_payload(session, payload)
+                    if response.status_code in (202, 429) or response.status_code >= 500:
+                        print(f"Submission not committed yet ({response.status_code}), will retry")
+                        if response.headers.get('Retry-After', '').isdigit():
+                            delay = int(response.headers['Retry-After'])
+                    else:
+                        print(response.text)
+                        discard_spooled(path)
+                        attempt = 0
+                        continue
+                except requests.RequestException as e:
+                    print(f"Error uploading info: {e}")
+
+                if delay is None:
+                    delay = retry_delay(attempt)
+                attempt += 1
+                if time.monotonic() + delay > give_up:
+                    return False
+                time.sleep(delay)
+
+def start_flush() -> None:
+    """Flush the spool from a detached process so the caller (e.g. boot) is not held up."""
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--flush'],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
 
 def upload_info(info) -> bool:
-    """Upload system info to example.com"""
-    import requests
-    
-    if not wait_for_internet():
-        return False
-        
+    """Spool system info for the hwdb server and start sending it in the background"""
     try:
-        response = requests.post(
-            'https://hwdb.vgscq.cc/submit',
-            json=info.to_dict(),
-            timeout=10
-        )
-        print(response.text)
-        return response.ok
-    except Exception as e:
-        print(f"Error uploading info: {e}")
+        spool_payload(info.to_dict())
+    except OSError as e:
+        print(f"Error spooling info: {e}")
         return False
+    start_flush()
+    return True
 
 def run_command(command: List[str]) -> str:
     try:
@@ -43,26 +259,230 @@ def run_command(command: List[str]) -> str:
     except subprocess.CalledProcessError:
         return ""
 
-class SystemInfo:
-    def __init__(self):
-        self.hw_info = json.loads(self._run_command(['sudo', 'lshw', '-json']))
+class CollectorUnavailable(Exception):
+    """The collector cannot read what it needs on this machine."""
+
+class Collector:
+    """The payload shape shared by the collectors, which provide the get_* methods."""
+
+    def to_dict(self) -> Dict:
+        return {
+            "host": self.get_host(),
+            "serial": self.get_serial(),
+            "mainboard": self.get_mainboard(),
+            "cpu": self.get_cpu(),
+            "gpus": self.get_gpus(),
+            "resolution": self.get_resolution(),
+            #"local_ip": "N/A",
+            #"public_ip": "N/A",
+            "ram": self.get_ram(),
+            "disks": self.get_disks()
+        }
+
+def fixture_file(cmd: List[str]) -> str:
+    """Where a fixture directory keeps the captured output of a probe command."""
+    if 'smartctl' in cmd:
+        return os.path.join('smartctl', f"{os.path.basename(cmd[-1])}.txt")
+    tool = cmd[1] if cmd[0] == 'sudo' else cmd[0]
+    return 'lshw.json' if tool == 'lshw' else f"{tool}.txt"
+
+def record_sysfs(directory: str) -> None:
+    """Copy the sysfs and procfs files SysfsInfo reads into ``directory``/sysfs."""
+    for pattern in SYSFS_FIXTURE_GLOBS:
+        for path in glob.glob(os.path.join('/', pattern)):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue  # directories, and files only root may read
+            target = os.path.join(directory, 'sysfs', os.path.relpath(path, '/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+def hardware_identity(root: str = '/') -> str:
+    """Cheap fingerprint of the hardware the cached probes describe.
+
+    Covers the DMI product serial, the disks in /sys/block with their sizes
+    and the PCI vendor/device ids, plus the DMI memory devices and the CPU
+    model so RAM and CPU swaps count as changes too.
+    """
+    def read(path: str) -> bytes:
+        try:
+            with open(os.path.join(root, path), 'rb') as f:
+                return f.read()
+        except OSError:
+            return b''
+
+    def listdir(path: str) -> List[str]:
+        try:
+            return sorted(os.listdir(os.path.join(root, path)))
+        except OSError:
+            return []
+
+    parts = [b'serial', read('sys/class/dmi/id/product_serial').strip()]
+    for name in listdir('sys/block'):
+        if SYSFS_DISK_PATTERN.fullmatch(name):
+            parts += [b'disk', name.encode(), read(f'sys/block/{name}/size').strip()]
+    for address in listdir('sys/bus/pci/devices'):
+        parts += [b'pci', address.encode(), read(f'sys/bus/pci/devices/{address}/vendor').strip(),
+                  read(f'sys/bus/pci/devices/{address}/device').strip()]
+    for name in listdir('sys/firmware/dmi/entries'):
+        if name.startswith('17-'):
+            parts += [b'memory', read(f'sys/firmware/dmi/entries/{name}/raw')]
+    cpu = re.search(rb'^model name\s*:(.*)$', read('proc/cpuinfo'), re.MULTILINE)
+    parts += [b'cpu', cpu.group(1).strip() if cpu else b'']
+    return hashlib.sha256(b'\0'.join(parts)).hexdigest()
+
+class ProbeCache:
+    """On-disk cache of raw probe output, valid while the hardware identity matches.
+
+    The cache is dropped when the identity changes, when it is older than
+    ``max_age`` seconds, or with ``refresh``. Probes run on a miss are stored
+    by save(). report() says what happened, for the agent's log.
+    """
+
+    def __init__(self, path: str = PROBE_CACHE_PATH, max_age: float = PROBE_CACHE_MAX_AGE, refresh: bool = False):
+        self.path = path
+        self.identity = hardware_identity()
+        self._lock = threading.Lock()
+        self.hits = []
+        self.misses = []
+
+        entry = {}
+        if refresh:
+            self.reason = "refresh requested"
+        else:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                pass
+            if not entry:
+                self.reason = "no cache"
+            elif entry.get('identity') != self.identity:
+                self.reason = "hardware changed"
+            elif time.time() - entry.get('created_at', 0) > max_age:
+                self.reason = "expired"
+            else:
+                self.reason = None
+        if self.reason is not None:
+            entry = {}
+        self.created_at = entry.get('created_at', time.time())
+        self.outputs = entry.get('outputs', {})
+        self.dirty = False
+
+    @staticmethod
+    def cacheable(cmd: List[str]) -> bool:
+        return any(probe in cmd for probe in CACHED_PROBES)
+
+    def get(self, cmd: List[str]) -> Optional[str]:
+        key = fixture_file(cmd)
+        with self._lock:
+            output = self.outputs.get(key)
+            (self.hits if output is not None else self.misses).append(key)
+        return output
+
+    def put(self, cmd: List[str], output: str) -> None:
+        with self._lock:
+            self.outputs[fixture_file(cmd)] = output
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"identity": self.identity, "created_at": self.created_at, "outputs": self.outputs}, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Error saving probe cache: {e}")
+
+    def report(self) -> str:
+        if not self.misses:
+            age = (time.time() - self.created_at) / 3600
+            return f"Probe cache hit: reused {len(self.hits)} probe outputs from {age:.1f} hours ago"
+        reason = self.reason or "new probes"
+        return f"Probe cache miss ({reason}): ran {len(self.misses)} probes, reused {len(self.hits)}"
+
+class SystemInfo(Collector):
+    """Collects through lshw, fdisk, smartctl and fastfetch (needs root).
+
+    With ``replay_dir`` the probes are not run; their output is read from the
+    files fixture_file() names in that directory instead, and a missing file
+    counts as a failed probe. With ``record_dir`` the output of every probe
+    is saved there in the same layout. With a ``probe_cache`` the lshw and
+    smartctl output is taken from it when the hardware has not changed.
+    """
+
+    def __init__(self, replay_dir: Optional[str] = None, record_dir: Optional[str] = None,
+                 probe_cache: Optional[ProbeCache] = None):
+        self.replay_dir = replay_dir
+        self.record_dir = record_dir
+        self.probe_cache = probe_cache
+        # The probes are independent, so run them side by side; the smartctl
+        # calls start as soon as fdisk has listed the disks. Collection takes
+        # as long as the slowest probe instead of the sum of all of them.
+        with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as executor:
+            lshw = executor.submit(self._run_command, ['sudo', 'lshw', '-json'])
+            fastfetch = executor.submit(self._run_command, ['fastfetch', '-l', 'none'])
+            fdisk = executor.submit(self._run_command, ['fdisk', '-l'])
+
+            self.fdisk_output = fdisk.result()
+            serials = {
+                match.group(1): executor.submit(self._get_disk_serial, match.group(1))
+                for match in re.finditer(FDISK_DISK_PATTERN, self.fdisk_output)
+            }
+            self.hw_info = json.loads(lshw.result())
+            self.fastfetch_output = fastfetch.result()
+            self.disk_serials = {path: future.result() for path, future in serials.items()}
+
+        if self.probe_cache is not None:
+            self.probe_cache.save()
+            print(self.probe_cache.report(), file=sys.stderr)
+        self.nodes_by_class = self._index_by_class(self.hw_info)
 
     def _run_command(self, cmd: List[str]) -> str:
-        return subprocess.check_output(cmd, text=True)
+        if self.replay_dir is not None:
+            try:
+                with open(os.path.join(self.replay_dir, fixture_file(cmd))) as f:
+                    return f.read()
+            except FileNotFoundError:
+                raise subprocess.CalledProcessError(1, cmd)
 
-    def _find_by_class(self, class_name: str) -> List[Dict]:
-        def recursive_search(node):
-            results = []
+        cache = self.probe_cache if self.probe_cache is not None and self.probe_cache.cacheable(cmd) else None
+        output = cache.get(cmd) if cache is not None else None
+        if output is None:
+            output = subprocess.check_output(cmd, text=True, timeout=PROBE_TIMEOUT)
+            if cache is not None:
+                cache.put(cmd, output)
+        if self.record_dir is not None:
+            path = os.path.join(self.record_dir, fixture_file(cmd))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(output)
+        return output
+
+    @staticmethod
+    def _index_by_class(root) -> Dict[str, List[Dict]]:
+        """Map every lshw class to its nodes (in document order) in one pass over the tree."""
+        index = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
             if isinstance(node, dict):
-                if node.get('class') == class_name:
-                    results.append(node)
-                for value in node.values():
-                    results.extend(recursive_search(value))
+                if isinstance(node.get('class'), str):
+                    index.setdefault(node['class'], []).append(node)
+                stack.extend(reversed(list(node.values())))
             elif isinstance(node, list):
-                for item in node:
-                    results.extend(recursive_search(item))
-            return results
-        return recursive_search(self.hw_info)
+                stack.extend(reversed(node))
+        return index
+
+    def _find_by_class(self, class_name: str) -> List[Dict]:
+        return self.nodes_by_class.get(class_name, [])
 
     def get_ram(self) -> Dict:
         memory_banks = self._find_by_class('memory')
@@ -72,10 +492,11 @@ class SystemInfo:
         used_slots = 0
 
         for bank in memory_banks:
-            # Handle VM style memory banks
+            # Handle VM style memory banks (physical "bank:N" children are
+            # counted on their own below)
             if bank.get('id') == 'memory' and bank.get('children'):
                 for child in bank.get('children', []):
-                    if child.get('description', '').startswith('DIMM'):
+                    if child.get('description', '').startswith('DIMM') and not child.get('id', '').startswith('bank:'):
                         total_slots += 1
                         if child.get('size', 0) > 0:
                             used_slots += 1
@@ -98,7 +519,7 @@ class SystemInfo:
                     sticks.append({
                         "size_gb": size_gb,
                         "type": bank.get('description', 'Unknown'),
-                        "model": child.get('product', 'Unknown')
+                        "model": bank.get('product', 'Unknown')
                     })
 
         return {
@@ -112,23 +533,20 @@ class SystemInfo:
             output = self._run_command(['sudo', 'smartctl', '-i', disk_path])
             serial_match = re.search(r'Serial Number:\s*(.+)', output)
             return serial_match.group(1) if serial_match else "None"
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
             return "None"
 
     def get_disks(self) -> List[Dict[str, str]]:
-        # Run fdisk -l and capture output
-        fdisk_output = self._run_command(['fdisk', '-l'])
+        fdisk_output = self.fdisk_output
         disks = []
         
-        # Updated regex pattern to match the actual fdisk output format
-        disk_pattern = r'Disk\s+(/dev/(?:sd[a-z]|nvme\d+n\d+)):\s+([\d,.]+)\s+(?:GiB|bytes).*\nDisk model:\s+([^\n]+)'
-        matches = re.finditer(disk_pattern, fdisk_output)
+        matches = re.finditer(FDISK_DISK_PATTERN, fdisk_output)
         
         for match in matches:
             path = match.group(1)
             size_str = match.group(2).replace(',', '.')  # Handle decimal separator
             model = match.group(3).strip()
-            serial = self._get_disk_serial(path)
+            serial = self.disk_serials[path]
 
             # Convert size to bytes if needed
             if 'GiB' in fdisk_output[match.start():match.end()]:
@@ -146,15 +564,17 @@ class SystemInfo:
         return disks
 
     def get_cpu(self) -> str:
-        cpu_info = self._find_by_class('processor')[0] if self._find_by_class('processor') else {}
+        processors = self._find_by_class('processor')
+        cpu_info = processors[0] if processors else {}
         return cpu_info.get('product', 'N/A')
 
     def get_mainboard(self) -> str:
-        baseboard_info = self._find_by_class('bus')[0] if self._find_by_class('bus')[0] else {}
+        buses = self._find_by_class('bus')
+        baseboard_info = buses[0] if buses else {}
         return baseboard_info.get('product', 'N/A')
 
     def get_resolution(self) -> str:
-        fastfetch_output = self._run_command(['fastfetch', '-l', 'none'])
+        fastfetch_output = self.fastfetch_output
         display_matches = re.findall(r'Display\s+\(([^)]+)\):\s+(\d+x\d+)\s+@\s+(\d+)\s+Hz\s+in\s+(\d+)"\s+\[([^\]]+)\]', fastfetch_output)
         if display_matches:
             displays = []
@@ -170,25 +590,287 @@ class SystemInfo:
         serial = self.hw_info.get('serial', 'N/A')
         return "VM" if "QEMU" in self.get_host() else serial
 
-    def to_dict(self) -> Dict:
-        system = self.hw_info
-        gpus = self._find_by_class('display')
-        
+    def get_gpus(self) -> List[str]:
+        return [gpu.get('product', 'Unknown') for gpu in self._find_by_class('display')]
+
+def smbios_string(raw: bytes, offset: int) -> str:
+    """The string an SMBIOS structure field at ``offset`` refers to ('' if unset)."""
+    if offset >= raw[1] or not raw[offset]:
+        return ''
+    strings = raw[raw[1]:].split(b'\0')
+    index = raw[offset] - 1
+    return strings[index].decode('ascii', 'replace').strip() if index < len(strings) else ''
+
+def parse_memory_device(raw: bytes) -> Optional[Dict]:
+    """Decode an SMBIOS memory device (type 17) into a RAM stick, or None for an empty slot."""
+    length = raw[1]
+    size = int.from_bytes(raw[0x0C:0x0E], 'little') if length > 0x0D else 0
+    if size in (0, 0xFFFF):
+        return None
+    if size == 0x7FFF and length > 0x1F:
+        size_bytes = (int.from_bytes(raw[0x1C:0x20], 'little') & 0x7FFFFFFF) * 1024**2
+    elif size & 0x8000:
+        size_bytes = (size & 0x7FFF) * 1024
+    else:
+        size_bytes = size * 1024**2
+
+    model = smbios_string(raw, 0x1A) if length > 0x1A else ''
+    if model == 'NO DIMM':
+        return None
+
+    words = []
+    if length > 0x0E and raw[0x0E] in DMI_MEMORY_FORM_FACTORS:
+        words.append(DMI_MEMORY_FORM_FACTORS[raw[0x0E]])
+    if length > 0x12 and raw[0x12] in DMI_MEMORY_TYPES:
+        words.append(DMI_MEMORY_TYPES[raw[0x12]])
+    if length > 0x14:
+        detail = int.from_bytes(raw[0x13:0x15], 'little')
+        words.extend(name for bit, name in DMI_MEMORY_TYPE_DETAILS.items() if detail & (1 << bit))
+    if length > 0x16:
+        speed = int.from_bytes(raw[0x15:0x17], 'little')
+        if speed not in (0, 0xFFFF):
+            words.append(f"{speed} MHz ({1000 / speed:.1f} ns)")
+
+    return {
+        "size_gb": size_bytes // (1024**3),
+        "type": ' '.join(words) or 'Unknown',
+        "model": model or 'Unknown'
+    }
+
+def parse_edid(edid: bytes) -> Optional[Dict]:
+    """Monitor name, preferred mode and diagonal (inches) from an EDID block, or None if invalid."""
+    if len(edid) < 128 or edid[:8] != b'\x00\xff\xff\xff\xff\xff\xff\x00':
+        return None
+
+    name = None
+    for offset in (54, 72, 90, 108):
+        descriptor = edid[offset:offset + 18]
+        if descriptor[:3] == b'\x00\x00\x00' and descriptor[3] == 0xFC:
+            name = descriptor[5:].split(b'\n')[0].decode('ascii', 'replace').strip()
+
+    timing = edid[54:72]
+    pixel_clock = int.from_bytes(timing[0:2], 'little') * 10000
+    if not pixel_clock:
+        return None
+    width = timing[2] | (timing[4] & 0xF0) << 4
+    height = timing[5] | (timing[7] & 0xF0) << 4
+    total = (width + (timing[3] | (timing[4] & 0x0F) << 8)) * (height + (timing[6] | (timing[7] & 0x0F) << 8))
+    width_mm = timing[12] | (timing[14] & 0xF0) << 4
+    height_mm = timing[13] | (timing[14] & 0x0F) << 8
+    if not width_mm or not height_mm:
+        width_mm, height_mm = edid[21] * 10, edid[22] * 10
+
+    return {
+        "name": name,
+        "resolution": f"{width}x{height}",
+        "refresh_rate": round(pixel_clock / total) if total else 0,
+        "size": int(math.hypot(width_mm, height_mm) / 25.4 + 0.5)
+    }
+
+class SysfsInfo(Collector):
+    """Collects the same facts as SystemInfo from sysfs and procfs, without running anything.
+
+    DMI (host, serial, board, memory devices) comes from /sys/class/dmi and
+    /sys/firmware/dmi, the CPU from /proc/cpuinfo, disks from /sys/block,
+    GPUs from /sys/bus/pci (named through pci.ids) and displays from the EDID
+    of connected DRM connectors. The serial and memory devices are readable
+    by root only; CollectorUnavailable is raised when they cannot be read so
+    the caller can fall back to SystemInfo. ``root`` prefixes every path.
+    """
+
+    def __init__(self, root: str = '/'):
+        self.root = root
+        if not os.path.isdir(self._path('sys/class/dmi/id')):
+            raise CollectorUnavailable("no DMI in sysfs")
+        self.serial = self._read_text('sys/class/dmi/id/product_serial')
+        if self.serial is None:
+            raise CollectorUnavailable("DMI product serial is not readable")
+
+        entries = self._path('sys/firmware/dmi/entries')
+        try:
+            banks = sorted((name for name in os.listdir(entries) if name.startswith('17-')),
+                           key=lambda name: int(name[3:]))
+        except OSError:
+            banks = []
+        self.memory_devices = [self._read_bytes(f'sys/firmware/dmi/entries/{name}/raw') for name in banks]
+        if not self.memory_devices or None in self.memory_devices:
+            raise CollectorUnavailable("DMI memory devices are not readable")
+
+    def _path(self, path: str) -> str:
+        return os.path.join(self.root, path)
+
+    def _read_bytes(self, path: str) -> Optional[bytes]:
+        try:
+            with open(self._path(path), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _read_text(self, path: str) -> Optional[str]:
+        data = self._read_bytes(path)
+        return None if data is None else data.decode('utf-8', 'replace').strip()
+
+    def get_ram(self) -> Dict:
+        sticks = [stick for stick in map(parse_memory_device, self.memory_devices) if stick]
         return {
-            "host": self.get_host(),
-            "serial": self.get_serial(),
-            "mainboard": self.get_mainboard(),
-            "cpu": self.get_cpu(),
-            "gpus": [gpu.get('product', 'Unknown') for gpu in gpus],
-            "resolution": self.get_resolution(),
-            #"local_ip": "N/A",
-            #"public_ip": "N/A",
-            "ram": self.get_ram(),
-            "disks": self.get_disks()
+            "total_size_gb": sum(stick["size_gb"] for stick in sticks),
+            "slots": f"{len(sticks)} / {len(self.memory_devices)}",
+            "sticks": sticks
         }
 
+    def _get_disk_serial(self, name: str) -> str:
+        if name.startswith('nvme'):
+            serial = self._read_text(f'sys/block/{name}/device/serial')
+        else:
+            # SCSI unit serial number VPD page: 4 byte header, then the serial
+            page = self._read_bytes(f'sys/block/{name}/device/vpd_pg80')
+            serial = page[4:4 + page[3]].decode('ascii', 'replace').strip() if page and len(page) > 4 else None
+        return serial or "None"
+
+    def get_disks(self) -> List[Dict[str, str]]:
+        try:
+            names = sorted(name for name in os.listdir(self._path('sys/block')) if SYSFS_DISK_PATTERN.fullmatch(name))
+        except OSError:
+            return []
+
+        disks = []
+        for name in names:
+            sectors = self._read_text(f'sys/block/{name}/size')
+            model = self._read_text(f'sys/block/{name}/device/model')
+            # fdisk skips empty drives (e.g. card readers) and shows no model line without one
+            if not sectors or not sectors.isdigit() or not int(sectors) or not model:
+                continue
+            disks.append({
+                "path": f"/dev/{name}",
+                "size": f"{int(sectors) * 512 // (1024**3)}G",
+                "model": model,
+                "serial": self._get_disk_serial(name)
+            })
+        return disks
+
+    def get_cpu(self) -> str:
+        cpuinfo = self._read_text('proc/cpuinfo') or ''
+        match = re.search(r'^model name\s*:\s*(.+)$', cpuinfo, re.MULTILINE)
+        return match.group(1).strip() if match else 'N/A'
+
+    def get_mainboard(self) -> str:
+        return self._read_text('sys/class/dmi/id/board_name') or 'N/A'
+
+    def _pci_names(self, ids) -> Dict:
+        """Device names from pci.ids for a set of (vendor, device) id pairs."""
+        for path in PCI_IDS_PATHS:
+            try:
+                with open(self._path(path), encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except OSError:
+                continue
+            names = {}
+            for vendor, device in ids:
+                # A vendor's devices run from its line to the next vendor (or class) line
+                start = text.find(f"\n{vendor}  ")
+                if start < 0:
+                    continue
+                end = PCI_IDS_SECTION_END.search(text, start + 1)
+                match = re.search(rf'^\t{re.escape(device)}  (.+)$', text[start:end.start() if end else None], re.MULTILINE)
+                if match:
+                    names[(vendor, device)] = match.group(1).strip()
+            return names
+        return {}
+
+    def get_gpus(self) -> List[str]:
+        devices = self._path('sys/bus/pci/devices')
+        try:
+            addresses = sorted(os.listdir(devices))
+        except OSError:
+            return []
+        ids = []
+        for address in addresses:
+            if (self._read_text(f'sys/bus/pci/devices/{address}/class') or '').startswith('0x03'):
+                vendor = (self._read_text(f'sys/bus/pci/devices/{address}/vendor') or '')[2:]
+                device = (self._read_text(f'sys/bus/pci/devices/{address}/device') or '')[2:]
+                ids.append((vendor, device))
+        names = self._pci_names(set(ids)) if ids else {}
+        return [names.get(pair, 'Unknown') for pair in ids]
+
+    def get_resolution(self) -> str:
+        try:
+            connectors = sorted(name for name in os.listdir(self._path('sys/class/drm')) if '-' in name)
+        except OSError:
+            return "N/A"
+
+        displays = []
+        for connector in connectors:
+            if self._read_text(f'sys/class/drm/{connector}/status') != 'connected':
+                continue
+            edid = parse_edid(self._read_bytes(f'sys/class/drm/{connector}/edid') or b'')
+            if edid is None:
+                continue
+            port = connector.split('-', 1)[1]
+            location = "Built-in" if port.startswith(BUILTIN_CONNECTORS) else "External"
+            displays.append(f"[{location}] {edid['name'] or port}: {edid['resolution']} @ {edid['refresh_rate']} Hz in {edid['size']}\"")
+        return ', '.join(displays) if displays else "N/A"
+
+    def get_host(self) -> str:
+        vendor = self._read_text('sys/class/dmi/id/sys_vendor') or 'Unknown'
+        product = self._read_text('sys/class/dmi/id/product_name') or 'Unknown'
+        # lshw reports the product as "name (SKU)" when the SKU is set
+        sku = self._read_text('sys/class/dmi/id/product_sku')
+        return f"{vendor} {product} ({sku})" if sku else f"{vendor} {product}"
+
+    def get_serial(self) -> str:
+        return "VM" if "QEMU" in self.get_host() else (self.serial or 'N/A')
+
+COLLECTORS = {'sysfs': SysfsInfo, 'lshw': SystemInfo}
+
+def collect_info(collector: str = 'lshw', replay_dir: Optional[str] = None, refresh: bool = False) -> Collector:
+    """Collect with the named collector; 'auto' tries sysfs first and falls back to lshw.
+
+    lshw stays the default until the sysfs collector has been checked
+    against captures of real machines; one known difference is that sysfs
+    reports each display's preferred mode where fastfetch reports the
+    current one.
+
+    The lshw collector reuses cached probe output unless ``refresh`` is set.
+    With ``replay_dir`` the collector reads a fixture instead of this machine:
+    sysfs reads its sysfs/ tree, lshw (and auto) its captured probe outputs.
+    """
+    if replay_dir is not None:
+        if collector == 'sysfs':
+            return SysfsInfo(os.path.join(replay_dir, 'sysfs'))
+        return SystemInfo(replay_dir=replay_dir)
+    if collector == 'sysfs':
+        return SysfsInfo()
+    if collector == 'auto':
+        try:
+            return SysfsInfo()
+        except CollectorUnavailable as e:
+            print(f"sysfs collector unavailable ({e}), falling back to lshw", file=sys.stderr)
+    return SystemInfo(probe_cache=ProbeCache(refresh=refresh))
+
 if __name__ == "__main__":
-    info = SystemInfo()
+    parser = argparse.ArgumentParser(description="Collect this machine's hardware and upload it to hwdb")
+    parser.add_argument('--flush', action='store_true', help="Only send what is already spooled")
+    parser.add_argument('--collector', choices=['auto', *COLLECTORS], default='lshw',
+                        help="sysfs reads /sys and /proc directly, lshw runs the external tools, "
+                             "auto tries sysfs first (default: lshw)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="Also save the probe outputs and sysfs files to DIR as a fixture (uses lshw)")
+    parser.add_argument('--replay', metavar='DIR', help="Collect from a fixture in DIR instead; prints, does not upload")
+    parser.add_argument('--refresh', action='store_true', help="Re-run lshw and smartctl even if their cached output is current")
+    args = parser.parse_args()
+
+    if args.flush:
+        sys.exit(0 if flush_spool() else 1)
+
+    if args.replay:
+        print(json.dumps(collect_info(args.collector, replay_dir=args.replay).to_dict(), indent=4))
+        sys.exit(0)
+
+    if args.record:
+        record_sysfs(args.record)
+        info = SystemInfo(record_dir=args.record)
+    else:
+        info = collect_info(args.collector, refresh=args.refresh)
     print(json.dumps(info.to_dict(), indent=4))
 
-    upload_info(info)
\ No newline at end of file
+    upload_info(info)
@@ -0,0 +1,295 @@
+"""
+Opt-in request and SQL instrumentation, served on /metrics.
+
+When enabled (``HWDB_METRICS=1``), every request records its latency in a
+per-route histogram and its response size, and pooled connections use a
+cursor that times each statement (execute and fetch) and counts the rows it
+returned. The totals are exposed in the Prometheus text format on /metrics,
+and each response carries a ``Server-Timing`` header splitting its time into
+connection checkout, SQL, JSON serialization and compression.
+
+When disabled nothing is installed: connections are plain sqlite3 ones and
+``phase()`` returns a shared no-op context manager.
+
+Counters live in the worker process; with several gunicorn workers each
+scrape reports the worker that answered it (see the ``worker`` label).
+"""
+
+import contextlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from flask import Response, g, has_app_context, request
+from flask.json.provider import JSONProvider
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Order of the phases in the Server-Timing header
+PHASES = ("db", "sql", "json", "compress")
+
+NO_OP = contextlib.nullcontext()
+
+# Bounds on the per-statement series: statements beyond the first
+# MAX_STATEMENT_LABELS are counted under OTHER_STATEMENT, and at most
+# MAX_CACHED_SQL issued strings keep their normalized form cached
+MAX_STATEMENT_LABELS = 500
+MAX_CACHED_SQL = 5000
+OTHER_STATEMENT = "(other)"
+
+# A parameter list such as "IN (?, ?, ?)", whose length varies with the input
+PARAMETER_LIST = re.compile(r'\bIN \(\?(?: ?, ?\?)*\)', re.IGNORECASE)
+
+
+def normalize_sql(sql) -> str:
+    """Collapse whitespace and variable-length parameter lists into one label."""
+    return PARAMETER_LIST.sub('IN (?+)', re.sub(r'\s+', ' ', sql).strip())
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values) -> str:
+    return ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram per label set."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        entry = self.series.get(labels)
+        if entry is None:
+            entry = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][index] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self, name, label_names, extra):
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            base = format_labels(label_names, labels) + extra
+            for bound, bucket_count in zip(self.buckets, counts):
+                yield f'{name}_bucket{{{base},le="{bound}"}} {bucket_count}'
+            yield f'{name}_bucket{{{base},le="+Inf"}} {count}'
+            yield f'{name}_sum{{{base}}} {total:.6f}'
+            yield f'{name}_count{{{base}}} {count}'
+
+
+class Metrics:
+    """Collects the request and SQL metrics of one worker process."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.requests = Histogram()
+        self.response_bytes = {}  # route -> bytes
+        self.phase_seconds = {}  # (route, phase) -> seconds
+        self.statements = {}  # normalized SQL -> [calls, seconds, rows]
+        self._normalized = {}  # SQL as issued -> normalized SQL
+        self.connection_factory = self._connection_factory() if enabled else sqlite3.Connection
+
+    def init_app(self, app):
+        """Hook the request timing into ``app`` and add the /metrics route."""
+        if not self.enabled:
+            return
+        app.json = TimedJSONProvider(app, self, app.json)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.render_response)
+
+    def phase(self, name):
+        """Context manager adding its duration to phase ``name`` of the current request."""
+        if not self.enabled or not has_app_context():
+            return NO_OP
+        return self._timed_phase(name)
+
+    @contextlib.contextmanager
+    def _timed_phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_phase(name, time.perf_counter() - start)
+
+    def _add_phase(self, name, seconds):
+        phases = g.get('metrics_phases')
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + seconds
+
+    def record_sql(self, sql, seconds, rows, call):
+        key = self._normalized.get(sql)
+        if key is None:
+            key = normalize_sql(sql)
+            if len(self._normalized) < MAX_CACHED_SQL:
+                self._normalized[sql] = key
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                if len(self.statements) >= MAX_STATEMENT_LABELS:
+                    key = OTHER_STATEMENT
+                entry = self.statements.setdefault(key, [0, 0.0, 0])
+            entry[0] += call
+            entry[1] += seconds
+            entry[2] += rows
+        if has_app_context():
+            self._add_phase("sql", seconds)
+            if call:
+                g.metrics_queries = g.get('metrics_queries', 0) + 1
+            g.metrics_rows = g.get('metrics_rows', 0) + rows
+
+    def _connection_factory(self):
+        metrics = self
+
+        class TimedCursor(sqlite3.Cursor):
+            """Cursor reporting the time and rows of each statement it runs."""
+
+            def _timed(self, sql, method, *args):
+                self._metrics_sql = sql
+                start = time.perf_counter()
+                try:
+                    return method(*args)
+                finally:
+                    metrics.record_sql(sql, time.perf_counter() - start, 0, 1)
+
+            def execute(self, sql, parameters=()):
+                return self._timed(sql, super().execute, sql, parameters)
+
+            def executemany(self, sql, seq_of_parameters):
+                return self._timed(sql, super().executemany, sql, seq_of_parameters)
+
+            def executescript(self, script):
+                return self._timed(script, super().executescript, script)
+
+            def _fetched(self, method, *args):
+                start = time.perf_counter()
+                rows = method(*args)
+                count = len(rows) if isinstance(rows, list) else int(rows is not None)
+                metrics.record_sql(getattr(self, '_metrics_sql', ''), time.perf_counter() - start, count, 0)
+                return rows
+
+            def fetchone(self):
+                return self._fetched(super().fetchone)
+
+            def fetchmany(self, size=None):
+                return self._fetched(super().fetchmany, self.arraysize if size is None else size)
+
+            def fetchall(self):
+                return self._fetched(super().fetchall)
+
+            def __next__(self):
+                start = time.perf_counter()
+                try:
+                    row = super().__next__()
+                except StopIteration:
+                    metrics.record_sql(getattr(self, '_metrics_sql', ''), time.perf_counter() - start, 0, 0)
+                    raise
+                metrics.record_sql(getattr(self, '_metrics_sql', ''), time.perf_counter() - start, 1, 0)
+                return row
+
+        class TimedConnection(sqlite3.Connection):
+            # Connection.execute() and friends build their cursor internally,
+            # so route them through cursor() to get a TimedCursor.
+            def cursor(self, factory=TimedCursor):
+                return super().cursor(factory)
+
+            def execute(self, sql, parameters=()):
+                return self.cursor().execute(sql, parameters)
+
+            def executemany(self, sql, seq_of_parameters):
+                return self.cursor().executemany(sql, seq_of_parameters)
+
+            def executescript(self, script):
+                return self.cursor().executescript(script)
+
+        return TimedConnection
+
+    def _start_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_phases = {}
+
+    def _finish_request(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        route = request.url_rule.rule if request.url_rule else "(unmatched)"
+        phases = g.metrics_phases
+
+        with self._lock:
+            self.requests.observe((route, request.method, response.status_code), total)
+            if response.content_length is not None:
+                self.response_bytes[route] = self.response_bytes.get(route, 0) + response.content_length
+            for phase, seconds in phases.items():
+                self.phase_seconds[(route, phase)] = self.phase_seconds.get((route, phase), 0.0) + seconds
+
+        timings = []
+        for phase in PHASES:
+            if phase in phases:
+                timing = f"{phase};dur={phases[phase] * 1000:.2f}"
+                if phase == "sql":
+                    timing += f';desc="{g.get("metrics_queries", 0)} queries, {g.get("metrics_rows", 0)} rows"'
+                timings.append(timing)
+        timings.append(f"total;dur={total * 1000:.2f}")
+        response.headers['Server-Timing'] = ", ".join(timings)
+        return response
+
+    def render(self) -> str:
+        worker = f',worker="{os.getpid()}"'
+        lines = [
+            "# HELP hwdb_request_duration_seconds Request latency per route, method and status.",
+            "# TYPE hwdb_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            lines.extend(self.requests.render("hwdb_request_duration_seconds", ("route", "method", "status"), worker))
+
+            lines.append("# HELP hwdb_request_phase_seconds_total Request time spent per phase (db checkout, sql, json, compress).")
+            lines.append("# TYPE hwdb_request_phase_seconds_total counter")
+            for (route, phase), seconds in sorted(self.phase_seconds.items()):
+                lines.append(f'hwdb_request_phase_seconds_total{{{format_labels(("route", "phase"), (route, phase))}{worker}}} {seconds:.6f}')
+
+            lines.append("# HELP hwdb_response_bytes_total Response body bytes per route (streamed bodies excluded).")
+            lines.append("# TYPE hwdb_response_bytes_total counter")
+            for route, size in sorted(self.response_bytes.items()):
+                lines.append(f'hwdb_response_bytes_total{{{format_labels(("route",), (route,))}{worker}}} {size}')
+
+            for name, index, kind, help_text in (
+                ("hwdb_sql_statements_total", 0, "counter", "Executions per SQL statement."),
+                ("hwdb_sql_seconds_total", 1, "counter", "Time spent executing and fetching per SQL statement."),
+                ("hwdb_sql_rows_total", 2, "counter", "Rows fetched per SQL statement."),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for statement, values in sorted(self.statements.items()):
+                    value = f"{values[index]:.6f}" if index == 1 else values[index]
+                    lines.append(f'{name}{{{format_labels(("statement",), (statement,))}{worker}}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def render_response(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+class TimedJSONProvider(JSONProvider):
+    """Wraps the app's JSON provider, reporting jsonify() time as the "json" phase."""
+
+    def __init__(self, app, metrics, provider):
+        super().__init__(app)
+        self.metrics = metrics
+        self.provider = provider
+
+    def dumps(self, obj, **kwargs):
+        return self.provider.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return self.provider.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        with self.metrics.phase("json"):
+            return self.provider.response(*args, **kwargs)
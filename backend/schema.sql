@@ -52,3 +52,13 @@ CREATE TABLE IF NOT EXISTS pc_tag (
     UNIQUE(pc_id, tag_id)
 );
 
+
+-- Content hash of each child collection (gpus, ram, disks) last stored for a
+-- PC, so unchanged resubmissions can skip rewriting the child rows.
+CREATE TABLE IF NOT EXISTS pc_section_hash (
+    pc_id TEXT,
+    section TEXT,
+    hash TEXT,
+    PRIMARY KEY(pc_id, section),
+    FOREIGN KEY(pc_id) REFERENCES pc(id) ON DELETE CASCADE
+) WITHOUT ROWID;
@@ -0,0 +1,19 @@
+"""
+Per-worker concurrency settings, shared by gunicorn.conf.py and the app.
+
+Kept apart from app.py so the gunicorn master can read them without
+importing the application (which would defeat reloading it on SIGHUP).
+"""
+
+import os
+
+# Request threads per gunicorn worker
+THREADS = int(os.environ.get('HWDB_THREADS', 32))
+
+# One pooled connection per request thread, so a busy worker never opens
+# (and configures) a connection just for one request
+POOL_SIZE = int(os.environ.get('HWDB_POOL_SIZE', THREADS))
+
+# Each /events stream holds a thread; at most half of them may do so,
+# keeping the rest free for the API
+MAX_EVENT_STREAMS = int(os.environ.get('HWDB_MAX_EVENT_STREAMS', max(1, THREADS // 2)))
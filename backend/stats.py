@@ -0,0 +1,153 @@
+"""
+Fleet rollups for the /stats endpoint.
+
+Every PC contributes to a handful of (dimension, group) counters kept in the
+stat_rollup table. Write paths subtract a PC's contributions before changing
+it and add them back afterwards, so the rollups stay current incrementally
+and a stats read is O(groups) instead of O(fleet).
+"""
+
+import contextlib
+import re
+
+# Lower bounds of the per-machine RAM and disk histograms
+RAM_BUCKETS_GB = [0, 4, 8, 16, 32, 64]
+DISK_BUCKETS_GB = [0, 256, 512, 1024, 2048, 4096]
+
+# dimension -> name of the summed amount in /stats output (None = counts only)
+DIMENSIONS = {
+    'machines': 'disk_tb',
+    'ram_gb': 'ram_gb',
+    'disk_gb': 'disk_tb',
+    'cpu_family': None,
+    'gpu_model': None,
+    'tag': 'disk_tb',
+}
+
+UNTAGGED = '(untagged)'
+UNKNOWN = 'Unknown'
+
+CPU_FAMILY_PATTERN = re.compile(
+    r'\b(Core\s+Ultra\s+\d|Core\s+i\d|Core\s*2|Xeon|Celeron|Pentium|Atom'
+    r'|Ryzen\s+Threadripper|Ryzen\s+\d|EPYC|Athlon|Phenom|FX)\b',
+    re.IGNORECASE
+)
+
+
+def bucket_label(value, bounds) -> str:
+    """Histogram bucket for ``value``, e.g. "8-15" or "64+"."""
+    if value is None:
+        return UNKNOWN
+    for lower, upper in zip(bounds, bounds[1:]):
+        if value < upper:
+            return f"{lower}-{upper - 1}"
+    return f"{bounds[-1]}+"
+
+
+def bucket_order(dimension):
+    """Sort key putting histogram buckets in ascending order."""
+    bounds = {'ram_gb': RAM_BUCKETS_GB, 'disk_gb': DISK_BUCKETS_GB}.get(dimension)
+    labels = [bucket_label(lower, bounds) for lower in bounds] if bounds else []
+    return lambda row: (labels.index(row[0]) if row[0] in labels else len(labels), -row[1], row[0])
+
+
+def cpu_family(cpu) -> str:
+    """Reduce a CPU model string to its family, e.g. "Intel Core i5" or "AMD Ryzen 7"."""
+    if not cpu or cpu == 'N/A':
+        return UNKNOWN
+    name = re.sub(r'\((?:R|TM)\)', ' ', cpu, flags=re.IGNORECASE)
+    vendor = 'Intel' if 'intel' in name.lower() else 'AMD' if 'amd' in name.lower() else ''
+    match = CPU_FAMILY_PATTERN.search(name)
+    if match:
+        return " ".join(f"{vendor} {match.group(1)}".split())
+    return " ".join(name.split()[:2])
+
+
+def pc_contributions(cur, pc_id):
+    """Return the (dimension, group, machines, amount) rows one PC adds to the rollups."""
+    cur.execute("SELECT cpu, ram_total_gb FROM pc WHERE id = ?", (pc_id,))
+    row = cur.fetchone()
+    if not row:
+        return []
+    cpu, ram_total_gb = row
+
+    cur.execute("SELECT COALESCE(SUM(size_gb), 0) FROM disk WHERE pc_id = ?", (pc_id,))
+    disk_gb = cur.fetchone()[0]
+    cur.execute("SELECT name FROM gpu WHERE pc_id = ?", (pc_id,))
+    gpus = list(dict.fromkeys(name or UNKNOWN for (name,) in cur.fetchall()))
+    cur.execute("SELECT t.name FROM tag t JOIN pc_tag pt ON t.id = pt.tag_id WHERE pt.pc_id = ?", (pc_id,))
+    tags = [name for (name,) in cur.fetchall()] or [UNTAGGED]
+
+    contributions = [
+        ('machines', 'all', 1, disk_gb),
+        ('ram_gb', bucket_label(ram_total_gb, RAM_BUCKETS_GB), 1, ram_total_gb or 0),
+        ('disk_gb', bucket_label(disk_gb, DISK_BUCKETS_GB), 1, disk_gb),
+        ('cpu_family', cpu_family(cpu), 1, 0),
+    ]
+    contributions += [('gpu_model', gpu, 1, 0) for gpu in gpus]
+    contributions += [('tag', tag, 1, disk_gb) for tag in tags]
+    return contributions
+
+
+def apply_contributions(cur, contributions, sign):
+    """Add (sign=1) or subtract (sign=-1) contributions and drop emptied groups."""
+    if not contributions:
+        return
+    cur.executemany("""
+        INSERT INTO stat_rollup (dimension, grp, machines, amount) VALUES (?, ?, ?, ?)
+        ON CONFLICT(dimension, grp) DO UPDATE SET
+            machines = machines + excluded.machines,
+            amount = amount + excluded.amount
+    """, [(dimension, group, sign * machines, sign * amount) for dimension, group, machines, amount in contributions])
+    if sign < 0:
+        cur.executemany(
+            "DELETE FROM stat_rollup WHERE dimension = ? AND grp = ? AND machines <= 0",
+            [(dimension, group) for dimension, group, _, _ in contributions]
+        )
+
+
+@contextlib.contextmanager
+def track_pc(cur, pc_id):
+    """Keep the rollups in sync around a change to one PC.
+
+        with track_pc(cur, pc_id):
+            ...  # modify the PC, its child rows or its tags
+    """
+    apply_contributions(cur, pc_contributions(cur, pc_id), -1)
+    yield
+    apply_contributions(cur, pc_contributions(cur, pc_id), 1)
+
+
+def rebuild_rollups(cur):
+    """Recompute all rollups from scratch."""
+    cur.execute("DELETE FROM stat_rollup")
+    cur.execute("SELECT id FROM pc")
+    for (pc_id,) in cur.fetchall():
+        apply_contributions(cur, pc_contributions(cur, pc_id), 1)
+
+
+def read_stats(cur) -> dict:
+    """Return the rollups grouped per dimension, as served by /stats."""
+    cur.execute(
+        f"SELECT dimension, grp, machines, amount FROM stat_rollup WHERE dimension IN ({', '.join('?' * len(DIMENSIONS))})",
+        list(DIMENSIONS)
+    )
+    rows = {}
+    for dimension, group, machines, amount in cur.fetchall():
+        rows.setdefault(dimension, []).append((group, machines, amount))
+
+    machines = rows.pop('machines', [('all', 0, 0)])[0]
+    stats = {"machines": machines[1], "disk_tb": round(machines[2] / 1024, 2)}
+    for dimension, amount_name in DIMENSIONS.items():
+        if dimension == 'machines':
+            continue
+        groups = []
+        for group, count, amount in sorted(rows.get(dimension, []), key=bucket_order(dimension)):
+            entry = {"group": group, "machines": count}
+            if amount_name == 'disk_tb':
+                entry[amount_name] = round(amount / 1024, 2)
+            elif amount_name:
+                entry[amount_name] = amount
+            groups.append(entry)
+        stats[dimension] = groups
+    return stats
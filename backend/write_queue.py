@@ -0,0 +1,140 @@
+"""Single-writer queue that group-commits database writes."""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from db import is_lock_error
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueueFull(RuntimeError):
+    """The queue is at capacity; the caller should retry later."""
+
+
+class WriteQueue:
+    """Bounded queue of write jobs drained by one writer thread.
+
+    SQLite only allows one writer at a time, so instead of many request
+    threads fighting over the write lock, requests enqueue a job (a callable
+    taking a cursor) and one thread applies them. The writer takes whatever
+    is waiting, up to ``batch_size`` jobs, and runs them in one transaction,
+    each in its own savepoint so a failing job only rolls back itself. One
+    commit then covers the whole group.
+
+    ``put`` returns a Future that resolves with the job's return value once
+    its transaction has committed. ``on_commit`` is called after every
+    committed group.
+
+    When the write lock cannot be had (another writer holds it past the busy
+    timeout) the whole group is retried with backoff for up to
+    ``retry_deadline`` seconds before its futures fail.
+    """
+
+    def __init__(self, get_pool, maxsize=1000, batch_size=200, on_commit=None, retry_deadline=60):
+        self.get_pool = get_pool
+        self.batch_size = batch_size
+        self.on_commit = on_commit
+        self.retry_deadline = retry_deadline
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Apply everything still queued, then stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def put(self, job) -> Future:
+        future = Future()
+        try:
+            self._queue.put_nowait((job, future))
+        except queue.Full:
+            raise WriteQueueFull() from None
+        return future
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = None in jobs
+            jobs = [job for job in jobs if job is not None]
+            if jobs:
+                self._apply_with_retry(jobs)
+            if stopping:
+                return
+
+    def _apply_with_retry(self, jobs):
+        deadline = time.monotonic() + self.retry_deadline
+        delay = 0.1
+        while True:
+            outcomes, committed = self._apply(jobs)
+            error = outcomes[0][2] if not committed else None
+            if committed or not isinstance(error, sqlite3.OperationalError) or not is_lock_error(error):
+                break
+            if time.monotonic() + delay > deadline:
+                logger.error("Giving up on %d queued writes after %ss: %s", len(jobs), self.retry_deadline, error)
+                break
+            logger.warning("Database is locked, retrying %d queued writes in %.1fs", len(jobs), delay)
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+        if committed and self.on_commit is not None:
+            try:
+                self.on_commit()
+            except Exception:
+                logger.exception("on_commit callback failed")
+
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _apply(self, jobs):
+        """Run ``jobs`` in one transaction; return their (future, result, error) outcomes and whether it committed."""
+        # Nothing may escape this method: the writer thread has to survive
+        # a failing group, or every later job would wait forever.
+        pool = conn = None
+        outcomes = []
+        committed = False
+        try:
+            pool = self.get_pool()
+            conn = pool.acquire()
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            for job, future in jobs:
+                cur.execute("SAVEPOINT write_job")
+                try:
+                    outcomes.append((future, job(cur), None))
+                except Exception as e:
+                    cur.execute("ROLLBACK TO write_job")
+                    outcomes.append((future, None, e))
+                cur.execute("RELEASE write_job")
+            conn.commit()
+            committed = True
+        except Exception as e:
+            if conn is not None and conn.in_transaction:
+                conn.rollback()
+            outcomes = [(future, None, e) for _, future in jobs]
+        finally:
+            if conn is not None:
+                pool.release(conn)
+        return outcomes, committed
@@ -1,51 +1,51 @@
-import { Card as MCard, Divider, Text, Title, Stack, Blockquote, Textarea, Button, ActionIcon, Group, Box, Modal, Badge, Select } from "@mantine/core"
+import { Card as MCard, Divider, Text, Title, Stack, Textarea, Button, ActionIcon, Group, Box, Modal, Badge, Select } from "@mantine/core"
 import React from "react"
 
-import { DiskKeyTranslates, Id, Pc, RamStickKeyTranslates } from "../types"
+import { DiskKeyTranslates, Pc, PcSummary, RamStickKeyTranslates } from "../types"
 import { useDrawer } from "../hooks/useDrawer"
-import { useDeletePc, useFetchAllPcs, useFetchPc, useUpdateNote, useFetchAllTags, useAddTagToPc, useRemoveTagFromPc } from "../hooks/useService"
+import { pcQuery, queryClient, useDeletePc, useFetchPc, useUpdateNote, useFetchAllTags, useAddTagToPc, useRemoveTagFromPc } from "../hooks/useService"
 import { IconEdit, IconTrash } from "@tabler/icons-react"
 import { Field, PreviewField, SubField } from "./Field"
 import { diskKeyTranslates, pcKeyTranslates, ramStickKeyTranslates } from "../constants"
 import { formatDate } from "../utils/dateUtils"
 
+// Fixed card height, so the windowed grid in Main can place rows without measuring them
+export const CARD_HEIGHT = 230
+
 type Props = {
-    pcId: Id
+    summary: PcSummary
+    loadDetails: boolean
 }
 
-export const Card: React.FC<Props> = ({ pcId }) => {
+// Renders the listing fields right away; the rest (resolution, notes) is
+// loaded in a batched /pcs/details request once `loadDetails` is set, i.e.
+// when the card has settled in or near the viewport.
+export const Card = React.memo(({ summary, loadDetails }: Props) => {
     const drawer = useDrawer()
-    const { data: pc, error, isPending, isError, refetch } = useFetchPc(pcId)
-    const { refetch: refetchAllPcs } = useFetchAllPcs()
+    const { data: details, error, isError, refetch } = useFetchPc(summary.id, loadDetails)
     const { mutate: deletePc } = useDeletePc({
         onFinish: () => {
             drawer.close()
-            refetchAllPcs()
         }
     })
 
-    if (isPending) {
-        return <div>Loading...</div>
-    }
-
-    if (isError) {
-        return <Blockquote color="red">{error.message}</Blockquote>
-    }
-
-    if (!pc) {
-        return <Blockquote color="red">No data</Blockquote>
-    }
-
     const title = (
         <Title order={4} lineClamp={1}>
-            {pc.host}
+            {summary.host}
         </Title>
     )
 
+    const openDrawer = async () => {
+        const pc = details ?? await queryClient.ensureQueryData(pcQuery(summary.id))
+        drawer.open({
+            body: <DrawerCard pc={pc} refetch={refetch} onDelete={() => void deletePc({ pcId: summary.id })} />,
+            title: <div>{title}</div>, // Needs to be wrapped in `div`. Otherwise cause console error. 
+        })
+    }
 
     // Check if PC was added within the 15 minutes in user's local time
     const isRecentlyAdded = () => {
-        const submittedAt = new Date(pc.submitted_at);
+        const submittedAt = new Date(summary.submitted_at);
         const now = new Date();
 
         const diffInMs = now.getTime() - submittedAt.getTime();
@@ -57,6 +57,7 @@ export const Card: React.FC<Props> = ({ pcId }) => {
         <MCard
             p="md"
             radius="md"
+            h={CARD_HEIGHT}
             style={{ 
                 cursor: "pointer",
                 borderColor: isRecentlyAdded() ? '#228BE6' : undefined,
@@ -64,12 +65,7 @@ export const Card: React.FC<Props> = ({ pcId }) => {
                 backgroundColor: isRecentlyAdded() ? 'rgba(34, 139, 230, 0.1)' : undefined,
                 transition: 'all 0.3s ease'
             }}
-            onClick={() => {
-                drawer.open({
-                    body: <DrawerCard pc={pc} refetch={refetch} onDelete={() => void deletePc({ pcId })} />,
-                    title: <div>{title}</div>, // Needs to be wrapped in `div`. Otherwise cause console error. 
-                })
-            }}
+            onClick={() => void openDrawer()}
             withBorder
         >
             {title}
@@ -80,37 +76,43 @@ export const Card: React.FC<Props> = ({ pcId }) => {
 
             <PreviewField
                 title="CPU"
-                value={pc.cpu}
+                value={summary.cpu}
             />
             <PreviewField
                 title="RAM"
-                value={`${pc.ram_total_gb} GB`}
-            />
-            <PreviewField
-                title="Resolution"
-                value={pc.resolution}
+                value={`${summary.ram_total_gb} GB`}
             />
-            <PreviewField
-                title="Notes"
-                value={pc.notes}
-            />
-            {pc.tags && pc.tags.length > 0 && (
-                <Group gap="xs" mt="xs">
-                    {pc.tags.map((tag) => (
-                        <Badge key={tag.id} color={tag.color} variant="light" size="sm">
+            {isError ? (
+                <Text size="sm" c="red" lineClamp={2}>{error.message}</Text>
+            ) : (
+                <>
+                    <PreviewField
+                        title="Resolution"
+                        value={details ? details.resolution : "…"}
+                    />
+                    <PreviewField
+                        title="Notes"
+                        value={details ? details.notes : "…"}
+                    />
+                </>
+            )}
+            {summary.tags && summary.tags.length > 0 && (
+                <Group gap="xs" mt="xs" wrap="nowrap" style={{ overflow: "hidden" }}>
+                    {summary.tags.map((tag) => (
+                        <Badge key={tag.name} color={tag.color} variant="light" size="sm" style={{ flexShrink: 0 }}>
                             {tag.name}
                         </Badge>
                     ))}
                 </Group>
             )}
-            <Box mt="xs" style={{ textAlign: 'right' }}>
+            <Box mt="auto" style={{ textAlign: 'right' }}>
                 <Text size="sm" c="dimmed">
-                    {formatDate(pc.submitted_at)}
+                    {formatDate(summary.submitted_at)}
                 </Text>
             </Box>
         </MCard>
     )
-}
+})
 
 const DrawerCard: React.FC<{ pc: Pc, refetch: () => void, onDelete: () => void }> = ({ pc, refetch, onDelete }) => {
     const [data, setData] = React.useState(pc)
@@ -1,11 +1,13 @@
-import { Button, Group, Select } from "@mantine/core"
-import { IconSearch, IconSortAscending, IconSortDescending, IconX } from "@tabler/icons-react"
+import { Button, Group, Select, TextInput } from "@mantine/core"
+import { IconFilter, IconSearch, IconSortAscending, IconSortDescending, IconX } from "@tabler/icons-react"
 import React from "react"
 
 import { Tag } from "../types"
 
 type Props = {
     availableTags: Tag[]
+    filter: string
+    onFilterChange: (filter: string) => void
     onSortChange: (sortBy: string, sortOrder: 'asc' | 'desc') => void
     onTagFilter: (tagName: string | null) => void
     selectedTag: string | null
@@ -15,6 +17,8 @@ type Props = {
 
 export const FilterSortControls: React.FC<Props> = ({
     availableTags,
+    filter,
+    onFilterChange,
     onSortChange,
     onTagFilter,
     selectedTag,
@@ -88,6 +92,14 @@ export const FilterSortControls: React.FC<Props> = ({
                     Clear Filter
                 </Button>
             )}
+            <TextInput
+                label="Filter"
+                placeholder='ram_total_gb >= 16 and gpu ~ "RTX"'
+                value={filter}
+                onChange={(event) => onFilterChange(event.currentTarget.value)}
+                w={360}
+                leftSection={<IconFilter size={16} />}
+            />
         </Group>
     )
 }
@@ -1,25 +1,63 @@
-import { Grid, GridColProps, GridProps } from "@mantine/core"
+import { MantineBreakpoint, useMatches } from "@mantine/core"
+import { useDebouncedValue } from "@mantine/hooks"
 import React from "react"
 
 import { useFetchAllPcs } from "../hooks/useService"
-import { Card } from "./Card"
+import { useWindowedRows } from "../hooks/useWindowedRows"
+import { Card, CARD_HEIGHT } from "./Card"
+
+export type Columns = Partial<Record<MantineBreakpoint | "base", number>>
 
 type Props = React.PropsWithChildren<{
-    colSpan: GridColProps["span"]
-    gutter: GridProps["gutter"]
+    columns: Columns
+    gap: number
+    filter?: string
     selectedTag?: string | null
     sortBy?: string
     sortOrder?: 'asc' | 'desc'
 }>
 
-export const Main: React.FC<Props> = ({ 
-    colSpan, 
-    gutter, 
-    selectedTag = null, 
-    sortBy = 'submitted_at', 
-    sortOrder = 'desc' 
+// Rows rendered above and below the viewport
+const OVERSCAN_ROWS = 3
+// Start loading the next page this many rows before the end of the list
+const PREFETCH_ROWS = 10
+// Details are only requested for cards that stay in view this long, so
+// scrolling quickly past thousands of machines does not request them all
+const DETAILS_DELAY_MS = 150
+
+export const Main: React.FC<Props> = ({
+    columns: responsiveColumns,
+    gap,
+    filter = '',
+    selectedTag = null,
+    sortBy = 'submitted_at',
+    sortOrder = 'desc'
 }) => {
-    const { data, isLoading, error } = useFetchAllPcs(sortBy, sortOrder, selectedTag || undefined)
+    const {
+        data,
+        isLoading,
+        error,
+        fetchNextPage,
+        hasNextPage,
+        isFetchingNextPage,
+    } = useFetchAllPcs(sortBy, sortOrder, selectedTag || undefined, filter || undefined)
+
+    // Backend handles sorting and filtering, so use data as-is
+    const pcs = React.useMemo(() => data?.pages.flatMap(page => page.pcs) || [], [data])
+
+    // Only the rows in and around the viewport are mounted
+    const columns = useMatches(responsiveColumns) ?? 1
+    const rowHeight = CARD_HEIGHT + gap
+    const rowCount = Math.ceil(pcs.length / columns)
+    const { containerRef, range } = useWindowedRows(rowCount, rowHeight, OVERSCAN_ROWS)
+    const [settledRange] = useDebouncedValue(range, DETAILS_DELAY_MS)
+
+    // Load the next page once the end of the list comes near
+    React.useEffect(() => {
+        if (hasNextPage && !isFetchingNextPage && range.end >= rowCount - PREFETCH_ROWS) {
+            fetchNextPage()
+        }
+    }, [fetchNextPage, hasNextPage, isFetchingNextPage, range.end, rowCount])
 
     if (isLoading) {
         return <div>Loading...</div>
@@ -29,16 +67,36 @@ export const Main: React.FC<Props> = ({
         return <div>Error: {error.message}</div>
     }
 
-    // Backend handles sorting and filtering, so use data as-is
-    const pcs = data || []
+    const rows: React.ReactNode[] = []
+    for (let row = range.start; row < Math.min(range.end, rowCount); row++) {
+        const loadDetails = row >= settledRange.start && row < settledRange.end
+        rows.push(
+            <div
+                key={row}
+                style={{
+                    display: "grid",
+                    gap,
+                    gridTemplateColumns: `repeat(${columns}, minmax(0, 1fr))`,
+                    height: CARD_HEIGHT,
+                    left: 0,
+                    position: "absolute",
+                    right: 0,
+                    transform: `translateY(${row * rowHeight}px)`,
+                }}
+            >
+                {pcs.slice(row * columns, (row + 1) * columns).map(pc => (
+                    <Card key={pc.id} summary={pc} loadDetails={loadDetails} />
+                ))}
+            </div>
+        )
+    }
 
     return (
-        <Grid gutter={gutter} justify="center">
-            {pcs.map(({ id }) => (
-                <Grid.Col span={colSpan} key={id}>
-                    <Card pcId={id} />
-                </Grid.Col>
-            ))}
-        </Grid>
+        <>
+            <div ref={containerRef} style={{ height: rowCount * rowHeight, position: "relative" }}>
+                {rows}
+            </div>
+            {isFetchingNextPage && <div>Loading...</div>}
+        </>
     )
 }
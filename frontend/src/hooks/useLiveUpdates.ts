@@ -0,0 +1,154 @@
+import { InfiniteData, Query, QueryKey } from "@tanstack/react-query"
+import React from "react"
+
+import { Id, Pc, PcSummary, Tag } from "../types"
+import { API_URL, PcsPage, invalidateFilteredPcs, queryClient, updateListedPcs, withoutTag } from "./useService"
+
+type LiveEvents = {
+    pc_upserted: PcSummary & { heartbeat?: boolean }
+    pc_deleted: { pc_id: Id }
+    notes_updated: { pc_id: Id; notes: string }
+    tag_attached: { pc_id: Id; tag: Tag }
+    tag_detached: { pc_id: Id; tag: Tag }
+    tag_created: Tag
+    tag_deleted: Tag
+    reset: Record<string, never>
+}
+
+const listedIds = () => new Set(queryClient
+    .getQueriesData<InfiniteData<PcsPage>>({ queryKey: ["pcs"] })
+    .flatMap(([, data]) => data?.pages.flatMap(page => page.pcs.map(pc => pc.id)) ?? []))
+
+// Listings a heartbeat can reorder: the submitted_at sort (the default)
+const sortedBySubmission = (query: Query) =>
+    ((query.queryKey[1] as { sortBy?: string } | undefined)?.sortBy ?? "submitted_at") === "submitted_at"
+
+// Events are collected and applied once per interval, so a burst (e.g. a room
+// of agents booting at once) patches and refetches once rather than per event
+const FLUSH_DELAY_MS = 1000
+
+const pending = {
+    upserts: new Map<Id, LiveEvents["pc_upserted"]>(),
+    filtered: false,
+    queryKeys: new Map<string, QueryKey>(),
+}
+let flushTimer: ReturnType<typeof setTimeout> | undefined
+
+const schedule = (update: () => void) => {
+    update()
+    flushTimer ??= setTimeout(flush, FLUSH_DELAY_MS)
+}
+
+const invalidateLater = (queryKey: QueryKey) => schedule(() => pending.queryKeys.set(JSON.stringify(queryKey), queryKey))
+
+const flush = () => {
+    flushTimer = undefined
+    const { upserts, filtered, queryKeys } = pending
+    pending.upserts = new Map()
+    pending.filtered = false
+    pending.queryKeys = new Map()
+
+    let refetchListings = false
+    let refetchRecent = false
+    const listed = new Map<Id, PcSummary>()
+    const listedNow = upserts.size ? listedIds() : new Set<Id>()
+    for (const { heartbeat, ...summary } of upserts.values()) {
+        if (listedNow.has(summary.id)) {
+            listed.set(summary.id, summary)
+        } else if (heartbeat) {
+            refetchRecent = true
+        } else {
+            refetchListings = true
+        }
+        queryClient.invalidateQueries({ queryKey: ["pc", { id: summary.id }] })
+    }
+    if (listed.size) {
+        updateListedPcs(pcs => pcs.map(pc => listed.has(pc.id) ? { ...pc, ...listed.get(pc.id) } : pc))
+    }
+
+    if (refetchListings) {
+        queryClient.invalidateQueries({ queryKey: ["pcs"] })
+    } else {
+        if (filtered || listed.size) invalidateFilteredPcs()
+        if (refetchRecent) queryClient.invalidateQueries({ queryKey: ["pcs"], predicate: sortedBySubmission })
+    }
+    for (const queryKey of queryKeys.values()) {
+        queryClient.invalidateQueries({ queryKey })
+    }
+}
+
+const handlers: { [K in keyof LiveEvents]: (data: LiveEvents[K]) => void } = {
+    pc_upserted: summary => {
+        schedule(() => pending.upserts.set(summary.id, summary))
+    },
+    pc_deleted: ({ pc_id }) => {
+        pending.upserts.delete(pc_id)
+        updateListedPcs(pcs => pcs.filter(pc => pc.id !== pc_id))
+        queryClient.removeQueries({ queryKey: ["pc", { id: pc_id }] })
+    },
+    notes_updated: ({ pc_id, notes }) => {
+        queryClient.setQueryData<Pc>(["pc", { id: pc_id }], old => old && { ...old, notes })
+    },
+    tag_attached: ({ pc_id, tag }) => {
+        updateListedPcs(pcs => pcs.map(pc => pc.id === pc_id ? { ...pc, tags: [...withoutTag(pc.tags, tag), tag] } : pc))
+        schedule(() => { pending.filtered = true })
+        invalidateLater(["pc-tags", { pcId: pc_id }])
+        invalidateLater(["pc", { id: pc_id }])
+    },
+    tag_detached: ({ pc_id, tag }) => {
+        updateListedPcs(pcs => pcs.map(pc => pc.id === pc_id ? { ...pc, tags: withoutTag(pc.tags, tag) } : pc))
+        schedule(() => { pending.filtered = true })
+        invalidateLater(["pc-tags", { pcId: pc_id }])
+        invalidateLater(["pc", { id: pc_id }])
+    },
+    tag_created: () => {
+        invalidateLater(["tags"])
+    },
+    tag_deleted: tag => {
+        updateListedPcs(pcs => pcs.map(pc => ({ ...pc, tags: withoutTag(pc.tags, tag) })))
+        schedule(() => { pending.filtered = true })
+        invalidateLater(["tags"])
+        invalidateLater(["pc-tags"])
+    },
+    reset: () => {
+        queryClient.invalidateQueries()
+    },
+}
+
+// How long to wait before reopening a stream the server refused (503 when
+// all of its stream slots are taken)
+const STREAM_RETRY_MS = 30_000
+
+// Keeps the query cache current from the backend's /events stream, so data
+// does not have to be polled. EventSource reconnects by itself and resumes
+// from the last event it saw, but gives up on an error response; then the
+// stream is reopened later and everything refetched, as the events in
+// between are lost.
+export const useLiveUpdates = () => {
+    React.useEffect(() => {
+        let source: EventSource
+        let retryTimer: ReturnType<typeof setTimeout> | undefined
+
+        const open = () => {
+            source = new EventSource(`${API_URL}/events`)
+            for (const type of Object.keys(handlers) as (keyof LiveEvents)[]) {
+                const handler = handlers[type] as (data: unknown) => void
+                source.addEventListener(type, event => handler(JSON.parse(event.data)))
+            }
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    retryTimer = setTimeout(() => {
+                        queryClient.invalidateQueries()
+                        open()
+                    }, STREAM_RETRY_MS)
+                }
+            }
+        }
+
+        open()
+        return () => {
+            clearTimeout(retryTimer)
+            source.close()
+        }
+    }, [])
+}
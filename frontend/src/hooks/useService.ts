@@ -1,56 +1,126 @@
-import { QueryClient, useMutation, useQuery } from "@tanstack/react-query"
+import { InfiniteData, QueryClient, queryOptions, useInfiniteQuery, useMutation, useQuery } from "@tanstack/react-query"
 
-import { Id, Pc, Tag } from "../types"
+import { Id, Pc, PcSummary, Tag } from "../types"
 
-const API_URL = ""
+export const API_URL = ""
 const headers: HeadersInit = {
     "Content-Type": "application/json",
 }
 
 export const queryClient = new QueryClient()
 
-export const useFetchAllPcs = (sortBy?: string, sortOrder?: string, tagFilter?: string) => {
-    return useQuery({
-        queryFn: async () => {
+export const PCS_PAGE_SIZE = 100
+
+export type PcsPage = {
+    nextCursor: string | null
+    pcs: PcSummary[]
+}
+
+// Targeted updates of the cached /pcs listings, so a change to one PC does
+// not refetch every loaded page.
+export const updateListedPcs = (update: (pcs: PcSummary[]) => PcSummary[]) => {
+    queryClient.setQueriesData<InfiniteData<PcsPage>>({ queryKey: ["pcs"] }, data => data && {
+        ...data,
+        pages: data.pages.map(page => ({ ...page, pcs: update(page.pcs) })),
+    })
+}
+
+// Listings narrowed by a tag or filter expression may gain or lose PCs on any
+// change, so those are refetched rather than patched
+export const invalidateFilteredPcs = () => queryClient.invalidateQueries({
+    queryKey: ["pcs"],
+    predicate: query => {
+        const params = query.queryKey[1] as { tagFilter?: string; filter?: string } | undefined
+        return Boolean(params?.tagFilter || params?.filter)
+    },
+})
+
+export const withoutTag = (tags: Tag[] | undefined, tag: Pick<Tag, "name">) => (tags ?? []).filter(t => t.name !== tag.name)
+
+const updatePcTags = (pcId: Id, update: (tags: Tag[] | undefined) => Tag[]) => {
+    updateListedPcs(pcs => pcs.map(pc => pc.id === pcId ? { ...pc, tags: update(pc.tags) } : pc))
+    invalidateFilteredPcs()
+    queryClient.invalidateQueries({ queryKey: ["pc", { id: pcId }] })
+    queryClient.invalidateQueries({ queryKey: ["pc-tags", { pcId }] })
+}
+
+export const useFetchAllPcs = (sortBy?: string, sortOrder?: string, tagFilter?: string, filter?: string) => {
+    return useInfiniteQuery({
+        queryFn: async ({ pageParam }): Promise<PcsPage> => {
             const params = new URLSearchParams()
             if (sortBy) params.append('sort_by', sortBy)
             if (sortOrder) params.append('sort_order', sortOrder)
             if (tagFilter) params.append('tag', tagFilter)
-            
-            const url = `${API_URL}/pcs${params.toString() ? '?' + params.toString() : ''}`
+            if (filter) params.append('filter', filter)
+            params.append('limit', PCS_PAGE_SIZE.toString())
+            if (pageParam) params.append('after', pageParam)
+
+            const url = `${API_URL}/pcs?${params.toString()}`
             const response = await fetch(url, { headers })
             if (!response.ok) {
-                throw new Error("Failed to fetch data")
+                const body = await response.json().catch(() => null)
+                throw new Error(body?.error || "Failed to fetch data")
             }
             try {
-                const data: Pc[] = await response.json()
-                return data
+                const data: PcSummary[] = await response.json()
+                return { nextCursor: response.headers.get('X-Next-Cursor'), pcs: data }
             } catch {
                 throw new Error("Failed to parse response")
             }
         },
-        queryKey: ["pcs", { sortBy, sortOrder, tagFilter }],
+        initialPageParam: null as string | null,
+        getNextPageParam: lastPage => lastPage.nextCursor,
+        queryKey: ["pcs", { sortBy, sortOrder, tagFilter, filter }],
     })
 }
 
-export const useFetchPc = (id: Id) => {
-    return useQuery({
-        queryFn: async () => {
-            const response = await fetch(`${API_URL}/pc/${id}`, { headers })
+// Ids requested within the same tick are collected and loaded with a single
+// `/pcs/details` call instead of one `/pc/<id>` request per card.
+let pendingPcIds: Id[] = []
+let pendingPcBatch: Promise<Map<Id, Pc>> | null = null
+
+const fetchPcDetails = (id: Id): Promise<Pc> => {
+    pendingPcIds.push(id)
+    if (!pendingPcBatch) {
+        pendingPcBatch = new Promise(resolve => setTimeout(resolve, 0)).then(async () => {
+            const ids = pendingPcIds
+            pendingPcIds = []
+            pendingPcBatch = null
+
+            const response = await fetch(`${API_URL}/pcs/details`, {
+                body: JSON.stringify({ ids }),
+                headers,
+                method: 'POST',
+            })
             if (!response.ok) {
                 throw new Error("Failed to fetch data")
             }
             try {
-                const data: Pc = await response.json()
-                return data
+                const data: Pc[] = await response.json()
+                return new Map(data.map(pc => [pc.id, pc]))
             } catch {
                 throw new Error("Failed to parse response")
             }
-        },
-        queryKey: ["pc", { id }],
+        })
+    }
+    return pendingPcBatch.then(pcs => {
+        const pc = pcs.get(id)
+        if (!pc) {
+            throw new Error("PC not found")
+        }
+        return pc
     })
 }
 
+export const pcQuery = (id: Id) => queryOptions({
+    queryFn: () => fetchPcDetails(id),
+    queryKey: ["pc", { id }],
+})
+
+export const useFetchPc = (id: Id, enabled = true) => {
+    return useQuery({ ...pcQuery(id), enabled })
+}
+
 type UseUpdateNoteParams = {
     onError?: () => void
     onFinish?: () => void
@@ -108,7 +178,11 @@ export const useDeletePc = ({ onError, onFinish, onSuccess }: UseDeletePcParams)
                 throw new Error("Failed to parse response")
             }
         },
-        onSuccess,
+        onSuccess: (_data, vars) => {
+            updateListedPcs(pcs => pcs.filter(pc => pc.id !== vars.pcId))
+            queryClient.removeQueries({ queryKey: ["pc", { id: vars.pcId }] })
+            onSuccess?.()
+        },
         onSettled: onFinish,
         onError,
     })
@@ -224,9 +298,9 @@ export const useAddTagToPc = ({ onError, onFinish, onSuccess }: UseAddTagToPcPar
                 throw new Error("Failed to parse response")
             }
         },
-        onSuccess: () => {
-            queryClient.invalidateQueries({ queryKey: ["pcs"] })
-            queryClient.invalidateQueries({ queryKey: ["pc"] })
+        onSuccess: (_data, vars) => {
+            const tag = queryClient.getQueryData<Tag[]>(["tags"])?.find(t => t.id === vars.tagId)
+            updatePcTags(vars.pcId, tags => tag ? [...withoutTag(tags, tag), tag] : tags ?? [])
             onSuccess?.()
         },
         onSettled: onFinish,
@@ -257,9 +331,8 @@ export const useRemoveTagFromPc = ({ onError, onFinish, onSuccess }: UseRemoveTa
                 throw new Error("Failed to parse response")
             }
         },
-        onSuccess: () => {
-            queryClient.invalidateQueries({ queryKey: ["pcs"] })
-            queryClient.invalidateQueries({ queryKey: ["pc"] })
+        onSuccess: (_data, vars) => {
+            updatePcTags(vars.pcId, tags => (tags ?? []).filter(t => t.id !== vars.tagId))
             onSuccess?.()
         },
         onSettled: onFinish,
@@ -0,0 +1,46 @@
+import React from "react"
+
+export type RowRange = {
+    start: number
+    end: number
+}
+
+// Tracks which fixed-height rows of a container are within (or `overscan`
+// rows around) the browser viewport. Scroll and resize events are batched
+// per animation frame, and the component only re-renders when the range of
+// rows actually changes, so scrolling a long list stays cheap.
+export const useWindowedRows = (rowCount: number, rowHeight: number, overscan = 2) => {
+    const containerRef = React.useRef<HTMLDivElement>(null)
+    const [range, setRange] = React.useState<RowRange>({ start: 0, end: 0 })
+
+    React.useEffect(() => {
+        let frame = 0
+        const update = () => {
+            frame = 0
+            const container = containerRef.current
+            if (!container) {
+                return
+            }
+            const top = container.getBoundingClientRect().top
+            const start = Math.max(0, Math.floor(-top / rowHeight) - overscan)
+            const end = Math.min(rowCount, Math.ceil((window.innerHeight - top) / rowHeight) + overscan)
+            setRange(current => current.start === start && current.end === end ? current : { start, end })
+        }
+        const schedule = () => {
+            if (!frame) {
+                frame = requestAnimationFrame(update)
+            }
+        }
+
+        update()
+        window.addEventListener("scroll", schedule, { passive: true })
+        window.addEventListener("resize", schedule)
+        return () => {
+            window.removeEventListener("scroll", schedule)
+            window.removeEventListener("resize", schedule)
+            cancelAnimationFrame(frame)
+        }
+    }, [rowCount, rowHeight, overscan])
+
+    return { containerRef, range }
+}
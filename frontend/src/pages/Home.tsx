@@ -1,41 +1,40 @@
 import {
     ActionIcon,
     AppShell,
-    GridColProps,
-    GridProps,
     Group,
     Title,
     useMantineTheme,
 } from "@mantine/core"
-import { useToggle } from "@mantine/hooks"
+import { useDebouncedValue, useToggle } from "@mantine/hooks"
 import { IconLayoutGrid, IconLayoutList } from "@tabler/icons-react"
 import React from "react"
 
-import { Main } from "../components/Main"
+import { Columns, Main } from "../components/Main"
 import { FilterSortControls } from "../components/FilterSortControls"
 import { TagManager } from "../components/TagManager"
+import { useLiveUpdates } from "../hooks/useLiveUpdates"
 import { useFetchAllTags, useCreateTag, useDeleteTag } from "../hooks/useService"
 
 type ViewType = "grid" | "list"
 
+// Space between cards, in px
+const CARD_GAP = 12
+
 type View = {
     [key in ViewType]: {
-        gutter: GridProps["gutter"]
+        columns: Columns
         icon: React.ReactNode
-        span: GridColProps["span"]
     }
 }
 
 const view: View = {
     grid: {
-        gutter: { base: "xs", md: "sm" },
+        columns: { base: 1, sm: 2, lg: 3, xl: 4 },
         icon: <IconLayoutList size={24} />,
-        span: { base: 12, sm: 6, lg: 4, xl: 3 },
     },
     list: {
-        gutter: { base: "xs", md: "sm" },
+        columns: { base: 1 },
         icon: <IconLayoutGrid size={24} />,
-        span: { base: 12 },
     },
 }
 
@@ -45,6 +44,10 @@ export const Home: React.FC = () => {
     const [sortBy, setSortBy] = React.useState<string>('submitted_at')
     const [sortOrder, setSortOrder] = React.useState<'asc' | 'desc'>('desc')
     const [selectedTag, setSelectedTag] = React.useState<string | null>(null)
+    const [filter, setFilter] = React.useState('')
+    const [debouncedFilter] = useDebouncedValue(filter.trim(), 400)
+
+    useLiveUpdates()
 
     // Fetch tags from API
     const tagsQuery = useFetchAllTags()
@@ -99,6 +102,8 @@ export const Home: React.FC = () => {
             <AppShell.Main>
                 <FilterSortControls
                     availableTags={tagsQuery.data || []}
+                    filter={filter}
+                    onFilterChange={setFilter}
                     onSortChange={handleSortChange}
                     onTagFilter={handleTagFilter}
                     selectedTag={selectedTag}
@@ -106,8 +111,9 @@ export const Home: React.FC = () => {
                     sortOrder={sortOrder}
                 />
                 <Main 
-                    colSpan={view[viewType].span} 
-                    gutter={view[viewType].gutter}
+                    columns={view[viewType].columns}
+                    gap={CARD_GAP}
+                    filter={debouncedFilter}
                     sortBy={sortBy}
                     sortOrder={sortOrder}
                     selectedTag={selectedTag}
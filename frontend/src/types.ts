@@ -41,3 +41,6 @@ export type Pc = {
 export type PcKeyTranslates = { [K in keyof Pc]: string }
 export type DiskKeyTranslates = { [K in keyof Disk]: string }
 export type RamStickKeyTranslates = { [K in keyof RamStick]: string }
+
+// A /pcs listing entry; the remaining fields come from /pcs/details
+export type PcSummary = Pick<Pc, "id" | "host" | "cpu" | "ram_total_gb" | "submitted_at" | "tags">